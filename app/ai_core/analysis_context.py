@@ -0,0 +1,139 @@
+"""
+Per-image analysis context
+Intermediate images shared by the garment pipeline stages: a downscaled
+working copy, its grayscale, the foreground mask and the largest external
+contour. Each is computed on first use, so a tier only pays for what its
+stages read.
+"""
+import cv2
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+# Longest side of the working image the stages analyze
+ANALYSIS_SIDE = 512
+
+# Contours covering less than this share of the working image are ignored
+MIN_CONTOUR_SHARE = 0.01
+
+# Border pixels sampled to tell the background polarity of the threshold
+BORDER_WIDTH = 4
+
+class AnalysisContext:
+    """Lazily computed intermediates of one decoded garment image"""
+    
+    def __init__(
+        self,
+        image: np.ndarray,
+        original_size: Optional[Tuple[int, int]] = None,
+        max_side: int = ANALYSIS_SIDE
+    ):
+        """
+        Args:
+            image: Decoded BGR image
+            original_size: (width, height) of the upload before any decode
+                reduction, defaults to the image size
+            max_side: Longest side of the working image
+        """
+        self.image = image
+        height, width = image.shape[:2]
+        self.original_width, self.original_height = original_size or (width, height)
+        self.max_side = max_side
+        self.segment_mask: Optional[np.ndarray] = None
+        self._small: Optional[np.ndarray] = None
+        self._gray: Optional[np.ndarray] = None
+        self._foreground: Optional[np.ndarray] = None
+        self._contour_done = False
+        self._contour: Optional[np.ndarray] = None
+        self._features: Optional[Dict] = None
+    
+    @property
+    def small(self) -> np.ndarray:
+        """BGR working image, longest side at most max_side"""
+        if self._small is None:
+            height, width = self.image.shape[:2]
+            factor = self.max_side / max(height, width)
+            if factor < 1.0:
+                size = (max(1, round(width * factor)), max(1, round(height * factor)))
+                self._small = cv2.resize(self.image, size, interpolation=cv2.INTER_AREA)
+            else:
+                self._small = self.image
+        return self._small
+    
+    @property
+    def scale(self) -> float:
+        """Original pixels per working image pixel"""
+        return self.original_width / self.small.shape[1]
+    
+    @property
+    def gray(self) -> np.ndarray:
+        """Grayscale of the working image"""
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY)
+        return self._gray
+    
+    @property
+    def foreground(self) -> np.ndarray:
+        """
+        uint8 garment mask of the working image (255 = garment)
+        
+        The segmentation mask when one was set, otherwise an Otsu threshold
+        of the grayscale, inverted when the image border (the background)
+        comes out as foreground.
+        """
+        if self._foreground is None:
+            if self.segment_mask is not None:
+                self._foreground = self.segment_mask
+            else:
+                _, binary = cv2.threshold(self.gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+                if self._border_mean(binary) > 127:
+                    cv2.bitwise_not(binary, dst=binary)
+                self._foreground = binary
+        return self._foreground
+    
+    @property
+    def contour(self) -> Optional[np.ndarray]:
+        """Largest external contour of the foreground, None if there is no usable one"""
+        if not self._contour_done:
+            contours, _ = cv2.findContours(self.foreground, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            if contours:
+                largest = max(contours, key=cv2.contourArea)
+                height, width = self.foreground.shape
+                if cv2.contourArea(largest) >= MIN_CONTOUR_SHARE * height * width:
+                    self._contour = largest
+            self._contour_done = True
+        return self._contour
+    
+    def shape_features(self) -> Optional[Dict]:
+        """
+        Shape of the largest contour, in working image pixels
+        
+        Returns:
+            Dictionary with the bounding box, area, aspect_ratio (width /
+            height) and solidity (area / convex hull area), or None without
+            a contour
+        """
+        contour = self.contour
+        if contour is None or self._features is not None:
+            return self._features
+        
+        x, y, w, h = cv2.boundingRect(contour)
+        area = cv2.contourArea(contour)
+        hull_area = cv2.contourArea(cv2.convexHull(contour))
+        self._features = {
+            "box": (x, y, w, h),
+            "area": area,
+            "aspect_ratio": w / h,
+            "solidity": area / hull_area if hull_area > 0 else 1.0
+        }
+        return self._features
+    
+    def _border_mean(self, binary: np.ndarray) -> float:
+        """Mean value of the outer BORDER_WIDTH pixels of a mask"""
+        edge = min(BORDER_WIDTH, *binary.shape)
+        total = (
+            int(binary[:edge].sum()) + int(binary[-edge:].sum())
+            + int(binary[edge:-edge, :edge].sum()) + int(binary[edge:-edge, -edge:].sum())
+        )
+        height, width = binary.shape
+        count = 2 * edge * width + 2 * edge * max(0, height - 2 * edge)
+        return total / count if count else 0.0
@@ -0,0 +1,290 @@
+"""
+Wardrobe color index
+Per-user uniform grid over CIELAB garment colors for k-nearest and radius
+queries, kept in sync with the wardrobe store as items are scanned
+"""
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+from app.ai_core.color_naming import hex_to_rgb, rgb_to_lab
+from app.config import settings
+from app.services.wardrobe_store import WardrobeStore, wardrobe_store
+
+# Grid cell edge in Lab units (about one "clearly different" delta E step)
+CELL_SIZE = 8.0
+
+# Items added since the last grid rebuild are scanned linearly until there are this many
+REBUILD_THRESHOLD = 256
+
+# Rows of replaced garments are compacted away at a rebuild once they are this share of all rows
+COMPACT_SHARE = 0.25
+
+# Fields copied from the wardrobe item into every match
+MATCH_FIELDS = ["garment_id", "color_hex", "color_name", "garment_type", "image_url"]
+
+class ColorIndex:
+    """Nearest-color lookups over one user's garments"""
+    
+    def __init__(self, cell_size: float = CELL_SIZE):
+        self.cell_size = cell_size
+        self._lab = np.empty((0, 3))
+        self._alive = np.empty(0, dtype=bool)
+        self._entries: List[Dict] = []
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        
+        # Grid over rows [0, _compiled): rows sorted by cell, plus the occupied cells
+        self._compiled = 0
+        self._order = np.empty(0, dtype=np.intp)
+        self._row_cell = np.empty(0, dtype=np.intp)
+        self._cell_low = np.empty((0, 3))
+        self._cell_count = np.empty(0, dtype=np.intp)
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def add(self, items: Iterable[Dict]):
+        """
+        Add or replace garments
+        
+        Args:
+            items: Wardrobe items with garment_id and color_hex
+        """
+        # One row per garment, the last occurrence wins
+        unique = {}
+        for item in items:
+            if item.get("color_hex") and item.get("garment_id"):
+                unique[item["garment_id"]] = item
+        items = list(unique.values())
+        if not items:
+            return
+        
+        lab = rgb_to_lab(np.array([hex_to_rgb(item["color_hex"]) for item in items]))
+        
+        with self._lock:
+            start = len(self._entries)
+            replaced = [self._rows[item["garment_id"]] for item in items if item["garment_id"] in self._rows]
+            
+            self._lab = np.concatenate([self._lab, lab])
+            self._alive = np.concatenate([self._alive, np.ones(len(items), dtype=bool)])
+            self._alive[replaced] = False
+            for offset, item in enumerate(items):
+                self._rows[item["garment_id"]] = start + offset
+                self._entries.append({field: item.get(field) for field in MATCH_FIELDS})
+            
+            if len(self._entries) - self._compiled >= REBUILD_THRESHOLD:
+                self._rebuild()
+    
+    def entry(self, garment_id: str) -> Optional[Dict]:
+        """Indexed fields of one garment, or None"""
+        with self._lock:
+            row = self._rows.get(garment_id)
+            return None if row is None else self._entries[row]
+    
+    def nearest(self, color_hex: str, k: int = 5, max_distance: Optional[float] = None) -> List[Dict]:
+        """
+        The k garments closest to a color
+        
+        Args:
+            color_hex: Query color (e.g., "#FF0000")
+            k: Maximum number of matches
+            max_distance: Optional delta E (CIE76) cutoff
+        
+        Returns:
+            Matches sorted by distance, each with a "distance" field
+        """
+        query = rgb_to_lab(hex_to_rgb(color_hex))
+        bound = np.inf if max_distance is None else float(max_distance)
+        
+        with self._lock:
+            if k <= 0 or not self._rows:
+                return []
+            
+            # Tighten the bound with the kth distance among the closest cells
+            if self._compiled:
+                box = self._box_distances(query)
+                order = np.argsort(box)
+                enough = np.searchsorted(np.cumsum(self._cell_count[order]), k)
+                if enough < len(order) and box[order[enough]] <= bound:
+                    cells = np.zeros(len(box), dtype=bool)
+                    cells[order[:enough + 1]] = True
+                    rows, distances = self._distances(query, self._rows_in(cells))
+                    if len(rows) >= k:
+                        bound = min(bound, np.partition(distances, k - 1)[k - 1])
+            
+            return self._matches(query, bound, k)
+    
+    def within(self, color_hex: str, radius: float) -> List[Dict]:
+        """All garments within radius (delta E, CIE76) of a color, closest first"""
+        query = rgb_to_lab(hex_to_rgb(color_hex))
+        
+        with self._lock:
+            return self._matches(query, float(radius), None)
+    
+    def _matches(self, query: np.ndarray, bound: float, k: Optional[int]) -> List[Dict]:
+        """Garments within bound of query, sorted, at most k"""
+        if self._compiled:
+            rows = self._rows_in(self._box_distances(query) <= bound)
+        else:
+            rows = np.empty(0, dtype=np.intp)
+        rows = np.concatenate([rows, np.arange(self._compiled, len(self._entries))])
+        
+        rows, distances = self._distances(query, rows)
+        keep = distances <= bound
+        rows, distances = rows[keep], distances[keep]
+        
+        order = np.argsort(distances, kind="stable")
+        if k is not None:
+            order = order[:k]
+        
+        return [
+            {**self._entries[row], "distance": round(float(distance), 2)}
+            for row, distance in zip(rows[order].tolist(), distances[order].tolist())
+        ]
+    
+    def _distances(self, query: np.ndarray, rows: np.ndarray):
+        """Live rows among rows and their distances to query"""
+        rows = rows[self._alive[rows]]
+        return rows, np.sqrt(((self._lab[rows] - query) ** 2).sum(axis=1))
+    
+    def _rows_in(self, cells: np.ndarray) -> np.ndarray:
+        """Rows stored in the selected grid cells"""
+        return self._order[cells[self._row_cell]]
+    
+    def _box_distances(self, query: np.ndarray) -> np.ndarray:
+        """Distance from query to the nearest point of every occupied cell"""
+        gap = np.maximum(self._cell_low - query, 0) + np.maximum(query - (self._cell_low + self.cell_size), 0)
+        return np.sqrt((gap ** 2).sum(axis=1))
+    
+    def _rebuild(self):
+        """Regroup live rows by grid cell, dropping replaced ones"""
+        if len(self._entries) - len(self._rows) > COMPACT_SHARE * len(self._entries):
+            self._compact()
+        
+        live = np.flatnonzero(self._alive)
+        keys = np.floor(self._lab[live] / self.cell_size).astype(np.intp)
+        cells, row_cell, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+        
+        order = np.argsort(row_cell.ravel(), kind="stable")
+        self._order = live[order]
+        self._row_cell = row_cell.ravel()[order]
+        self._cell_low = cells * self.cell_size
+        self._cell_count = counts
+        self._compiled = len(self._entries)
+    
+    def _compact(self):
+        """Drop the rows of replaced garments, renumbering the live ones"""
+        live = np.flatnonzero(self._alive)
+        self._lab = self._lab[live]
+        self._alive = np.ones(len(live), dtype=bool)
+        self._entries = [self._entries[row] for row in live.tolist()]
+        self._rows = {entry["garment_id"]: row for row, entry in enumerate(self._entries)}
+
+class WardrobeColorIndex:
+    """Color indexes for recently used wardrobes, loaded on first query"""
+    
+    def __init__(self, store: WardrobeStore, max_users: int = 1000):
+        self.store = store
+        self.max_users = max_users
+        self._indexes: "OrderedDict[str, ColorIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Per-user locks so one wardrobe loads once, without blocking other users
+        self._load_locks: Dict[str, threading.Lock] = {}
+        # Saves that landed while a user's wardrobe was loading, replayed after
+        self._pending: Dict[str, List[List[Dict]]] = {}
+        store.add_listener(self._on_saved)
+    
+    def get(self, user_id: str) -> ColorIndex:
+        """Index for a user, built from the store if not loaded yet"""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+                return index
+            load_lock = self._load_locks.setdefault(user_id, threading.Lock())
+        
+        with load_lock:
+            with self._lock:
+                index = self._indexes.get(user_id)
+                if index is not None:
+                    return index
+                pending = self._pending[user_id] = []
+            
+            # Loaded outside the global lock, saves meanwhile go to pending
+            index = ColorIndex()
+            try:
+                index.add(self.store.iter_items(user_id))
+            except Exception:
+                with self._lock:
+                    if self._pending.get(user_id) is pending:
+                        del self._pending[user_id]
+                raise
+            
+            with self._lock:
+                # Replaced rows make the replay safe for saves the load already saw
+                for items in pending:
+                    index.add(items)
+                
+                # Not cached when invalidated during the load
+                if self._pending.get(user_id) is pending:
+                    del self._pending[user_id]
+                    self._indexes[user_id] = index
+                    while len(self._indexes) > self.max_users:
+                        self._indexes.popitem(last=False)
+                self._load_locks.pop(user_id, None)
+            return index
+    
+    def find_loaded(self, user_id: str, garment_id: str) -> Optional[Dict]:
+        """Garment from an already loaded index, never touches the store"""
+        with self._lock:
+            index = self._indexes.get(user_id)
+        return None if index is None else index.entry(garment_id)
+    
+    def match_colors(
+        self,
+        user_id: str,
+        colors_hex: List[str],
+        k: int = 3,
+        max_distance: Optional[float] = None
+    ) -> List[List[Dict]]:
+        """Owned garments closest to each color, in input order"""
+        index = self.get(user_id)
+        return [index.nearest(color, k, max_distance) for color in colors_hex]
+    
+    def invalidate(self, user_id: Optional[str] = None):
+        """Drop one loaded index, or all of them"""
+        with self._lock:
+            if user_id is None:
+                self._indexes.clear()
+                self._pending.clear()
+            else:
+                self._indexes.pop(user_id, None)
+                self._pending.pop(user_id, None)
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "users": len(self._indexes),
+                "items": sum(len(index) for index in self._indexes.values()),
+                "max_users": self.max_users
+            }
+    
+    def _on_saved(self, user_id: str, items: List[Dict]):
+        """Store listener, only indexes that are loaded or loading are updated"""
+        with self._lock:
+            if user_id in self._pending:
+                self._pending[user_id].append(items)
+                return
+            index = self._indexes.get(user_id)
+            if index is None:
+                return
+            try:
+                index.add(items)
+            except Exception:
+                # Rebuilt from the store on the next query
+                del self._indexes[user_id]
+                raise
+
+# Singleton instance
+wardrobe_color_index = WardrobeColorIndex(wardrobe_store, max_users=settings.COLOR_INDEX_MAX_USERS)
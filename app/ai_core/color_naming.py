@@ -0,0 +1,146 @@
+"""
+Perceptual color naming
+Names colors through a precomputed lookup table over quantized RGB,
+built once by nearest-neighbor search in CIELAB against NAMED_COLORS
+"""
+import threading
+import numpy as np
+from typing import Dict, Optional
+
+# Fashion-oriented named palette (name -> hex)
+NAMED_COLORS: Dict[str, str] = {
+    "Black": "#111111",
+    "Charcoal": "#36454F",
+    "Gray": "#808080",
+    "Light Gray": "#C8C8C8",
+    "Silver": "#B8B8C0",
+    "White": "#F8F8F8",
+    "Off White": "#EDE8DC",
+    "Ivory": "#FFFBEA",
+    "Cream": "#F3E5C0",
+    "Beige": "#D8C8A8",
+    "Khaki": "#C3B091",
+    "Tan": "#C8A27A",
+    "Camel": "#B5854B",
+    "Taupe": "#8B7D6B",
+    "Brown": "#7B4B2A",
+    "Chocolate": "#4A2C1D",
+    "Rust": "#B7410E",
+    "Maroon": "#6B1A1A",
+    "Burgundy": "#800020",
+    "Red": "#D0202A",
+    "Coral": "#FF6F61",
+    "Salmon": "#F4A08C",
+    "Peach": "#FFCBA4",
+    "Orange": "#F07820",
+    "Mustard": "#D4A017",
+    "Gold": "#E6BE45",
+    "Yellow": "#F6E04A",
+    "Lime": "#A8D040",
+    "Olive": "#707A3A",
+    "Sage": "#9CAF88",
+    "Mint": "#AEE3C8",
+    "Green": "#2E9B4A",
+    "Emerald": "#0F8A5F",
+    "Forest Green": "#1F4D2B",
+    "Teal": "#127A7A",
+    "Turquoise": "#40C8C0",
+    "Sky Blue": "#87C4E8",
+    "Light Blue": "#B5D3EA",
+    "Denim": "#4F6F94",
+    "Blue": "#2459C8",
+    "Cobalt": "#0047AB",
+    "Navy": "#1C2A4A",
+    "Indigo": "#3F3A8C",
+    "Lavender": "#C8B8E8",
+    "Purple": "#6A3D9A",
+    "Plum": "#6E2F5E",
+    "Mauve": "#B08497",
+    "Magenta": "#C8288C",
+    "Hot Pink": "#F0509A",
+    "Pink": "#F4A6C0",
+    "Blush": "#E8C4C0",
+}
+
+# Bits kept per channel in the lookup table (32 levels -> 32768 entries)
+LUT_BITS = 5
+
+_NAMES = np.array(list(NAMED_COLORS.keys()))
+_lut: Optional[np.ndarray] = None
+_lut_lock = threading.Lock()
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """
+    Convert sRGB colors to CIELAB (D65)
+    
+    Args:
+        rgb: Array of shape (..., 3) with values in 0-255
+    
+    Returns:
+        Float array of shape (..., 3) with L*, a*, b*
+    """
+    srgb = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(srgb > 0.04045, ((srgb + 0.055) / 1.055) ** 2.4, srgb / 12.92)
+    
+    xyz = linear @ np.array([
+        [0.4124564, 0.2126729, 0.0193339],
+        [0.3575761, 0.7151522, 0.1191920],
+        [0.1804375, 0.0721750, 0.9503041],
+    ])
+    xyz /= np.array([0.95047, 1.0, 1.08883])
+    
+    f = np.where(xyz > 216 / 24389, np.cbrt(xyz), (24389 / 27 * xyz + 16) / 116)
+    return np.stack([
+        116 * f[..., 1] - 16,
+        500 * (f[..., 0] - f[..., 1]),
+        200 * (f[..., 1] - f[..., 2]),
+    ], axis=-1)
+
+def hex_to_rgb(hex_color: str) -> np.ndarray:
+    """Convert "#RRGGBB" to an RGB uint8 array"""
+    return np.frombuffer(bytes.fromhex(hex_color.lstrip("#")), dtype=np.uint8)
+
+def name_color(r: int, g: int, b: int) -> str:
+    """Name a single RGB color"""
+    shift = 8 - LUT_BITS
+    return str(_NAMES[_get_lut()[r >> shift, g >> shift, b >> shift]])
+
+def name_colors(rgb: np.ndarray) -> np.ndarray:
+    """
+    Name many colors in one vectorized lookup
+    
+    Args:
+        rgb: Array of shape (..., 3) with RGB values in 0-255
+    
+    Returns:
+        String array of shape (...)
+    """
+    quantized = np.asarray(rgb, dtype=np.uint8) >> (8 - LUT_BITS)
+    indices = _get_lut()[quantized[..., 0], quantized[..., 1], quantized[..., 2]]
+    return _NAMES[indices]
+
+def _get_lut() -> np.ndarray:
+    """Lookup table built on first use"""
+    global _lut
+    if _lut is None:
+        with _lut_lock:
+            if _lut is None:
+                _lut = _build_lut()
+    return _lut
+
+def _build_lut() -> np.ndarray:
+    """Nearest named color in CIELAB for the center of every quantized RGB cell"""
+    levels = 1 << LUT_BITS
+    centers = (np.arange(levels) << (8 - LUT_BITS)) + (1 << (7 - LUT_BITS))
+    grid = np.stack(np.meshgrid(centers, centers, centers, indexing="ij"), axis=-1).reshape(-1, 3)
+    
+    grid_lab = rgb_to_lab(grid)
+    named_lab = rgb_to_lab(np.array([hex_to_rgb(h) for h in NAMED_COLORS.values()]))
+    
+    # Squared distances via |a|^2 + |b|^2 - 2ab
+    distances = (
+        (grid_lab ** 2).sum(axis=1)[:, None]
+        + (named_lab ** 2).sum(axis=1)[None, :]
+        - 2.0 * (grid_lab @ named_lab.T)
+    )
+    return distances.argmin(axis=1).astype(np.uint8).reshape(levels, levels, levels)
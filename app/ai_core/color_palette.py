@@ -0,0 +1,129 @@
+"""
+Color palette extraction
+Top-N colors with pixel-share weights from a quantized color histogram,
+refined with a few weighted Lloyd steps over the occupied histogram bins
+"""
+import numpy as np
+from typing import List, Optional, Tuple
+
+# Bits kept per channel when building the histogram (16 levels -> 4096 bins)
+QUANT_BITS = 4
+
+# Approximate longest side of the pixel grid sampled before quantizing
+SAMPLE_SIDE = 64
+
+# Minimum BGR distance between two seed colors
+MIN_SEED_DISTANCE = 40.0
+
+# Seeds are picked from this many of the most populated bins
+MAX_SEED_CANDIDATES = 64
+
+REFINE_STEPS = 2
+
+_CHANNELS = np.arange(3)
+
+def extract_palette(
+    image: np.ndarray,
+    count: int = 5,
+    mask: Optional[np.ndarray] = None
+) -> List[Tuple[Tuple[int, int, int], float]]:
+    """
+    Extract the dominant colors of a BGR image
+    
+    Args:
+        image: BGR uint8 image
+        count: Maximum number of colors to return
+        mask: Optional uint8 mask, non-zero pixels are sampled
+    
+    Returns:
+        List of ((r, g, b), weight) sorted by weight, weights sum to 1
+    """
+    image, mask = _downsample(image, mask)
+    
+    pixels = image.reshape(-1, 3)
+    if mask is not None:
+        pixels = pixels[mask.reshape(-1) > 0]
+        if len(pixels) == 0:
+            pixels = image.reshape(-1, 3)
+    
+    # Histogram over quantized BGR bins
+    quantized = (pixels >> (8 - QUANT_BITS)).astype(np.intp)
+    bins = (quantized[:, 0] << (2 * QUANT_BITS)) | (quantized[:, 1] << QUANT_BITS) | quantized[:, 2]
+    bin_count = 1 << (3 * QUANT_BITS)
+    counts = np.bincount(bins, minlength=bin_count)
+    
+    # Exact mean color of the pixels falling in each occupied bin
+    occupied = np.flatnonzero(counts)
+    occupied_counts = counts[occupied].astype(np.float64)
+    channel_bins = (bins[:, None] * 3 + _CHANNELS).ravel()
+    sums = np.bincount(channel_bins, weights=pixels.ravel(), minlength=bin_count * 3).reshape(-1, 3)
+    bin_means = sums[occupied] / occupied_counts[:, None]
+    
+    centers = _pick_seeds(bin_means, occupied_counts, count)
+    
+    # Weighted Lloyd refinement over bins instead of pixels
+    members = np.zeros((len(centers), len(occupied)))
+    positions = np.arange(len(occupied))
+    for _ in range(REFINE_STEPS):
+        members[:] = 0
+        members[_nearest(bin_means, centers), positions] = occupied_counts
+        weights = members.sum(axis=1)
+        refined = (members @ bin_means) / np.maximum(weights, 1)[:, None]
+        centers = np.where(weights[:, None] > 0, refined, centers)
+    
+    # Pixel share of each color from the last assignment
+    weights = weights / weights.sum()
+    
+    colors = np.clip(np.rint(centers), 0, 255).astype(int).tolist()
+    shares = weights.tolist()
+    
+    palette = []
+    for index in np.argsort(-weights).tolist():
+        if shares[index] <= 0:
+            continue
+        b, g, r = colors[index]
+        palette.append(((r, g, b), shares[index]))
+    
+    return palette
+
+def _downsample(image: np.ndarray, mask: Optional[np.ndarray]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Subsample the image (and mask) on a regular grid so the longest side is about SAMPLE_SIDE"""
+    step = -(-max(image.shape[:2]) // SAMPLE_SIDE)
+    if step <= 1:
+        return image, mask
+    
+    # Strided sampling is enough for a histogram and avoids a resampling pass
+    image = image[::step, ::step]
+    if mask is not None:
+        mask = mask[::step, ::step]
+    return image, mask
+
+def _pick_seeds(bin_means: np.ndarray, bin_counts: np.ndarray, count: int) -> np.ndarray:
+    """Greedily take the most populated bins that are far enough apart"""
+    order = np.argsort(-bin_counts)[:MAX_SEED_CANDIDATES]
+    candidates = bin_means[order]
+    
+    # Pairwise "too close" matrix, a candidate is blocked once a close seed is taken
+    distances = _squared_distances(candidates, candidates)
+    too_close = distances < MIN_SEED_DISTANCE ** 2
+    blocked = np.zeros(len(candidates), dtype=bool)
+    
+    accepted = []
+    index = 0
+    while len(accepted) < count:
+        accepted.append(index)
+        blocked |= too_close[index]
+        free = np.flatnonzero(~blocked[index + 1:])
+        if len(free) == 0:
+            break
+        index += 1 + free[0]
+    
+    return candidates[accepted].copy()
+
+def _nearest(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """Index of the nearest center for each point"""
+    return _squared_distances(points, centers).argmin(axis=1)
+
+def _squared_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise squared distances via |a|^2 + |b|^2 - 2ab (one matmul)"""
+    return (a * a).sum(axis=1)[:, None] + (b * b).sum(axis=1)[None, :] - 2.0 * (a @ b.T)
@@ -0,0 +1,300 @@
+"""
+Weekly outfit curation
+Builds a week of outfits from a user's wardrobe using the MixMatch harmony
+rules, via per-slot compatibility matrices and a beam search over
+top/bottom pairs. Results are cached per user, ISO week and undertone.
+"""
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from app.ai_core.mixmatch_logic import MixMatchRecommender, mixmatch_recommender
+from app.config import settings
+from app.services.metrics import timed
+from app.services.wardrobe_store import WardrobeStore, wardrobe_store
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+
+# Outfit slot of each garment type from the garment processor, garments
+# without a type (color-tier scans) are left out of outfits
+SLOT_BY_TYPE = {
+    "standard": "top",
+    "long": "bottom",
+    "wide": "outer",
+}
+
+# Outers are only added when they score at least this with both top and bottom
+OUTER_MIN_SCORE = 0.7
+
+# Random score jitter so consecutive weeks do not repeat the same outfits
+WEEKLY_VARIETY = 0.03
+
+# Used until the wardrobe has at least one top and one bottom
+STARTER_WEEK = [
+    {"day": "Monday", "outfit_colors": ["#FF6B6B", "#FFFFFF", "#2C3E50"], "theme": "Professional"},
+    {"day": "Tuesday", "outfit_colors": ["#3498DB", "#ECF0F1", "#34495E"], "theme": "Casual"},
+    {"day": "Wednesday", "outfit_colors": ["#E74C3C", "#FFD700", "#2C3E50"], "theme": "Bold"},
+    {"day": "Thursday", "outfit_colors": ["#9B59B6", "#ECF0F1", "#34495E"], "theme": "Elegant"},
+    {"day": "Friday", "outfit_colors": ["#F39C12", "#FFFFFF", "#2C3E50"], "theme": "Warm"},
+]
+
+def iso_week(day: Optional[date] = None) -> str:
+    """ISO week label, e.g. "2025-W01" """
+    year, week, _ = (day or date.today()).isocalendar()
+    return f"{year}-W{week:02d}"
+
+class WeeklyCurator:
+    """Weekly outfit curation over a user's wardrobe"""
+    
+    def __init__(
+        self,
+        store: WardrobeStore,
+        recommender: MixMatchRecommender,
+        beam_width: int = 8,
+        max_entries: int = 2048
+    ):
+        self.store = store
+        self.recommender = recommender
+        self.beam_width = beam_width
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+        # Invalidation counters of users whose week is being computed, so a
+        # result computed from a stale wardrobe is not cached
+        self._generations: Dict[str, int] = {}
+        self._computing: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        store.add_listener(self._on_saved)
+    
+    def get_week(self, user_id: str, undertone: str, week: Optional[str] = None) -> Dict:
+        """
+        Curated outfits for one user and week
+        
+        Args:
+            user_id: Wardrobe owner
+            undertone: User's undertone (Warm/Cool/Neutral)
+            week: ISO week label, defaults to the current week
+        
+        Returns:
+            Dictionary with user_id, week, source ("wardrobe" or "starter")
+            and one recommendation per day
+        """
+        week = week or iso_week()
+        key = (user_id, week, undertone)
+        
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return cached
+            self._misses += 1
+            generation = self._generations.get(user_id, 0)
+            self._computing[user_id] = self._computing.get(user_id, 0) + 1
+        
+        result = None
+        try:
+            items = list(self.store.iter_items(user_id))
+            recommendations = self.curate(items, undertone, seed=f"{user_id}:{week}")
+            
+            result = {
+                "user_id": user_id,
+                "week": week,
+                "source": "wardrobe" if recommendations else "starter",
+                "recommendations": recommendations or STARTER_WEEK
+            }
+        finally:
+            with self._lock:
+                # Skip caching if the wardrobe changed while we were computing
+                if result is not None and self._generations.get(user_id, 0) == generation:
+                    self._cache[key] = result
+                    while len(self._cache) > self.max_entries:
+                        self._cache.popitem(last=False)
+                
+                # Counters are only kept while a computation may read them
+                self._computing[user_id] -= 1
+                if not self._computing[user_id]:
+                    del self._computing[user_id]
+                    self._generations.pop(user_id, None)
+        
+        return result
+    
+    @timed("curation", "curate")
+    def curate(self, items: List[Dict], undertone: str, seed: str = "") -> List[Dict]:
+        """
+        Pick one outfit per day from wardrobe items
+        
+        Garments are grouped by compatibility class (hue degree or neutral),
+        so the search runs over at most 361 classes per slot however large
+        the wardrobe is. Every top class keeps only its beam_width best
+        bottom classes, the best outer class is chosen per surviving pair,
+        and days are filled greedily by score while avoiding repeated
+        garments.
+        
+        Returns:
+            One outfit per day, or an empty list when the wardrobe has no
+            top or no bottom
+        """
+        slots = {"top": [], "bottom": [], "outer": []}
+        for item in items:
+            slot = SLOT_BY_TYPE.get(item.get("garment_type"))
+            if slot is not None and item.get("color_hex"):
+                slots[slot].append(item)
+        
+        if not slots["top"] or not slots["bottom"]:
+            return []
+        
+        rng = np.random.default_rng(int.from_bytes(hashlib.sha256(seed.encode()).digest()[:8], "little"))
+        groups = {slot: self._group(slot_items, rng) for slot, slot_items in slots.items() if slot_items}
+        top_classes, top_members = groups["top"]
+        bottom_classes, bottom_members = groups["bottom"]
+        
+        # Top x bottom class compatibility, jittered per week
+        pair_scores, pair_theory = self.recommender.compatibility(
+            top_classes[:, None], bottom_classes[None, :], undertone
+        )
+        pair_scores += rng.random(pair_scores.shape, dtype=np.float32) * np.float32(WEEKLY_VARIETY)
+        
+        # Beam: best bottom classes for every top class
+        width = min(self.beam_width, len(bottom_classes))
+        beam = np.argpartition(-pair_scores, width - 1, axis=1)[:, :width]
+        top_index = np.repeat(np.arange(len(top_classes)), width)
+        bottom_index = beam.ravel()
+        scores = pair_scores[top_index, bottom_index]
+        
+        outer_index = np.full(len(scores), -1)
+        if "outer" in groups:
+            outer_classes, outer_members = groups["outer"]
+            top_outer, _ = self.recommender.compatibility(top_classes[:, None], outer_classes[None, :], undertone)
+            
+            # Beam again: each pair only considers the best outers of its top
+            outer_width = min(self.beam_width, len(outer_classes))
+            outer_beam = np.argpartition(-top_outer, outer_width - 1, axis=1)[:, :outer_width][top_index]
+            with_top = np.take_along_axis(top_outer[top_index], outer_beam, axis=1)
+            with_bottom, _ = self.recommender.compatibility(
+                bottom_classes[bottom_index, None], outer_classes[outer_beam], undertone
+            )
+            
+            # Worst of the two pairings decides whether an outer fits, the
+            # outfit is still ranked by its top and bottom
+            fit = np.minimum(with_top, with_bottom)
+            best = fit.argmax(axis=1)
+            rows = np.arange(len(best))
+            layered = fit[rows, best] >= OUTER_MIN_SCORE
+            outer_index = np.where(layered, outer_beam[rows, best], -1)
+        
+        order = np.argsort(-scores, kind="stable")
+        chosen = self._pick_days(order, top_index, bottom_index, top_members, bottom_members)
+        
+        recommendations = []
+        for day_number, (day, (candidate, top, bottom)) in enumerate(zip(DAYS, chosen)):
+            outfit = [("top", top), ("bottom", bottom)]
+            if outer_index[candidate] >= 0:
+                members = outer_members[outer_index[candidate]]
+                outfit.append(("outer", members[day_number % len(members)]))
+            
+            theory = self.recommender.THEORIES[pair_theory[top_index[candidate], bottom_index[candidate]]]
+            recommendations.append({
+                "day": day,
+                "outfit_colors": [item["color_hex"] for _, item in outfit],
+                "theme": theory.capitalize(),
+                "score": round(float(min(scores[candidate], 1.0)), 3),
+                "items": [
+                    {
+                        "slot": slot,
+                        "garment_id": item.get("garment_id"),
+                        "color_hex": item["color_hex"],
+                        "color_name": item.get("color_name")
+                    }
+                    for slot, item in outfit
+                ]
+            })
+        
+        return recommendations
+    
+    def invalidate(self, user_id: str):
+        """Drop cached weeks of a user"""
+        with self._lock:
+            if user_id in self._computing:
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for key in [key for key in self._cache if key[0] == user_id]:
+                del self._cache[key]
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._cache),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses
+            }
+    
+    def _group(self, items: List[Dict], rng: np.random.Generator) -> Tuple[np.ndarray, List[List[Dict]]]:
+        """Unique compatibility classes of items and the items of each, shuffled"""
+        classes = self.recommender.color_features([item["color_hex"] for item in items])
+        unique, inverse = np.unique(classes, return_inverse=True)
+        members = [[] for _ in unique]
+        for position in rng.permutation(len(items)).tolist():
+            members[inverse[position]].append(items[position])
+        return unique, members
+    
+    def _pick_days(
+        self,
+        order: np.ndarray,
+        top_index: np.ndarray,
+        bottom_index: np.ndarray,
+        top_members: List[List[Dict]],
+        bottom_members: List[List[Dict]]
+    ) -> List[Tuple[int, Dict, Dict]]:
+        """
+        Best class pairs for the week with a garment from each class
+        
+        Returns:
+            (candidate, top item, bottom item) per day, unused garments first
+        """
+        top_index, bottom_index = top_index.tolist(), bottom_index.tolist()
+        top_used = [0] * len(top_members)
+        bottom_used = [0] * len(bottom_members)
+        chosen = []
+        
+        for candidate in order.tolist():
+            if len(chosen) == len(DAYS):
+                return chosen
+            top, bottom = top_index[candidate], bottom_index[candidate]
+            if top_used[top] == len(top_members[top]) or bottom_used[bottom] == len(bottom_members[bottom]):
+                continue
+            chosen.append((candidate, top_members[top][top_used[top]], bottom_members[bottom][bottom_used[bottom]]))
+            top_used[top] += 1
+            bottom_used[bottom] += 1
+        
+        # Small wardrobe, repeat garments in new combinations
+        taken = {candidate for candidate, _, _ in chosen}
+        for candidate in order.tolist():
+            if len(chosen) == len(DAYS):
+                break
+            if candidate not in taken:
+                top, bottom = top_index[candidate], bottom_index[candidate]
+                chosen.append((candidate, top_members[top][0], bottom_members[bottom][0]))
+                taken.add(candidate)
+        
+        # Fewer combinations than days, cycle through them
+        count = len(chosen)
+        while chosen and len(chosen) < len(DAYS):
+            chosen.append(chosen[len(chosen) % count])
+        
+        return chosen
+    
+    def _on_saved(self, user_id: str, items: List[Dict]):
+        """Store listener, new garments change the user's weeks"""
+        self.invalidate(user_id)
+
+# Singleton instance
+weekly_curator = WeeklyCurator(
+    wardrobe_store,
+    mixmatch_recommender,
+    beam_width=settings.CURATION_BEAM_WIDTH,
+    max_entries=settings.CURATION_CACHE_MAX_ENTRIES
+)
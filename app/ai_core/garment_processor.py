@@ -2,55 +2,104 @@
 AI System #1: Garment Processor
 Analyzes clothing images for color, type, and measurements
 """
-import cv2
+import time
 import numpy as np
-from PIL import Image
-import io
-from typing import Dict, List, Tuple, Optional
-import json
+from typing import Callable, Dict, List, Optional, Tuple
+from app.ai_core import pipeline_info
+from app.ai_core.analysis_context import AnalysisContext
+from app.ai_core.color_naming import name_colors
+from app.ai_core.color_palette import extract_palette
+from app.ai_core.image_decode import decode_image
+from app.ai_core.segmentation import garment_segmenter
+from app.config import settings
+
+def _elapsed_ms(started: float) -> float:
+    """Milliseconds since a time.perf_counter() reading"""
+    return round((time.perf_counter() - started) * 1000, 2)
 
 class GarmentProcessor:
     """Process garment images to extract color, type, and measurements"""
     
-    def __init__(self):
-        self.color_names = self._get_color_names()
+    VERSION = pipeline_info.GARMENT_VERSION
+    
+    # Pipeline tiers (see pipeline_info)
+    TIER_COLOR = pipeline_info.TIER_COLOR
+    TIER_COLOR_TYPE = pipeline_info.TIER_COLOR_TYPE
+    TIER_FULL = pipeline_info.TIER_FULL
+    TIERS = pipeline_info.GARMENT_TIERS
+    
+    def cache_version(self) -> str:
+        """VERSION plus the settings that change results for the same image"""
+        return pipeline_info.garment_cache_version()
     
-    def process_garment(self, image_bytes: bytes) -> Dict:
+    def process_garment(
+        self,
+        image_bytes: bytes,
+        tier: str = TIER_FULL,
+        on_decoded: Optional[Callable[[np.ndarray, Dict], None]] = None
+    ) -> Dict:
         """
         Process a garment image and extract features
         
         Args:
             image_bytes: Raw image data
-            
+            tier: Pipeline tier selecting which stages run (see TIERS)
+            on_decoded: Called with the decoded image and decode info
+                before analysis, to reuse the decode (e.g. for thumbnails)
+        
         Returns:
-            Dictionary with extracted garment data
+            Dictionary with extracted garment data. Keys of stages the
+            tier skips are omitted.
         """
         try:
-            # Convert bytes to numpy array
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            if tier not in self.TIERS:
+                raise ValueError(f"Unknown tier: {tier}")
             
-            if image is None:
-                raise ValueError("Invalid image format")
+            stages = self.TIERS[tier]["stages"]
+            image, decode_info = decode_image(image_bytes, self.TIERS[tier]["max_side"])
             
-            # Extract dominant color
-            color_hex, color_name = self._extract_dominant_color(image)
+            # Downscaled image, grayscale, mask and contour, computed once for all stages
+            context = AnalysisContext(image, (decode_info["width"], decode_info["height"]))
             
-            # Extract measurements
-            measurements = self._extract_measurements(image)
+            result = {"status": "success", "tier": tier}
+            timings = {"decode_ms": decode_info["decode_ms"]}
             
-            # Detect garment type (basic classification)
-            garment_type = self._classify_garment_type(image)
+            if on_decoded is not None:
+                started = time.perf_counter()
+                on_decoded(image, decode_info)
+                timings["store_ms"] = _elapsed_ms(started)
             
-            return {
-                "status": "success",
-                "color_hex": color_hex,
-                "color_name": color_name,
-                "measurements": measurements,
-                "garment_type": garment_type,
-                "confidence": 0.85
-            }
+            # Garment mask so the later stages ignore the background
+            if "segment" in stages and garment_segmenter.enabled:
+                started = time.perf_counter()
+                context.segment_mask = garment_segmenter.mask(context.small)
+                timings["segment_ms"] = _elapsed_ms(started)
+                result["segmented"] = context.segment_mask is not None
+            
+            # Extract color palette and dominant color
+            started = time.perf_counter()
+            color_hex, color_name, palette = self._extract_colors(context)
+            result["color_hex"] = color_hex
+            result["color_name"] = color_name
+            result["palette"] = palette
+            timings["color_ms"] = _elapsed_ms(started)
             
+            # Extract measurements
+            if "measurements" in stages:
+                started = time.perf_counter()
+                result["measurements"] = self._extract_measurements(context)
+                timings["measurements_ms"] = _elapsed_ms(started)
+            
+            # Detect garment type from the garment's shape
+            if "type" in stages:
+                started = time.perf_counter()
+                result["garment_type"] = self._classify_garment_type(context)
+                timings["type_ms"] = _elapsed_ms(started)
+            
+            result["confidence"] = 0.85
+            result["timings"] = timings
+            return result
+        
         except Exception as e:
             return {
                 "status": "error",
@@ -58,60 +107,52 @@ class GarmentProcessor:
                 "confidence": 0.0
             }
     
-    def _extract_dominant_color(self, image: np.ndarray) -> Tuple[str, str]:
+    def _extract_colors(self, context: AnalysisContext) -> Tuple[str, str, List[Dict]]:
         """
-        Extract dominant color from image using KMeans clustering
+        Extract the color palette and the dominant color of the image
+        
+        Only garment pixels are counted: those of the segmentation mask
+        when one is set, otherwise of the thresholded foreground when it
+        holds a usable garment contour.
         
         Returns:
-            Tuple of (hex_color, color_name)
+            Tuple of (hex_color, color_name, palette), where the dominant
+            color is the palette entry with the largest pixel share
         """
-        # Resize for faster processing
-        image_resized = cv2.resize(image, (150, 150))
-        
-        # Reshape image to list of pixels
-        pixels = image_resized.reshape((-1, 3))
-        pixels = np.float32(pixels)
-        
-        # KMeans clustering to find dominant color
-        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
-        _, labels, centers = cv2.kmeans(pixels, 1, None, criteria, 10, cv2.KMEANS_RANDOM_CENTERS)
-        
-        # Get the dominant color (center)
-        dominant_color = centers[0].astype(int)
-        
-        # Convert BGR to RGB
-        r, g, b = dominant_color[2], dominant_color[1], dominant_color[0]
-        
-        # Convert to HEX
-        hex_color = f"#{r:02x}{g:02x}{b:02x}".upper()
-        
-        # Get color name
-        color_name = self._get_color_name(r, g, b)
+        mask = context.segment_mask
+        if mask is None and context.contour is not None:
+            mask = context.foreground
+        colors = extract_palette(context.small, settings.COLOR_PALETTE_COUNT, mask)
+        names = name_colors(np.array([rgb for rgb, _ in colors]))
+        
+        palette = []
+        for ((r, g, b), weight), color_name in zip(colors, names.tolist()):
+            palette.append({
+                "color_hex": f"#{r:02x}{g:02x}{b:02x}".upper(),
+                "color_name": color_name,
+                "weight": round(weight, 4)
+            })
         
-        return hex_color, color_name
+        return palette[0]["color_hex"], palette[0]["color_name"], palette
     
-    def _extract_measurements(self, image: np.ndarray) -> Dict:
-        """Extract garment measurements from image"""
-        height, width, _ = image.shape
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
-        # Apply threshold
-        _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
+    def _extract_measurements(self, context: AnalysisContext) -> Dict:
+        """
+        Bounding box and area of the largest garment contour
         
-        # Find contours
-        contours, _ = cv2.findContours(binary, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+        Measured on the working image and rescaled to pixels of the
+        original upload. Without a contour the whole image is reported.
+        """
+        width, height = context.original_width, context.original_height
+        features = context.shape_features()
         
-        if contours:
-            # Find largest contour
-            largest_contour = max(contours, key=cv2.contourArea)
-            x, y, w, h = cv2.boundingRect(largest_contour)
+        if features is not None:
+            scale = context.scale
+            _, _, w, h = features["box"]
             
             return {
-                "width_px": int(w),
-                "height_px": int(h),
-                "area_px": int(cv2.contourArea(largest_contour)),
+                "width_px": min(width, round(w * scale)),
+                "height_px": min(height, round(h * scale)),
+                "area_px": round(features["area"] * scale * scale),
                 "image_width": width,
                 "image_height": height
             }
@@ -124,10 +165,21 @@ class GarmentProcessor:
             "image_height": height
         }
     
-    def _classify_garment_type(self, image: np.ndarray) -> str:
-        """Basic garment type classification"""
-        height, width, _ = image.shape
-        aspect_ratio = width / height if height > 0 else 0
+    def _classify_garment_type(self, context: AnalysisContext) -> str:
+        """
+        Basic garment type classification from the garment contour
+        
+        Uses the aspect ratio of the garment itself rather than of the
+        photo, falling back to the photo's frame when no contour is found.
+        Sleeves or legs spread out widen the bounding box without adding
+        much garment, so the ratio is discounted by the contour's solidity:
+        a long-sleeved top laid flat reads as a top, not as outerwear.
+        """
+        features = context.shape_features()
+        if features is not None:
+            aspect_ratio = features["aspect_ratio"] * features["solidity"]
+        else:
+            aspect_ratio = context.original_width / context.original_height if context.original_height > 0 else 0
         
         # Simple heuristic classification
         if aspect_ratio > 1.2:
@@ -136,38 +188,6 @@ class GarmentProcessor:
             return "long"  # Could be pants or skirt
         else:
             return "standard"  # Could be a shirt or blouse
-    
-    def _get_color_name(self, r: int, g: int, b: int) -> str:
-        """Convert RGB to color name"""
-        colors = {
-            "Red": {"r_range": (100, 255), "g_range": (0, 100), "b_range": (0, 100)},
-            "Blue": {"r_range": (0, 100), "g_range": (0, 150), "b_range": (100, 255)},
-            "Green": {"r_range": (0, 100), "g_range": (100, 255), "b_range": (0, 100)},
-            "Yellow": {"r_range": (100, 255), "g_range": (100, 255), "b_range": (0, 100)},
-            "Black": {"r_range": (0, 50), "g_range": (0, 50), "b_range": (0, 50)},
-            "White": {"r_range": (150, 255), "g_range": (150, 255), "b_range": (150, 255)},
-            "Gray": {"r_range": (50, 150), "g_range": (50, 150), "b_range": (50, 150)},
-        }
-        
-        for color_name, ranges in colors.items():
-            if (ranges["r_range"][0] <= r <= ranges["r_range"][1] and
-                ranges["g_range"][0] <= g <= ranges["g_range"][1] and
-                ranges["b_range"][0] <= b <= ranges["b_range"][1]):
-                return color_name
-        
-        return "Unknown"
-    
-    def _get_color_names(self) -> Dict:
-        """Get color palette"""
-        return {
-            "Red": "#FF0000",
-            "Blue": "#0000FF",
-            "Green": "#00FF00",
-            "Yellow": "#FFFF00",
-            "Black": "#000000",
-            "White": "#FFFFFF",
-            "Gray": "#808080",
-        }
 
 # Singleton instance
 garment_processor = GarmentProcessor()
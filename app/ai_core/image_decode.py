@@ -0,0 +1,163 @@
+"""
+Shared image decode stage
+Reads image dimensions from the header, rejects decompression bombs before
+any pixels are allocated, and decodes at the smallest scale that still
+covers the analysis size
+"""
+import struct
+import time
+import cv2
+import numpy as np
+from typing import Dict, Optional, Tuple
+from app.config import settings
+
+# cv2 flags for decoding at 1/2, 1/4 and 1/8 scale (JPEG scales in the decoder).
+# Like IMREAD_COLOR they apply the EXIF orientation.
+REDUCED_DECODE_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+}
+
+# JPEG start-of-frame markers (all carry height and width at the same offsets)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# JPEG markers without a length field
+_JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+
+def read_dimensions(data) -> Optional[Tuple[int, int]]:
+    """
+    Width and height from a JPEG, PNG or WebP header
+    
+    Args:
+        data: Encoded image (bytes, bytearray or memoryview)
+    
+    Returns:
+        (width, height), or None if the format is not recognized
+    """
+    header = bytes(data[:32])
+    
+    try:
+        if header[:2] == b"\xff\xd8":
+            return _jpeg_dimensions(data)
+        
+        if header[:8] == b"\x89PNG\r\n\x1a\n" and header[12:16] == b"IHDR":
+            return struct.unpack(">II", header[16:24])
+        
+        if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            return _webp_dimensions(header)
+    except struct.error:
+        return None
+    
+    return None
+
+def decode_image(
+    data,
+    max_side: Optional[int] = None,
+    max_pixels: Optional[int] = None
+) -> Tuple[np.ndarray, Dict]:
+    """
+    Decode an upload into a BGR image
+    
+    Picks the largest 1/2, 1/4 or 1/8 reduction that keeps the longest
+    side at or above max_side, so callers that analyze small images never
+    allocate the full-resolution bitmap.
+    
+    Args:
+        data: Encoded image (bytes, bytearray or memoryview)
+        max_side: Smallest longest side the caller needs, None for full size
+        max_pixels: Pixel-count cap on the encoded image, defaults to
+            settings.MAX_IMAGE_PIXELS
+    
+    Returns:
+        Tuple of (BGR image, info with width/height of the original as
+        displayed (after EXIF rotation), the decode scale and decode_ms)
+    
+    Raises:
+        ValueError: Unrecognized format, too many pixels, or corrupt data
+    """
+    started = time.perf_counter()
+    max_pixels = max_pixels or settings.MAX_IMAGE_PIXELS
+    
+    dimensions = read_dimensions(data)
+    if dimensions is None:
+        raise ValueError("Invalid image format")
+    
+    width, height = dimensions
+    if width * height > max_pixels:
+        raise ValueError(f"Image too large: {width}x{height} exceeds {max_pixels} pixels")
+    
+    flag, scale = cv2.IMREAD_COLOR, 1
+    if max_side:
+        for factor, reduced_flag in REDUCED_DECODE_FLAGS.items():
+            if max(width, height) // factor >= max_side:
+                flag, scale = reduced_flag, factor
+                break
+    
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+    if image is None:
+        raise ValueError("Invalid image format")
+    
+    # The header holds the stored size, the decode applied any EXIF rotation
+    decoded_width = image.shape[1] * scale
+    if abs(decoded_width - height) < abs(decoded_width - width):
+        width, height = height, width
+    
+    return image, {
+        "width": width,
+        "height": height,
+        "scale": scale,
+        "decode_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+def _jpeg_dimensions(data) -> Optional[Tuple[int, int]]:
+    """Walk JPEG segments up to the first start-of-frame marker"""
+    view = memoryview(data)
+    position = 2
+    end = len(view)
+    
+    while position + 4 <= end:
+        if view[position] != 0xFF:
+            return None
+        
+        marker = view[position + 1]
+        if marker == 0xFF:
+            # Fill byte before the marker
+            position += 1
+            continue
+        
+        if marker in _JPEG_STANDALONE_MARKERS:
+            position += 2
+            continue
+        
+        if marker in (0xD9, 0xDA):
+            # End of image or start of scan without a frame header
+            return None
+        
+        (length,) = struct.unpack(">H", view[position + 2:position + 4])
+        if marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", view[position + 5:position + 9])
+            return width, height
+        
+        position += 2 + length
+    
+    return None
+
+def _webp_dimensions(header: bytes) -> Optional[Tuple[int, int]]:
+    """Canvas size from the first WebP chunk (lossy, lossless or extended)"""
+    chunk = header[12:16]
+    
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    
+    if chunk == b"VP8L":
+        (bits,) = struct.unpack("<I", header[21:25])
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    
+    if chunk == b"VP8X":
+        width = int.from_bytes(header[24:27], "little") + 1
+        height = int.from_bytes(header[27:30], "little") + 1
+        return width, height
+    
+    return None
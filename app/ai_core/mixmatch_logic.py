@@ -2,65 +2,98 @@
 AI System #3: MixMatch Logic
 Recommendation engine using color theory
 """
-from typing import Dict, List, Tuple
+import re
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.ai_core.color_naming import name_colors
+from app.config import settings
+from app.services.metrics import timed
+
+HEX_COLOR_PATTERN = re.compile(r"^#[0-9A-Fa-f]{6}$")
 
 class MixMatchRecommender:
     """Recommendation engine based on color theory"""
     
-    def __init__(self):
+    # Bump when the rules below change, cached responses depend on it
+    VERSION = "1"
+    
+    # Harmony rules: hue offset (degrees), base match score and theory name.
+    # Suggested colors use a fixed saturation and value.
+    HARMONIES = [
+        (180, 0.95, "complementary"),
+        (30, 0.85, "analogous"),
+        (-30, 0.85, "analogous"),
+        (120, 0.90, "triadic"),
+        (240, 0.90, "triadic"),
+    ]
+    SUGGESTION_SATURATION = 0.8
+    SUGGESTION_VALUE = 0.9
+    
+    # Pairwise compatibility: how far (degrees) a hue pair may sit from a
+    # harmony offset, and the score of pairs involving a neutral color
+    HARMONY_TOLERANCE = 30.0
+    NEUTRAL_SATURATION = 0.2
+    NEUTRAL_VALUE = 0.2
+    NEUTRAL_SCORE = 0.8
+    THEORIES = [theory for _, _, theory in HARMONIES] + ["neutral"]
+    
+    # User preference vectors hold one weight in [-1, 1] per 30 degree hue
+    # bin; a suggestion's score is scaled by 1 + PREFERENCE_WEIGHT * weight
+    PREFERENCE_BINS = 12
+    PREFERENCE_WEIGHT = 0.15
+    
+    def __init__(self, memo_size: int = 4096, color_step: int = 1):
         self.color_wheel = self._build_color_wheel()
+        self._hue_offsets = np.array([offset for offset, _, _ in self.HARMONIES], dtype=np.float64)
+        # Stable order by descending base score, undertone boosts scale every score equally
+        self._rank = np.argsort([-score for _, score, _ in self.HARMONIES], kind="stable").tolist()
+        self._class_scores, self._class_theory = self._build_class_table()
+        
+        # Recommendations without preferences, keyed by (quantized color, undertone)
+        self.memo_size = memo_size
+        self.color_step = max(1, color_step)
+        self._memo: "OrderedDict[Tuple[str, str], List[Dict]]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self._memo_hits = 0
+        self._memo_misses = 0
     
-    def get_instant_match(self, item_color_hex: str, user_undertone: str) -> Dict:
+    @timed("mixmatch", "instant_match")
+    def get_instant_match(
+        self,
+        item_color_hex: str,
+        user_undertone: str,
+        preferences: Optional[np.ndarray] = None
+    ) -> Dict:
         """
         Get instant match recommendations based on color theory
         
+        Without preferences the result only depends on the color (after
+        quantize_color) and undertone, and is served from a bounded memo.
+        
         Args:
             item_color_hex: Hex color of current item (e.g., "#FF0000")
             user_undertone: User's undertone (Warm/Cool/Neutral)
-            
+            preferences: Optional per-hue-bin preference vector
+        
         Returns:
             Dictionary with recommended item colors and match scores
         """
         try:
-            # Convert hex to HSV for color theory
-            h, s, v = self._hex_to_hsv(item_color_hex)
-            
-            # Get complementary colors
-            complementary = self._get_complementary(h)
-            
-            # Get analogous colors
-            analogous = self._get_analogous(h)
-            
-            # Get triadic colors
-            triadic = self._get_triadic(h)
-            
-            # Filter by user undertone
-            all_recommendations = []
-            
-            for color, score, theory in [
-                (complementary, 0.95, "complementary"),
-                (analogous[0], 0.85, "analogous"),
-                (analogous[1], 0.85, "analogous"),
-                (triadic[0], 0.90, "triadic"),
-                (triadic[1], 0.90, "triadic"),
-            ]:
-                match_score = self._apply_undertone_filter(score, user_undertone)
-                all_recommendations.append({
-                    "color_hex": color,
-                    "match_score": match_score,
-                    "theory": theory
-                })
-            
-            # Sort by match score
-            all_recommendations.sort(key=lambda x: x["match_score"], reverse=True)
+            if preferences is None:
+                recommendations = self._memoized_recommendations(item_color_hex, user_undertone)
+            else:
+                recommendations = self._recommendations(item_color_hex, user_undertone, preferences)
             
             return {
                 "status": "success",
                 "item_color": item_color_hex,
-                "recommendations": all_recommendations[:5],  # Top 5
+                # Copies, callers may attach wardrobe matches
+                "recommendations": [dict(recommendation) for recommendation in recommendations],  # Top 5
                 "confidence": 0.88
             }
-            
+        
         except Exception as e:
             return {
                 "status": "error",
@@ -68,80 +101,282 @@ class MixMatchRecommender:
                 "confidence": 0.0
             }
     
-    def _hex_to_hsv(self, hex_color: str) -> Tuple[float, float, float]:
-        """Convert hex color to HSV"""
-        hex_color = hex_color.lstrip('#')
-        r, g, b = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+    @timed("mixmatch", "instant_matches")
+    def get_instant_matches(
+        self,
+        item_colors_hex: List[str],
+        user_undertone: str,
+        preferences: Optional[np.ndarray] = None
+    ) -> Dict:
+        """
+        Get instant match recommendations for many item colors at once
+        
+        HSV conversion, harmony generation and naming run as array
+        operations over all items.
+        
+        Args:
+            item_colors_hex: Hex colors of the items (e.g., ["#FF0000", ...])
+            user_undertone: User's undertone (Warm/Cool/Neutral)
+            preferences: Optional PREFERENCE_BINS vector of liked (positive)
+                and disliked (negative) hues used to re-rank suggestions
+        
+        Returns:
+            Dictionary with one result per input color, in input order.
+            Invalid colors get a per-item error entry.
+        """
+        return self._instant_matches(item_colors_hex, user_undertone, preferences)
+    
+    def _instant_matches(
+        self,
+        item_colors_hex: List[str],
+        user_undertone: str,
+        preferences: Optional[np.ndarray]
+    ) -> Dict:
+        """get_instant_matches untimed, so single-color calls are only timed as instant_match"""
+        valid = [i for i, color in enumerate(item_colors_hex) if HEX_COLOR_PATTERN.match(color)]
+        results = [
+            {"item_color": color, "status": "error", "message": "Color must be in hex format (e.g., #FF0000)"}
+            for color in item_colors_hex
+        ]
+        
+        if valid:
+            hues, _, _ = self._hex_to_hsv_array([item_colors_hex[i] for i in valid])
+            
+            # (items, harmonies) grid of suggested hues
+            suggested_hues = (hues[:, None] + self._hue_offsets[None, :]) % 360
+            suggested_hex, suggested_rgb = self._hsv_to_hex_array(
+                suggested_hues,
+                self.SUGGESTION_SATURATION,
+                self.SUGGESTION_VALUE
+            )
+            suggested_names = name_colors(suggested_rgb).tolist()
+            
+            # Rounded like the preference-adjusted scores, so responses have one precision
+            scores = [
+                round(self._apply_undertone_filter(score, user_undertone), 4)
+                for _, score, _ in self.HARMONIES
+            ]
+            
+            if preferences is None:
+                score_rows = [scores] * len(valid)
+                rank_rows = [self._rank] * len(valid)
+            else:
+                bins = (suggested_hues // (360 / self.PREFERENCE_BINS)).astype(np.intp) % self.PREFERENCE_BINS
+                adjusted = np.array(scores) * (1 + self.PREFERENCE_WEIGHT * np.asarray(preferences)[bins])
+                score_rows = adjusted.round(4).tolist()
+                rank_rows = np.argsort(-adjusted, axis=1, kind="stable").tolist()
+            
+            for row, index in enumerate(valid):
+                hex_row = suggested_hex[row]
+                name_row = suggested_names[row]
+                score_row = score_rows[row]
+                results[index] = {
+                    "item_color": item_colors_hex[index],
+                    "status": "success",
+                    "recommendations": [
+                        {
+                            "color_hex": hex_row[k],
+                            "match_score": score_row[k],
+                            "theory": self.HARMONIES[k][2],
+                            "color_name": name_row[k]
+                        }
+                        for k in rank_rows[row]
+                    ]
+                }
+        
+        return {
+            "status": "success",
+            "undertone": user_undertone,
+            "results": results,
+            "confidence": 0.88
+        }
+    
+    def quantize_color(self, color_hex: str) -> str:
+        """Uppercase hex color with each channel rounded to a multiple of color_step"""
+        if self.color_step == 1:
+            return color_hex.upper()
+        step = self.color_step
+        channels = bytes(min(255, round(channel / step) * step) for channel in bytes.fromhex(color_hex[1:]))
+        return "#" + channels.hex().upper()
+    
+    def stats(self) -> Dict:
+        with self._memo_lock:
+            return {
+                "entries": len(self._memo),
+                "max_entries": self.memo_size,
+                "color_step": self.color_step,
+                "hits": self._memo_hits,
+                "misses": self._memo_misses
+            }
+    
+    def _recommendations(
+        self,
+        item_color_hex: str,
+        user_undertone: str,
+        preferences: Optional[np.ndarray]
+    ) -> List[Dict]:
+        """Ranked recommendations for one color, ValueError if it is invalid"""
+        result = self._instant_matches([item_color_hex], user_undertone, preferences)["results"][0]
+        
+        if result["status"] != "success":
+            raise ValueError(result["message"])
+        
+        return result["recommendations"]
+    
+    def _memoized_recommendations(self, item_color_hex: str, user_undertone: str) -> List[Dict]:
+        """_recommendations without preferences, through the memo"""
+        if not HEX_COLOR_PATTERN.match(item_color_hex):
+            raise ValueError("Color must be in hex format (e.g., #FF0000)")
+        
+        key = (self.quantize_color(item_color_hex), user_undertone)
+        with self._memo_lock:
+            cached = self._memo.get(key)
+            if cached is not None:
+                self._memo.move_to_end(key)
+                self._memo_hits += 1
+                return cached
+            self._memo_misses += 1
+        
+        recommendations = self._recommendations(key[0], user_undertone, None)
+        
+        with self._memo_lock:
+            self._memo[key] = recommendations
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        
+        return recommendations
+    
+    def compatibility_matrix(
+        self,
+        colors_a_hex: List[str],
+        colors_b_hex: List[str],
+        user_undertone: str
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score every pair of colors against the harmony rules
+        
+        Args:
+            colors_a_hex: Row colors in hex format
+            colors_b_hex: Column colors in hex format
+            user_undertone: User's undertone (Warm/Cool/Neutral)
+        
+        Returns:
+            Tuple of (float32 scores of shape (a, b), index into THEORIES
+            of the rule behind each score)
+        """
+        classes_a = self.color_features(colors_a_hex)
+        classes_b = self.color_features(colors_b_hex)
+        return self.compatibility(classes_a[:, None], classes_b[None, :], user_undertone)
+    
+    def preference_bins(self, colors_hex: List[str]) -> np.ndarray:
+        """Preference vector bin of each color, -1 for neutrals"""
+        classes = self.color_features(colors_hex)
+        bins = classes // (360 // self.PREFERENCE_BINS)
+        return np.where(classes == 360, -1, bins)
+    
+    def color_features(self, colors_hex: List[str]) -> np.ndarray:
+        """
+        Compatibility class of each color: hue in whole degrees (0-359),
+        or 360 for neutrals (low saturation or value)
+        """
+        hue, saturation, value = self._hex_to_hsv_array(colors_hex)
+        classes = np.rint(hue).astype(np.intp) % 360
+        classes[(saturation < self.NEUTRAL_SATURATION) | (value < self.NEUTRAL_VALUE)] = 360
+        return classes
+    
+    def compatibility(
+        self,
+        classes_a: np.ndarray,
+        classes_b: np.ndarray,
+        user_undertone: str
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Harmony score of color pairs given as broadcastable class arrays
+        
+        A pair scores the harmony's base score when their hue difference
+        equals the harmony offset, falling off linearly to zero at
+        HARMONY_TOLERANCE degrees away. Pairs with a neutral color score
+        NEUTRAL_SCORE since their hue carries no meaning. All 361 x 361
+        class pairs are precomputed, so this is a table lookup.
+        
+        Returns:
+            Tuple of (float32 scores, index into THEORIES)
+        """
+        table = self._apply_undertone_filter(self._class_scores, user_undertone)
+        return table[classes_a, classes_b], self._class_theory[classes_a, classes_b]
+    
+    def _build_class_table(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Score and rule for every pair of color_features() classes"""
+        difference = np.arange(360, dtype=np.float64)
+        gap = np.abs((difference[:, None] - self._hue_offsets + 180) % 360 - 180)
+        base_scores = np.array([score for _, score, _ in self.HARMONIES])
+        weighted = np.clip(1 - gap / self.HARMONY_TOLERANCE, 0, 1) * base_scores
         
-        r, g, b = r / 255.0, g / 255.0, b / 255.0
+        # Hue pairs depend only on the difference (b - a) mod 360
+        hues = np.arange(360)
+        offsets = (hues[None, :] - hues[:, None]) % 360
+        scores = np.full((361, 361), self.NEUTRAL_SCORE, dtype=np.float32)
+        theory = np.full((361, 361), len(self.HARMONIES), dtype=np.intp)
+        scores[:360, :360] = weighted.max(axis=1)[offsets]
+        theory[:360, :360] = weighted.argmax(axis=1)[offsets]
+        return scores, theory
+    
+    def _hex_to_hsv_array(self, hex_colors: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Convert hex colors to HSV arrays (hue in degrees, s and v in 0-1)"""
+        raw = bytes.fromhex("".join(color[1:] for color in hex_colors))
+        rgb = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3) / 255.0
+        r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
         
-        max_c = max(r, g, b)
-        min_c = min(r, g, b)
+        max_c = rgb.max(axis=1)
+        min_c = rgb.min(axis=1)
         diff = max_c - min_c
+        safe_diff = np.where(diff != 0, diff, 1.0)
         
-        # Hue
-        if max_c == r:
-            h = (60 * ((g - b) / diff % 6)) if diff != 0 else 0
-        elif max_c == g:
-            h = (60 * ((b - r) / diff + 2)) if diff != 0 else 0
-        else:
-            h = (60 * ((r - g) / diff + 4)) if diff != 0 else 0
+        # Hue, first matching channel wins like the scalar version
+        h = np.select(
+            [max_c == r, max_c == g],
+            [60 * ((g - b) / safe_diff % 6), 60 * ((b - r) / safe_diff + 2)],
+            60 * ((r - g) / safe_diff + 4)
+        )
+        h = np.where(diff != 0, h, 0.0)
         
         # Saturation
-        s = (diff / max_c) if max_c != 0 else 0
+        s = np.where(max_c != 0, diff / np.where(max_c != 0, max_c, 1.0), 0.0)
         
         # Value
         v = max_c
         
         return h % 360, s, v
     
-    def _hsv_to_hex(self, h: float, s: float, v: float) -> str:
-        """Convert HSV to hex color"""
+    def _hsv_to_hex_array(self, h: np.ndarray, s: float, v: float) -> Tuple[List[List[str]], np.ndarray]:
+        """
+        Convert an array of hues with fixed saturation and value to hex
+        
+        Returns:
+            Tuple of (hex strings with the shape of h as nested lists,
+            RGB uint8 array of shape h.shape + (3,))
+        """
         c = v * s
-        x = c * (1 - abs((h / 60) % 2 - 1))
+        x = c * (1 - np.abs((h / 60) % 2 - 1))
         m = v - c
+        zero = np.zeros_like(h)
         
-        if 0 <= h < 60:
-            r, g, b = c, x, 0
-        elif 60 <= h < 120:
-            r, g, b = x, c, 0
-        elif 120 <= h < 180:
-            r, g, b = 0, c, x
-        elif 180 <= h < 240:
-            r, g, b = 0, x, c
-        elif 240 <= h < 300:
-            r, g, b = x, 0, c
-        else:
-            r, g, b = c, 0, x
-        
-        r, g, b = int((r + m) * 255), int((g + m) * 255), int((b + m) * 255)
-        
-        return f"#{r:02x}{g:02x}{b:02x}".upper()
-    
-    def _get_complementary(self, hue: float) -> str:
-        """Get complementary color (opposite on color wheel)"""
-        comp_hue = (hue + 180) % 360
-        return self._hsv_to_hex(comp_hue, 0.8, 0.9)
-    
-    def _get_analogous(self, hue: float) -> Tuple[str, str]:
-        """Get two analogous colors (adjacent on color wheel)"""
-        analog1_hue = (hue + 30) % 360
-        analog2_hue = (hue - 30) % 360
-        
-        return (
-            self._hsv_to_hex(analog1_hue, 0.8, 0.9),
-            self._hsv_to_hex(analog2_hue, 0.8, 0.9)
-        )
-    
-    def _get_triadic(self, hue: float) -> Tuple[str, str]:
-        """Get two triadic colors (120° apart)"""
-        tri1_hue = (hue + 120) % 360
-        tri2_hue = (hue + 240) % 360
+        # Color wheel sector 0-5, each maps (c, x, 0) to (r, g, b) differently
+        sector = np.clip((h // 60).astype(np.intp), 0, 5)
+        r = np.choose(sector, [c + zero, x, zero, zero, x, c + zero])
+        g = np.choose(sector, [x, c + zero, c + zero, x, zero, zero])
+        b = np.choose(sector, [zero, zero, x, c + zero, c + zero, x])
         
-        return (
-            self._hsv_to_hex(tri1_hue, 0.8, 0.9),
-            self._hsv_to_hex(tri2_hue, 0.8, 0.9)
-        )
+        rgb = (np.stack([r, g, b], axis=-1) + m) * 255
+        rgb = rgb.astype(np.uint8)  # Truncates like int()
+        
+        # One hex encode for the whole array, then slice per color
+        encoded = rgb.tobytes().hex().upper()
+        flat = ["#" + encoded[i:i + 6] for i in range(0, len(encoded), 6)]
+        width = h.shape[-1]
+        hex_colors = [flat[i:i + width] for i in range(0, len(flat), width)]
+        
+        return hex_colors, rgb
     
     def _apply_undertone_filter(self, score: float, undertone: str) -> float:
         """Apply undertone filter to match score"""
@@ -167,4 +402,7 @@ class MixMatchRecommender:
         }
 
 # Singleton instance
-mixmatch_recommender = MixMatchRecommender()
+mixmatch_recommender = MixMatchRecommender(
+    memo_size=settings.RECOMMEND_MEMO_MAX_ENTRIES,
+    color_step=settings.RECOMMEND_COLOR_STEP
+)
@@ -0,0 +1,31 @@
+"""
+Pipeline metadata shared by the API and the AI core
+Result versions and garment tiers live here so routers can validate
+requests and build cache keys without importing cv2 and the processors.
+"""
+from app.config import settings
+
+# Bump when the output for the same image changes (invalidates cached results)
+GARMENT_VERSION = "8"
+PROFILE_VERSION = "5"
+
+# Garment pipeline tiers
+TIER_COLOR = "color"            # Dominant color only
+TIER_COLOR_TYPE = "color_type"  # Color + garment type
+TIER_FULL = "full"              # Color + measurements + type
+
+# Stages per tier, longest decoded side (None = full resolution) and the
+# p95 latency target per image on one core, for a 1024px JPEG upload.
+# Reduced decodes (see image_decode) use JPEG DCT scaling, so small tiers
+# never materialize the full-resolution image.
+# The segment stage only runs when SEGMENTATION_ENABLED is set and adds
+# the model's latency on top of the target.
+GARMENT_TIERS = {
+    TIER_COLOR: {"stages": ("color",), "max_side": 256, "target_ms": 10},
+    TIER_COLOR_TYPE: {"stages": ("segment", "color", "type"), "max_side": 512, "target_ms": 20},
+    TIER_FULL: {"stages": ("segment", "color", "measurements", "type"), "max_side": None, "target_ms": 80},
+}
+
+def garment_cache_version() -> str:
+    """GARMENT_VERSION plus the settings that change results for the same image"""
+    return f"{GARMENT_VERSION}-seg" if settings.SEGMENTATION_ENABLED else GARMENT_VERSION
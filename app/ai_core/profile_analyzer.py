@@ -2,33 +2,38 @@
 AI System #2: Profile Analyzer
 Analyzes skin tone and user preferences from photos
 """
-import cv2
 import numpy as np
 from typing import Dict, Tuple
+from app.ai_core import pipeline_info
+from app.ai_core.color_naming import rgb_to_lab
+from app.ai_core.image_decode import decode_image
+from app.ai_core.skin_detection import skin_detector
+from app.ai_core.skin_tone import classify_skin_rgb, recommended_colors
 
 class ProfileAnalyzer:
     """Analyze user profile from photos"""
     
+    VERSION = pipeline_info.PROFILE_VERSION
+    
+    # Longest side needed for the skin tone average, larger photos are
+    # scaled down while decoding
+    ANALYSIS_MAX_SIDE = 512
+    
     def analyze_skin_tone(self, image_bytes: bytes) -> Dict:
         """
         Analyze skin tone from face photo
         
         Args:
             image_bytes: Raw image data
-            
+        
         Returns:
             Dictionary with skin tone analysis
         """
         try:
-            # Convert bytes to numpy array
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if image is None:
-                raise ValueError("Invalid image format")
+            image, decode_info = decode_image(image_bytes, self.ANALYSIS_MAX_SIDE)
             
             # Analyze skin tone
-            skin_tone, undertone = self._classify_skin_tone(image)
+            skin_tone, undertone, skin_info = self._classify_skin_tone(image)
             
             # Get recommended colors
             recommended_colors = self._get_recommended_colors(undertone)
@@ -38,9 +43,13 @@ class ProfileAnalyzer:
                 "skin_tone": skin_tone,
                 "undertone": undertone,
                 "recommended_colors": recommended_colors,
-                "confidence": 0.80
+                "confidence": skin_info["confidence"],
+                "skin_rgb": skin_info["rgb"],
+                "skin_lab": [round(float(value), 2) for value in skin_info["lab"]],
+                "skin_detection": skin_info["method"],
+                "timings": {"decode_ms": decode_info["decode_ms"], "skin_ms": skin_info["skin_ms"]}
             }
-            
+        
         except Exception as e:
             return {
                 "status": "error",
@@ -48,79 +57,30 @@ class ProfileAnalyzer:
                 "confidence": 0.0
             }
     
-    def _classify_skin_tone(self, image: np.ndarray) -> Tuple[str, str]:
+    def _classify_skin_tone(self, image: np.ndarray) -> Tuple[str, str, Dict]:
         """
         Classify skin tone (Light, Medium, Deep)
         and undertone (Warm, Cool, Neutral)
         
         Returns:
-            Tuple of (skin_tone, undertone)
+            Tuple of (skin_tone, undertone, skin detection info with the
+            mean skin color as "rgb" (unrounded, the classification input)
+            and in CIELAB as "lab")
         """
-        # Get image center (usually face area)
-        height, width, _ = image.shape
-        center_y, center_x = height // 2, width // 2
-        
-        # Extract center region (approximate face area)
-        h_margin = height // 4
-        w_margin = width // 4
-        face_region = image[
-            max(0, center_y - h_margin):min(height, center_y + h_margin),
-            max(0, center_x - w_margin):min(width, center_x + w_margin)
-        ]
-        
-        # Calculate average color
-        avg_color = cv2.mean(face_region)[:3]
+        # Average color of the skin pixels (face, or the center as fallback)
+        avg_color, skin_info = skin_detector.skin_color(image)
         
         # Convert BGR to RGB
         r, g, b = avg_color[2], avg_color[1], avg_color[0]
+        skin_tone, undertone = classify_skin_rgb(r, g, b)
+        skin_info["rgb"] = [float(r), float(g), float(b)]
+        skin_info["lab"] = rgb_to_lab(np.array([r, g, b]))
         
-        # Determine undertone based on RGB values
-        if r > b:
-            undertone = "Warm"
-        elif b > r:
-            undertone = "Cool"
-        else:
-            undertone = "Neutral"
-        
-        # Determine skin tone brightness
-        brightness = (r + g + b) / 3
-        
-        if brightness > 180:
-            skin_tone = "Light"
-        elif brightness > 120:
-            skin_tone = "Medium"
-        else:
-            skin_tone = "Deep"
-        
-        return skin_tone, undertone
+        return skin_tone, undertone, skin_info
     
     def _get_recommended_colors(self, undertone: str) -> list:
         """Get recommended color palette based on undertone"""
-        palettes = {
-            "Warm": [
-                {"name": "Coral", "hex": "#FF6B6B"},
-                {"name": "Peach", "hex": "#FFAB91"},
-                {"name": "Gold", "hex": "#FFD700"},
-                {"name": "Rust", "hex": "#B7410E"},
-                {"name": "Earth Brown", "hex": "#8B6F47"},
-            ],
-            "Cool": [
-                {"name": "Rose", "hex": "#FF69B4"},
-                {"name": "Lavender", "hex": "#E6E6FA"},
-                {"name": "Jewel Blue", "hex": "#0047AB"},
-                {"name": "Berry", "hex": "#661D5C"},
-                {"name": "Silver", "hex": "#C0C0C0"},
-            ],
-            "Neutral": [
-                {"name": "Navy", "hex": "#000080"},
-                {"name": "Burgundy", "hex": "#800020"},
-                {"name": "Olive", "hex": "#808000"},
-                {"name": "Taupe", "hex": "#B38B6D"},
-                {"name": "Black", "hex": "#000000"},
-            ]
-        }
-        
-        return palettes.get(undertone, palettes["Neutral"])
+        return recommended_colors(undertone)
 
 # Singleton instance
 profile_analyzer = ProfileAnalyzer()
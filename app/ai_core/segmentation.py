@@ -0,0 +1,131 @@
+"""
+Garment segmentation
+Background removal with one rembg (ONNX) session per process, created once
+and reused across requests. The model runs on a downscaled copy of the
+image and the mask is upsampled to the analysis size.
+"""
+import threading
+import time
+import cv2
+import numpy as np
+from typing import Dict, Optional
+from app.config import settings
+
+# Masks covering less than this share of the image are treated as a miss
+MIN_MASK_SHARE = 0.01
+
+class GarmentSegmenter:
+    """Foreground mask for garment photos"""
+    
+    def __init__(self, enabled: bool, model_name: str = "u2netp", threads: int = 1, max_side: int = 320):
+        self.enabled = enabled
+        self.model_name = model_name
+        self.threads = threads
+        self.max_side = max_side
+        self._session = None
+        self._remove = None
+        self._error: Optional[str] = None
+        self._load_ms: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def ready(self) -> bool:
+        """Session loaded and usable"""
+        return self._session is not None
+    
+    def load(self) -> bool:
+        """
+        Create the rembg session if enabled and not loaded yet
+        
+        Safe to call from several threads; the model is loaded once. A
+        missing rembg install or model error disables segmentation instead
+        of failing requests.
+        
+        Returns:
+            Whether segmentation is ready
+        """
+        if not self.enabled or self._session is not None or self._error is not None:
+            return self.ready
+        
+        with self._lock:
+            if self._session is None and self._error is None:
+                started = time.perf_counter()
+                try:
+                    # Optional dependency, only needed when segmentation is enabled
+                    from rembg import remove
+                    
+                    self._session = self._new_session()
+                    self._remove = remove
+                except Exception as e:
+                    self._error = f"{type(e).__name__}: {e}"
+                self._load_ms = round((time.perf_counter() - started) * 1000, 2)
+        
+        return self.ready
+    
+    def _new_session(self):
+        """
+        rembg session for model_name with threads ONNX threads per operator
+        
+        Built like rembg.new_session, which (as of the pinned 2.0.50) takes
+        no session options and only reads OMP_NUM_THREADS.
+        """
+        import onnxruntime
+        from rembg.sessions import sessions_class
+        from rembg.sessions.u2net import U2netSession
+        
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = self.threads
+        
+        session_class = next((sc for sc in sessions_class if sc.name() == self.model_name), U2netSession)
+        return session_class(self.model_name, options)
+    
+    def mask(self, image: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Garment mask for a BGR image
+        
+        Returns:
+            uint8 mask (255 = garment) with the image's height and width, or
+            None when segmentation is off, unavailable or finds nothing
+        """
+        if not self.load():
+            return None
+        
+        height, width = image.shape[:2]
+        scale = min(1.0, self.max_side / max(height, width))
+        small = image
+        if scale < 1.0:
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            small = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        
+        rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+        mask = np.asarray(self._remove(rgb, session=self._session, only_mask=True))
+        if mask.ndim == 3:
+            mask = mask[..., 0]
+        
+        if mask.shape != (height, width):
+            mask = cv2.resize(mask, (width, height), interpolation=cv2.INTER_LINEAR)
+        
+        mask = np.where(mask > 127, 255, 0).astype(np.uint8)
+        if cv2.countNonZero(mask) < MIN_MASK_SHARE * height * width:
+            return None
+        return mask
+    
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "model": self.model_name,
+            "threads": self.threads,
+            "max_side": self.max_side,
+            "load_ms": self._load_ms,
+            "error": self._error
+        }
+
+# Singleton instance
+garment_segmenter = GarmentSegmenter(
+    enabled=settings.SEGMENTATION_ENABLED,
+    model_name=settings.SEGMENTATION_MODEL,
+    threads=settings.SEGMENTATION_THREADS,
+    max_side=settings.SEGMENTATION_MAX_SIDE
+)
@@ -0,0 +1,157 @@
+"""
+Skin region detection
+Finds the face on a small downscaled copy of the photo, maps the box back to
+the analysis image and keeps only skin-colored pixels inside it, so hair,
+clothing and background do not leak into the skin tone average.
+"""
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from typing import Dict, Optional, Tuple
+from app.config import settings
+
+# Longest side of the level the face cascade runs on
+DETECT_MAX_SIDE = 160
+
+# Skin color bounds in YCrCb (Y is ignored so shadows and highlights still count)
+SKIN_YCRCB_LOWER = np.array([0, 133, 77], dtype=np.uint8)
+SKIN_YCRCB_UPPER = np.array([255, 173, 127], dtype=np.uint8)
+
+# Regions where fewer pixels pass the skin mask are averaged unmasked
+MIN_SKIN_SHARE = 0.15
+
+# Part of the face box that is mostly skin (cheeks, nose, forehead below
+# the hairline), as fractions of the box width and height
+FACE_INNER_BOX = (0.2, 0.25, 0.8, 0.85)
+
+# Confidence per method, the face plus skin mask path is the most reliable
+CONFIDENCE = {
+    "face": 0.9,
+    "face_unmasked": 0.75,
+    "center": 0.7,
+    "center_unmasked": 0.5,
+}
+
+CASCADE_FILE = "haarcascade_frontalface_default.xml"
+
+class SkinDetector:
+    """Skin pixel selection for skin tone analysis"""
+    
+    def __init__(self, budget_ms: float = 15.0, detect_max_side: int = DETECT_MAX_SIDE):
+        self.budget_ms = budget_ms
+        self.detect_max_side = detect_max_side
+        # CascadeClassifier is not safe to share between threads
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._runs = 0
+        self._over_budget = 0
+        self._methods: Dict[str, int] = {}
+    
+    def skin_color(self, image: np.ndarray) -> Tuple[Tuple[float, float, float], Dict]:
+        """
+        Average BGR color of the skin in a BGR photo
+        
+        Returns:
+            Tuple of (mean BGR, info with method, confidence, skin_share and
+            skin_ms)
+        """
+        started = time.perf_counter()
+        height, width = image.shape[:2]
+        
+        box = self._detect_face(image)
+        method = "face" if box is not None else "center"
+        if box is None:
+            # Middle half of the photo, usually the face area
+            box = (width // 4, height // 4, width - width // 4, height - height // 4)
+        
+        x1, y1, x2, y2 = box
+        region = image[y1:y2, x1:x2]
+        mask = skin_mask(region)
+        skin_share = cv2.countNonZero(mask) / max(1, mask.size)
+        
+        if skin_share >= MIN_SKIN_SHARE:
+            mean = cv2.mean(region, mask=mask)[:3]
+        else:
+            mean = cv2.mean(region)[:3]
+            method = f"{method}_unmasked"
+        
+        elapsed = round((time.perf_counter() - started) * 1000, 2)
+        with self._lock:
+            self._runs += 1
+            self._methods[method] = self._methods.get(method, 0) + 1
+            if elapsed > self.budget_ms:
+                self._over_budget += 1
+        
+        return mean, {
+            "method": method,
+            "confidence": CONFIDENCE[method],
+            "skin_share": round(skin_share, 3),
+            "skin_ms": elapsed
+        }
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "budget_ms": self.budget_ms,
+                "detect_max_side": self.detect_max_side,
+                "runs": self._runs,
+                "over_budget": self._over_budget,
+                "methods": dict(self._methods)
+            }
+    
+    def _detect_face(self, image: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Largest face, as the inner skin box in image coordinates
+        
+        Returns:
+            (x1, y1, x2, y2), or None when no face is found or the cascade
+            is not available in this OpenCV build
+        """
+        cascade = self._cascade()
+        if cascade is None:
+            return None
+        
+        height, width = image.shape[:2]
+        scale = min(1.0, self.detect_max_side / max(height, width))
+        small = image
+        if scale < 1.0:
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            small = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        
+        gray = cv2.equalizeHist(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))
+        faces = cascade.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=4, minSize=(24, 24))
+        if len(faces) == 0:
+            return None
+        
+        x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
+        left, top, right, bottom = FACE_INNER_BOX
+        return (
+            int((x + w * left) / scale),
+            int((y + h * top) / scale),
+            int((x + w * right) / scale),
+            int((y + h * bottom) / scale)
+        )
+    
+    def _cascade(self):
+        """This thread's face cascade, loaded on first use"""
+        if not hasattr(self._local, "cascade"):
+            cascade = None
+            # Not part of every OpenCV build
+            if hasattr(cv2, "CascadeClassifier") and hasattr(cv2, "data"):
+                path = os.path.join(cv2.data.haarcascades, CASCADE_FILE)
+                if os.path.exists(path):
+                    cascade = cv2.CascadeClassifier(path)
+                    if cascade.empty():
+                        cascade = None
+            self._local.cascade = cascade
+        return self._local.cascade
+
+def skin_mask(image: np.ndarray) -> np.ndarray:
+    """uint8 mask (255 = skin) of skin-colored pixels in a BGR image"""
+    ycrcb = cv2.cvtColor(image, cv2.COLOR_BGR2YCrCb)
+    return cv2.inRange(ycrcb, SKIN_YCRCB_LOWER, SKIN_YCRCB_UPPER)
+
+# Singleton instance
+skin_detector = SkinDetector(budget_ms=settings.SKIN_DETECTION_BUDGET_MS)
@@ -0,0 +1,231 @@
+"""
+Skin tone classification and incremental per-user profiles
+Each analyzed photo's mean skin color is folded into running CIELAB
+statistics for its user (Welford's algorithm), so retakes in different
+lighting refine one profile instead of replacing it. An update is O(1)
+and never reprocesses earlier photos. Once a profile has a few photos,
+new ones far outside its spread (bad lighting, missed face) are rejected.
+The profile is classified from the running mean of the photos' RGB, the
+same input as a single photo, so one photo reproduces its own result.
+Imports no cv2, profiles live in the API process.
+"""
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from app.config import settings
+
+# Photos needed before outliers are rejected and a profile can converge
+MIN_PHOTOS = 3
+
+# A photo is an outlier when it is more than OUTLIER_SIGMAS times the
+# profile's spread away from its mean, and at least OUTLIER_MIN_DELTA_E
+# (CIE76), so tight profiles still accept normal lighting variation
+OUTLIER_SIGMAS = 2.5
+OUTLIER_MIN_DELTA_E = 6.0
+
+# Converged once the standard error of the mean drops below this Delta E
+# (about a just noticeable difference)
+CONVERGED_DELTA_E = 2.0
+
+# Content hashes remembered per user, resubmitted photos are not counted twice
+RECENT_PHOTOS = 32
+
+# Recommended colors per undertone
+UNDERTONE_PALETTES = {
+    "Warm": [
+        {"name": "Coral", "hex": "#FF6B6B"},
+        {"name": "Peach", "hex": "#FFAB91"},
+        {"name": "Gold", "hex": "#FFD700"},
+        {"name": "Rust", "hex": "#B7410E"},
+        {"name": "Earth Brown", "hex": "#8B6F47"},
+    ],
+    "Cool": [
+        {"name": "Rose", "hex": "#FF69B4"},
+        {"name": "Lavender", "hex": "#E6E6FA"},
+        {"name": "Jewel Blue", "hex": "#0047AB"},
+        {"name": "Berry", "hex": "#661D5C"},
+        {"name": "Silver", "hex": "#C0C0C0"},
+    ],
+    "Neutral": [
+        {"name": "Navy", "hex": "#000080"},
+        {"name": "Burgundy", "hex": "#800020"},
+        {"name": "Olive", "hex": "#808000"},
+        {"name": "Taupe", "hex": "#B38B6D"},
+        {"name": "Black", "hex": "#000000"},
+    ]
+}
+
+# Outcomes of adding a photo to a profile
+PHOTO_ADDED = "added"
+PHOTO_REJECTED = "rejected"
+PHOTO_DUPLICATE = "duplicate"
+
+def classify_skin_rgb(r: float, g: float, b: float) -> Tuple[str, str]:
+    """
+    Classify a mean skin color
+    
+    Returns:
+        Tuple of (skin_tone: Light/Medium/Deep, undertone: Warm/Cool/Neutral)
+    """
+    if r > b:
+        undertone = "Warm"
+    elif b > r:
+        undertone = "Cool"
+    else:
+        undertone = "Neutral"
+    
+    brightness = (r + g + b) / 3
+    
+    if brightness > 180:
+        skin_tone = "Light"
+    elif brightness > 120:
+        skin_tone = "Medium"
+    else:
+        skin_tone = "Deep"
+    
+    return skin_tone, undertone
+
+def recommended_colors(undertone: str) -> list:
+    """Recommended color palette for an undertone"""
+    return UNDERTONE_PALETTES.get(undertone, UNDERTONE_PALETTES["Neutral"])
+
+class SkinToneProfile:
+    """Running mean and variance of one user's skin color in CIELAB"""
+    
+    def __init__(self):
+        self.photos = 0
+        self.mean = np.zeros(3)
+        self.m2 = np.zeros(3)  # Sums of squared deviations per channel
+        self.mean_rgb = np.zeros(3)  # Classification input
+        self.confidence_sum = 0.0
+        self.rejected = 0
+        self.recent: "OrderedDict[str, None]" = OrderedDict()
+    
+    def spread(self) -> float:
+        """RMS Delta E of the photos from the mean"""
+        if self.photos < 2:
+            return 0.0
+        return float(np.sqrt(self.m2.sum() / (self.photos - 1)))
+    
+    def standard_error(self) -> Optional[float]:
+        """Delta E uncertainty of the mean, None with a single photo"""
+        if self.photos < 2:
+            return None
+        return self.spread() / float(np.sqrt(self.photos))
+    
+    def add(self, digest: str, lab: np.ndarray, rgb: np.ndarray, confidence: float) -> str:
+        """Fold one photo into the profile, returns a PHOTO_* outcome"""
+        if digest in self.recent:
+            self.recent.move_to_end(digest)
+            return PHOTO_DUPLICATE
+        self.recent[digest] = None
+        while len(self.recent) > RECENT_PHOTOS:
+            self.recent.popitem(last=False)
+        
+        if self.photos >= MIN_PHOTOS:
+            distance = float(np.linalg.norm(lab - self.mean))
+            if distance > max(OUTLIER_SIGMAS * self.spread(), OUTLIER_MIN_DELTA_E):
+                self.rejected += 1
+                return PHOTO_REJECTED
+        
+        self.photos += 1
+        delta = lab - self.mean
+        self.mean += delta / self.photos
+        self.m2 += delta * (lab - self.mean)
+        self.mean_rgb += (rgb - self.mean_rgb) / self.photos
+        self.confidence_sum += confidence
+        return PHOTO_ADDED
+    
+    def view(self) -> Dict:
+        """Aggregate classification with its convergence"""
+        skin_tone, undertone = classify_skin_rgb(*self.mean_rgb.tolist())
+        standard_error = self.standard_error()
+        converged = self.photos >= MIN_PHOTOS and standard_error <= CONVERGED_DELTA_E
+        
+        # Mean photo confidence, discounted until MIN_PHOTOS agree within CONVERGED_DELTA_E
+        confidence = self.confidence_sum / self.photos * min(1.0, self.photos / MIN_PHOTOS)
+        if standard_error is not None and standard_error > CONVERGED_DELTA_E:
+            confidence *= CONVERGED_DELTA_E / standard_error
+        
+        return {
+            "skin_tone": skin_tone,
+            "undertone": undertone,
+            "recommended_colors": recommended_colors(undertone),
+            "confidence": round(confidence, 2),
+            "lab": [round(float(value), 2) for value in self.mean],
+            "photos": self.photos,
+            "rejected": self.rejected,
+            "spread_delta_e": round(self.spread(), 2),
+            "standard_error_delta_e": None if standard_error is None else round(standard_error, 2),
+            "converged": converged
+        }
+
+class SkinToneProfiles:
+    """Skin tone profiles of recently active users"""
+    
+    def __init__(self, max_users: int = 10000):
+        self.max_users = max_users
+        self._profiles: "OrderedDict[str, SkinToneProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._added = 0
+        self._rejected = 0
+        self._duplicates = 0
+    
+    def update(self, user_id: str, digest: str, lab, rgb, confidence: float) -> Tuple[Dict, str]:
+        """
+        Add one analyzed photo to a user's profile
+        
+        Args:
+            user_id: Profile owner
+            digest: Content hash of the photo
+            lab: Mean skin color of the photo, CIELAB
+            rgb: Mean skin color of the photo, RGB as classified
+            confidence: Confidence of the photo's analysis
+        
+        Returns:
+            Tuple of (profile view, PHOTO_* outcome)
+        """
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            if profile is None:
+                profile = self._profiles[user_id] = SkinToneProfile()
+                while len(self._profiles) > self.max_users:
+                    self._profiles.popitem(last=False)
+            else:
+                self._profiles.move_to_end(user_id)
+            
+            outcome = profile.add(
+                digest, np.asarray(lab, dtype=np.float64), np.asarray(rgb, dtype=np.float64), confidence
+            )
+            if outcome == PHOTO_ADDED:
+                self._added += 1
+            elif outcome == PHOTO_REJECTED:
+                self._rejected += 1
+            else:
+                self._duplicates += 1
+            return profile.view(), outcome
+    
+    def get(self, user_id: str) -> Optional[Dict]:
+        """A user's profile view, None if the user has none"""
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            return None if profile is None else profile.view()
+    
+    def reset(self, user_id: str) -> bool:
+        """Forget a user's profile, returns whether there was one"""
+        with self._lock:
+            return self._profiles.pop(user_id, None) is not None
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "users": len(self._profiles),
+                "max_users": self.max_users,
+                "added": self._added,
+                "rejected": self._rejected,
+                "duplicates": self._duplicates
+            }
+
+# Singleton instance
+skin_tone_profiles = SkinToneProfiles(max_users=settings.SKIN_PROFILE_MAX_USERS)
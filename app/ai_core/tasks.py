@@ -0,0 +1,98 @@
+"""
+AI core task entry points
+Module-level functions so the worker pool can ship them to
+worker processes by reference instead of pickling processor instances.
+The processors (and cv2) are imported on first use, so importing this
+module stays cheap for the API process.
+"""
+import time
+from typing import Dict, Optional
+
+# Timings of this process's last warm-up
+_warm_up_timings: Dict[str, float] = {}
+
+def process_garment(image_bytes: bytes, tier: str = "full", image_digest: Optional[str] = None) -> Dict:
+    """
+    Run the garment pipeline (AI System #1) for the given tier
+    
+    With image_digest, the upload and its thumbnails are also written to
+    the image store from the image decoded for analysis. A failed write
+    does not fail the scan, the API retries it through store_image.
+    """
+    from app.ai_core.garment_processor import garment_processor
+    from app.services.image_store import image_store
+    
+    on_decoded = None
+    if image_digest is not None and image_store.enabled:
+        def on_decoded(image, decode_info):
+            try:
+                image_store.save(image_digest, image_bytes, image, decode_info["scale"])
+            except (ValueError, OSError):
+                pass
+    
+    return garment_processor.process_garment(image_bytes, tier, on_decoded)
+
+def store_image(image_bytes: bytes, image_digest: str) -> bool:
+    """Write an upload and its thumbnails to the image store, decoding it again"""
+    from app.services.image_store import image_store
+    return image_store.save(image_digest, image_bytes)
+
+def analyze_skin_tone(image_bytes: bytes) -> Dict:
+    """Run the skin tone analysis (AI System #2)"""
+    from app.ai_core.profile_analyzer import profile_analyzer
+    return profile_analyzer.analyze_skin_tone(image_bytes)
+
+def warm_up() -> Dict:
+    """
+    Run a small synthetic image through every pipeline
+    
+    Runs in every worker as it starts (see init_worker), so imports, OpenCV's lazy setup,
+    lookup tables, the face cascade and the segmentation model are loaded
+    before the worker takes real traffic.
+    
+    Returns:
+        Milliseconds spent per step
+    """
+    timings = {}
+    
+    started = time.perf_counter()
+    import cv2
+    import numpy as np
+    from app.ai_core.garment_processor import GarmentProcessor, garment_processor
+    from app.ai_core.profile_analyzer import profile_analyzer
+    from app.ai_core.segmentation import garment_segmenter
+    timings["import_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    
+    started = time.perf_counter()
+    garment_segmenter.load()
+    timings["models_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    
+    started = time.perf_counter()
+    image = np.full((96, 64, 3), 235, dtype=np.uint8)
+    image[16:80, 12:52] = (60, 90, 180)
+    _, encoded = cv2.imencode(".jpg", image)
+    data = encoded.tobytes()
+    for tier in GarmentProcessor.TIERS:
+        garment_processor.process_garment(data, tier)
+    profile_analyzer.analyze_skin_tone(data)
+    timings["pipelines_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    
+    return timings
+
+def init_worker():
+    """Worker pool initializer, a failed warm-up must not break the pool"""
+    try:
+        _warm_up_timings.update(warm_up())
+    except Exception:
+        # The same error surfaces on the first real task
+        pass
+
+def worker_stats() -> Dict:
+    """Warm-up timings and model state of the worker running this task"""
+    from app.ai_core.segmentation import garment_segmenter
+    from app.ai_core.skin_detection import skin_detector
+    return {
+        "timings": dict(_warm_up_timings),
+        "segmentation": garment_segmenter.stats(),
+        "skin_detection": skin_detector.stats()
+    }
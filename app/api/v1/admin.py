@@ -0,0 +1,59 @@
+"""Admin endpoints (request profiles), enabled by ADMIN_TOKEN"""
+import hmac
+import io
+import marshal
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+from app.config import settings
+from app.services.profiling import profile_store
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Reject requests without the admin token (404 when no token is configured)"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.get("/admin/profiles")
+async def list_profiles():
+    """Recent request profiles, newest first"""
+    return {
+        "sample_rate": settings.PROFILING_SAMPLE_RATE,
+        "profiles": profile_store.list()
+    }
+
+@router.get("/admin/profiles/{profile_id}")
+async def get_profile(
+    profile_id: int,
+    format: str = Query("prof", pattern="^(prof|text)$", description="prof (pstats file) or text"),
+    limit: int = Query(40, ge=1, le=500, description="Functions listed in text format")
+):
+    """
+    Download one request profile
+    
+    The prof format is a pstats file for pstats, snakeviz or similar
+    tools; text lists the slowest functions by cumulative time.
+    """
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    stats = profile.stats()
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Request ran no profiled work")
+    
+    if format == "text":
+        output = io.StringIO()
+        stats.stream = output
+        stats.sort_stats("cumulative").print_stats(limit)
+        return PlainTextResponse(output.getvalue())
+    
+    return Response(
+        content=marshal.dumps(stats.stats),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'}
+    )
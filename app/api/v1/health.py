@@ -1,26 +1,128 @@
 """Health check endpoints"""
 from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from app.ai_core.color_index import wardrobe_color_index
+from app.ai_core.curation import weekly_curator
+from app.ai_core.mixmatch_logic import mixmatch_recommender
+from app.ai_core.skin_tone import skin_tone_profiles
+from app.services.executor import analysis_executor
+from app.services.image_store import image_store
+from app.services.jobs import job_manager
+from app.services.preference_buffer import preference_buffer
+from app.services.rate_limit import rate_limiter
+from app.services.result_cache import result_cache
+from app.services.wardrobe_store import wardrobe_store
+from app.services.warmup import warmup
 
 router = APIRouter()
 
+def _model_stats(mode: str):
+    """
+    Segmentation and skin detection stats from where the models run
+    
+    Thread workers share the API process's models, so their stats are
+    live. Process workers load their own; those are the state one worker
+    reported after its warm-up (empty until then), marked "source": "worker_warmup".
+    """
+    if mode == "process":
+        report = warmup.worker
+        if not report:
+            return {}, {}
+        return (
+            {**report["segmentation"], "source": "worker_warmup"},
+            {**report["skin_detection"], "source": "worker_warmup"}
+        )
+    
+    # Imported here so health checks do not load cv2 in a process-mode API
+    from app.ai_core.segmentation import garment_segmenter
+    from app.ai_core.skin_detection import skin_detector
+    return (
+        {**garment_segmenter.stats(), "source": "live"},
+        {**skin_detector.stats(), "source": "live"}
+    )
+
 @router.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """
+    Health check endpoint
+    
+    Answers 503 until the startup warm-up has finished, so deploys only
+    route traffic to warm instances.
+    """
+    if not warmup.ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "starting", "message": "LokaFit Backend is warming up", "version": "1.0.0"}
+        )
+    
     return {
         "status": "healthy",
         "message": "LokaFit Backend is running",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "startup_ms": warmup.stats()["timings"].get("startup_ms")
     }
 
 @router.get("/health/detailed")
 async def health_check_detailed():
-    """Detailed health check"""
+    """
+    Detailed health check
+    
+    Reports the state of each component. The status is "degraded" when
+    the worker pool is saturated, the wardrobe database does not answer or
+    preference writes are failing.
+    """
+    workers = analysis_executor.stats()
+    preferences = preference_buffer.stats()
+    segmentation, skin_detection = _model_stats(workers["mode"])
+    database_ok = await run_in_threadpool(wardrobe_store.ping)
+    
+    if workers["pending"] >= workers["capacity"]:
+        ai_state = "saturated"
+    elif workers["pending"] > 0:
+        ai_state = "busy"
+    else:
+        ai_state = "ready"
+    
+    if not segmentation:
+        segmentation_state = "loading"
+    elif not segmentation["enabled"]:
+        segmentation_state = "disabled"
+    elif segmentation["error"]:
+        segmentation_state = "unavailable"
+    else:
+        segmentation_state = "ready" if segmentation["ready"] else "loading"
+    
+    if preferences["failures"] and preferences["pending"]:
+        preferences_state = "failing"
+    else:
+        preferences_state = "running" if preferences["running"] else "stopped"
+    
+    services = {
+        "api": "running" if warmup.ready else "starting",
+        "ai_garment": ai_state,
+        "ai_profile": ai_state,
+        "ai_recommend": "ready",
+        "segmentation": segmentation_state,
+        "database": "ready" if database_ok else "unavailable",
+        "preferences": preferences_state
+    }
+    degraded = not warmup.ready or ai_state == "saturated" or not database_ok or preferences_state == "failing"
+    
     return {
-        "status": "healthy",
-        "services": {
-            "api": "running",
-            "ai_garment": "ready",
-            "ai_profile": "ready",
-            "ai_recommend": "ready"
-        }
+        "status": "degraded" if degraded else "healthy",
+        "services": services,
+        "startup": warmup.stats(),
+        "segmentation": segmentation,
+        "skin_detection": skin_detection,
+        "skin_profiles": skin_tone_profiles.stats(),
+        "workers": workers,
+        "rate_limit": rate_limiter.stats(),
+        "cache": result_cache.stats(),
+        "color_index": wardrobe_color_index.stats(),
+        "curation": weekly_curator.stats(),
+        "instant_match_memo": mixmatch_recommender.stats(),
+        "preferences": preferences,
+        "jobs": job_manager.stats(),
+        "image_store": image_store.stats()
     }
@@ -0,0 +1,28 @@
+"""Asynchronous job status endpoints"""
+from fastapi import APIRouter, HTTPException, Query
+from app.config import settings
+from app.services.jobs import job_manager
+
+router = APIRouter()
+
+@router.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, description="Seconds to wait for the job to finish (long polling)")
+):
+    """
+    Status of a scan or profile job
+    
+    status is queued, running, succeeded (with result) or failed (with
+    error.status_code and error.detail). With wait, the request is held
+    until the job finishes or wait seconds pass, capped at
+    JOBS_MAX_WAIT_SECONDS. Finished jobs expire after
+    JOBS_RETENTION_SECONDS.
+    """
+    
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    
+    job = await job_manager.wait(job, min(wait, settings.JOBS_MAX_WAIT_SECONDS))
+    return job.view()
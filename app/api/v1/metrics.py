@@ -0,0 +1,52 @@
+"""Prometheus metrics endpoint"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.ai_core.color_index import wardrobe_color_index
+from app.ai_core.curation import weekly_curator
+from app.ai_core.mixmatch_logic import mixmatch_recommender
+from app.ai_core.skin_tone import skin_tone_profiles
+from app.services.executor import analysis_executor
+from app.services.jobs import job_manager
+from app.services.metrics import registry
+from app.services.preference_buffer import preference_buffer
+from app.services.rate_limit import rate_limiter
+from app.services.result_cache import result_cache
+from app.services.warmup import warmup
+
+router = APIRouter()
+
+def _skin_detection_stats():
+    # Process workers keep their own counters, the API process's would
+    # always read 0 (skin_ms still arrives with each result as a stage timing)
+    if analysis_executor.mode == "process":
+        return {}
+    # Imported on scrape so the API process does not load cv2 at startup
+    from app.ai_core.skin_detection import skin_detector
+    return skin_detector.stats()
+
+def _worker_pool_stats():
+    stats = analysis_executor.stats()
+    # Queue length per priority as flat fields
+    return {**stats, **{f"waiting_{name}": count for name, count in stats["waiting"].items()}}
+
+def _startup_stats():
+    stats = warmup.stats()
+    return {"ready": stats["ready"], **stats["timings"]}
+
+# Queue, cache and index state, read from each component at scrape time
+registry.add_stats_source("worker_pool", _worker_pool_stats)
+registry.add_stats_source("rate_limit", rate_limiter.stats)
+registry.add_stats_source("result_cache", result_cache.stats)
+registry.add_stats_source("color_index", wardrobe_color_index.stats)
+registry.add_stats_source("curation_cache", weekly_curator.stats)
+registry.add_stats_source("instant_match_memo", mixmatch_recommender.stats)
+registry.add_stats_source("preferences", preference_buffer.stats)
+registry.add_stats_source("jobs", job_manager.stats)
+registry.add_stats_source("skin_detection", _skin_detection_stats)
+registry.add_stats_source("skin_profiles", skin_tone_profiles.stats)
+registry.add_stats_source("startup", _startup_stats)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Metrics in the Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,12 +1,86 @@
 """Profile analysis endpoints (AI System #2)"""
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.ai_core.profile_analyzer import profile_analyzer
+from typing import Optional, Tuple
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Response
+from app.ai_core import pipeline_info, tasks
+from app.ai_core.skin_tone import skin_tone_profiles
 from app.config import settings
+from app.services.executor import analysis_executor, PRIORITY_BACKGROUND, PRIORITY_NORMAL
+from app.services.ingestion import check_content_type, read_upload
+from app.services.jobs import job_manager
+from app.services.result_cache import content_hash_async, result_cache
 
 router = APIRouter()
 
+async def _analyze_cached(contents: memoryview, priority: int = PRIORITY_NORMAL) -> Tuple[str, dict]:
+    """
+    Run the skin tone analysis, reusing results for identical uploads
+    
+    Returns:
+        Tuple of (content_hash, analyzer result)
+    """
+    digest = await content_hash_async(contents)
+    key = result_cache.make_key("profile", pipeline_info.PROFILE_VERSION, digest)
+    result = await result_cache.get_or_compute(
+        key,
+        lambda: analysis_executor.run(tasks.analyze_skin_tone, contents, priority=priority)
+    )
+    return digest, result
+
+def _profile_response(result: dict) -> dict:
+    """Build the public skin tone response from an analyzer result"""
+    return {
+        "skin_tone": result["skin_tone"],
+        "undertone": result["undertone"],
+        "recommended_colors": result["recommended_colors"],
+        "confidence": result["confidence"]
+    }
+
+async def _skin_tone(
+    filename: str,
+    contents: memoryview,
+    priority: int = PRIORITY_NORMAL,
+    user_id: Optional[str] = None
+) -> dict:
+    """
+    Skin tone response for one upload
+    
+    With user_id, the photo is added to the user's multi-photo profile and
+    the response carries the profile's aggregate classification, with
+    this photo's own result under "photo".
+    """
+    
+    # Analyze skin tone in the worker pool (cached by content)
+    digest, result = await _analyze_cached(contents, priority)
+    
+    if result["status"] != "success":
+        raise HTTPException(
+            status_code=400,
+            detail=result.get("message", "Failed to analyze skin tone")
+        )
+    
+    photo = _profile_response(result)
+    
+    if user_id is None:
+        return {"user_id": f"user_{filename.split('.')[0]}", **photo}
+    
+    profile, outcome = skin_tone_profiles.update(
+        user_id, digest, result["skin_lab"], result["skin_rgb"], result["confidence"]
+    )
+    return {
+        "user_id": user_id,
+        "skin_tone": profile.pop("skin_tone"),
+        "undertone": profile.pop("undertone"),
+        "recommended_colors": profile.pop("recommended_colors"),
+        "confidence": profile.pop("confidence"),
+        "photo": {**photo, "status": outcome},
+        "profile": profile
+    }
+
 @router.post("/profile/skin-tone")
-async def analyze_skin_tone(file: UploadFile = File(...)):
+async def analyze_skin_tone(
+    file: UploadFile = File(...),
+    user_id: Optional[str] = Query(None, description="Add the photo to this user's skin tone profile")
+):
     """
     Analyze user's skin tone from face photo
     
@@ -14,49 +88,72 @@ async def analyze_skin_tone(file: UploadFile = File(...)):
     - Classifies skin tone (Light, Medium, Deep)
     - Determines undertone (Warm, Cool, Neutral)
     - Returns recommended color palette
+    - With user_id, refines the user's profile across photos and returns
+      its aggregate classification and convergence
     """
     
-    # Validate file
-    if file.content_type not in ["image/jpeg", "image/png", "image/webp"]:
-        raise HTTPException(
-            status_code=400,
-            detail="Invalid file type. Accepted: JPEG, PNG, WebP"
-        )
+    # Validate and read file
+    check_content_type(file.content_type)
+    contents = await read_upload(file)
     
-    # Read file
-    contents = await file.read()
+    return await _skin_tone(file.filename, contents, user_id=user_id)
+
+@router.get("/profile/{user_id}/skin-tone")
+def get_skin_tone_profile(user_id: str):
+    """Aggregate skin tone of the photos added to a user's profile"""
     
-    if len(contents) > settings.MAX_UPLOAD_SIZE:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File too large. Max size: {settings.MAX_UPLOAD_SIZE} bytes"
-        )
+    profile = skin_tone_profiles.get(user_id)
     
-    # Analyze skin tone
-    result = profile_analyzer.analyze_skin_tone(contents)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Skin tone profile not found")
     
-    if result["status"] != "success":
-        raise HTTPException(
-            status_code=400,
-            detail=result.get("message", "Failed to analyze skin tone")
-        )
+    return {"user_id": user_id, **profile}
+
+@router.delete("/profile/{user_id}/skin-tone")
+def reset_skin_tone_profile(user_id: str):
+    """Forget a user's skin tone profile, the next photo starts a new one"""
     
-    return {
-        "user_id": f"user_{file.filename.split('.')[0]}",
-        "skin_tone": result["skin_tone"],
-        "undertone": result["undertone"],
-        "recommended_colors": result["recommended_colors"],
-        "confidence": result["confidence"]
-    }
+    if not skin_tone_profiles.reset(user_id):
+        raise HTTPException(status_code=404, detail="Skin tone profile not found")
+    
+    return {"user_id": user_id, "deleted": True}
+
+@router.post("/profile/skin-tone/jobs", status_code=202)
+async def submit_skin_tone_job(
+    response: Response,
+    file: UploadFile = File(...),
+    user_id: Optional[str] = Query(None, description="Add the photo to this user's skin tone profile")
+):
+    """
+    Analyze a skin tone photo in the background
+    
+    Returns a job id right away; fetch the result (the /profile/skin-tone
+    response) from /jobs/{job_id}.
+    """
+    
+    check_content_type(file.content_type)
+    contents = await read_upload(file)
+    
+    digest = await content_hash_async(contents)
+    job = job_manager.submit(
+        "skin_tone",
+        lambda: _skin_tone(file.filename, contents, PRIORITY_BACKGROUND, user_id),
+        key=f"skin_tone:{user_id}:{file.filename}:{digest}"
+    )
+    
+    status_url = f"{settings.API_V1_STR}/jobs/{job.job_id}"
+    response.headers["Location"] = status_url
+    return {"job_id": job.job_id, "status": job.status, "status_url": status_url}
 
 @router.post("/profile/analyze")
 async def analyze_full_profile(file: UploadFile = File(...)):
     """Full profile analysis (skin tone + color palette)"""
     
-    contents = await file.read()
-    result = profile_analyzer.analyze_skin_tone(contents)
+    check_content_type(file.content_type)
+    contents = await read_upload(file)
+    _, result = await _analyze_cached(contents)
     
     if result["status"] != "success":
         raise HTTPException(status_code=400, detail=result.get("message"))
     
-    return result
+    return {"status": result["status"], **_profile_response(result)}
@@ -1,13 +1,49 @@
 """Recommendation endpoints (AI System #3)"""
-from fastapi import APIRouter, HTTPException, Query
-from app.ai_core.mixmatch_logic import mixmatch_recommender
+import re
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from app.ai_core.color_index import wardrobe_color_index
+from app.ai_core.curation import weekly_curator
+from app.ai_core.mixmatch_logic import HEX_COLOR_PATTERN, mixmatch_recommender
+from app.config import settings
+from app.services.http_cache import body_etag, etag_matches, make_etag, not_modified
+from app.services.preference_buffer import preference_buffer
 
 router = APIRouter()
 
+ISO_WEEK_PATTERN = re.compile(r"^\d{4}-W(0[1-9]|[1-4]\d|5[0-3])$")
+
+class InstantMatchBatchRequest(BaseModel):
+    """Body for batch instant matching"""
+    item_colors: List[str] = Field(..., description="Item colors in hex format (e.g., [\"#FF0000\"])")
+    undertone: str = Field("Neutral", description="User undertone: Warm, Cool, or Neutral")
+    user_id: Optional[str] = Field(None, description="Attach matching garments from this user's wardrobe")
+
+def _attach_wardrobe_matches(user_id: str, results: List[dict]):
+    """Add the closest owned garments to every recommended color"""
+    recommendations = [
+        recommendation
+        for result in results if result["status"] == "success"
+        for recommendation in result["recommendations"]
+    ]
+    matches = wardrobe_color_index.match_colors(
+        user_id,
+        [recommendation["color_hex"] for recommendation in recommendations],
+        k=settings.WARDROBE_MATCH_COUNT,
+        max_distance=settings.WARDROBE_MATCH_MAX_DISTANCE
+    )
+    for recommendation, owned in zip(recommendations, matches):
+        recommendation["wardrobe_matches"] = owned
+
 @router.get("/recommend/instant")
 async def get_instant_match(
+    request: Request,
+    response: Response,
     item_color: str = Query(..., description="Item color in hex format (e.g., #FF0000)"),
-    undertone: str = Query("Neutral", description="User undertone: Warm, Cool, or Neutral")
+    undertone: str = Query("Neutral", description="User undertone: Warm, Cool, or Neutral"),
+    user_id: Optional[str] = Query(None, description="Attach matching garments from this user's wardrobe")
 ):
     """
     Get instant matching recommendations using color theory
@@ -16,10 +52,18 @@ async def get_instant_match(
     - Uses complementary, analogous, and triadic color schemes
     - Filters by user undertone
     - Returns top 5 recommendations
+    - With user_id, re-ranks by the user's liked/disliked hues and lists
+      the closest owned garments for each recommendation
+    
+    Responses carry a strong ETag and answer If-None-Match with 304.
+    Without user_id the response only depends on the query, so it is
+    public and cacheable for RECOMMEND_CACHE_MAX_AGE seconds; with user_id
+    it is private and must be revalidated.
     
     Query Parameters:
     - item_color: Current item color in hex format
     - undertone: User's undertone (Warm, Cool, Neutral)
+    - user_id: Optional wardrobe owner
     """
     
     # Validate undertone
@@ -36,7 +80,17 @@ async def get_instant_match(
             detail="Color must be in hex format (e.g., #FF0000)"
         )
     
-    result = mixmatch_recommender.get_instant_match(item_color, undertone)
+    if user_id is None:
+        # Known before computing anything, repeat requests cost a hash
+        etag = make_etag(
+            mixmatch_recommender.VERSION, mixmatch_recommender.color_step, item_color, undertone
+        )
+        cache_control = f"public, max-age={settings.RECOMMEND_CACHE_MAX_AGE}"
+        if etag_matches(request, etag):
+            return not_modified(etag, cache_control)
+    
+    preferences = preference_buffer.preference_vector(user_id) if user_id is not None else None
+    result = mixmatch_recommender.get_instant_match(item_color, undertone, preferences)
     
     if result["status"] != "success":
         raise HTTPException(
@@ -44,17 +98,61 @@ async def get_instant_match(
             detail=result.get("message", "Failed to generate recommendations")
         )
     
+    if user_id is not None:
+        await run_in_threadpool(_attach_wardrobe_matches, user_id, [result])
+        # Preferences and wardrobe change over time, validate by content
+        etag = body_etag(result)
+        cache_control = "private, no-cache"
+        if etag_matches(request, etag):
+            return not_modified(etag, cache_control)
+    
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return result
+
+@router.post("/recommend/instant/batch")
+async def get_instant_match_batch(request: InstantMatchBatchRequest):
+    """
+    Get instant matching recommendations for many item colors at once
+    
+    Same rules as /recommend/instant, computed as array operations over
+    all colors. Results keep the input order; an invalid color gets a
+    per-item error entry instead of failing the request.
+    """
+    
+    if request.undertone not in ["Warm", "Cool", "Neutral"]:
+        raise HTTPException(
+            status_code=400,
+            detail="Undertone must be: Warm, Cool, or Neutral"
+        )
+    
+    if len(request.item_colors) > settings.RECOMMEND_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many colors. Max per batch: {settings.RECOMMEND_BATCH_MAX_ITEMS}"
+        )
+    
+    preferences = preference_buffer.preference_vector(request.user_id) if request.user_id is not None else None
+    result = mixmatch_recommender.get_instant_matches(request.item_colors, request.undertone, preferences)
+    
+    if request.user_id is not None:
+        await run_in_threadpool(_attach_wardrobe_matches, request.user_id, result["results"])
+    
     return result
 
 @router.get("/recommend/weekly")
 async def get_weekly_curation(
     user_id: str = Query(..., description="User ID"),
-    undertone: str = Query("Neutral", description="User undertone")
+    undertone: str = Query("Neutral", description="User undertone"),
+    week: Optional[str] = Query(None, description="ISO week (e.g., 2025-W01), defaults to the current week")
 ):
     """
     Get weekly outfit curation recommendations
     
-    This combines multiple color theory rules for diverse suggestions
+    Builds one outfit per weekday from the user's wardrobe with the
+    MixMatch harmony rules. Falls back to a starter week until the
+    wardrobe has at least one top and one bottom. Results are cached per
+    user and week until the wardrobe changes.
     """
     
     if undertone not in ["Warm", "Cool", "Neutral"]:
@@ -63,45 +161,40 @@ async def get_weekly_curation(
             detail="Undertone must be: Warm, Cool, or Neutral"
         )
     
-    return {
-        "user_id": user_id,
-        "week": "2025-W01",
-        "recommendations": [
-            {
-                "day": "Monday",
-                "outfit_colors": ["#FF6B6B", "#FFFFFF", "#2C3E50"],
-                "theme": "Professional"
-            },
-            {
-                "day": "Tuesday",
-                "outfit_colors": ["#3498DB", "#ECF0F1", "#34495E"],
-                "theme": "Casual"
-            },
-            {
-                "day": "Wednesday",
-                "outfit_colors": ["#E74C3C", "#FFD700", "#2C3E50"],
-                "theme": "Bold"
-            },
-            {
-                "day": "Thursday",
-                "outfit_colors": ["#9B59B6", "#ECF0F1", "#34495E"],
-                "theme": "Elegant"
-            },
-            {
-                "day": "Friday",
-                "outfit_colors": ["#F39C12", "#FFFFFF", "#2C3E50"],
-                "theme": "Warm"
-            },
-        ]
-    }
+    if week is not None and not ISO_WEEK_PATTERN.match(week):
+        raise HTTPException(
+            status_code=400,
+            detail="Week must be in ISO format (e.g., 2025-W01)"
+        )
+    
+    return await run_in_threadpool(weekly_curator.get_week, user_id, undertone, week)
 
 @router.post("/recommend/save-preference")
 async def save_recommendation_preference(
     user_id: str = Query(...),
     item_id: str = Query(...),
-    liked: bool = Query(True)
+    liked: bool = Query(True),
+    color_hex: Optional[str] = Query(None, description="Color of the item, used to learn hue preferences")
 ):
-    """Save user preference for future recommendations"""
+    """
+    Save user preference for future recommendations
+    
+    Events are buffered and written in batches; the user's hue preferences
+    update immediately and re-rank /recommend/instant. Without color_hex,
+    the color is taken from the user's wardrobe when it is already loaded.
+    """
+    
+    if color_hex is not None and not HEX_COLOR_PATTERN.match(color_hex):
+        raise HTTPException(
+            status_code=400,
+            detail="Color must be in hex format (e.g., #FF0000)"
+        )
+    
+    if color_hex is None:
+        garment = wardrobe_color_index.find_loaded(user_id, item_id)
+        color_hex = garment["color_hex"] if garment else None
+    
+    preference_buffer.record(user_id, item_id, liked, color_hex)
     
     return {
         "status": "success",
@@ -1,40 +1,131 @@
 """Garment scanning endpoints (AI System #1)"""
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.ai_core.garment_processor import garment_processor
+import asyncio
+import json
+import logging
+from typing import List, Optional, Tuple, Union
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from app.ai_core import pipeline_info, tasks
 from app.config import settings
-import io
+from app.services.executor import (
+    analysis_executor, WorkerPoolFull, WorkerTimeout,
+    PRIORITY_BACKGROUND, PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL
+)
+from app.services.image_store import image_extension, image_store
+from app.services.ingestion import check_content_type, read_upload
+from app.services.jobs import job_manager
+from app.services.rate_limit import rate_limiter
+from app.services.result_cache import content_hash_async, result_cache
+from app.services.wardrobe_store import wardrobe_store
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.post("/scan/accurate")
-async def scan_garment_accurate(file: UploadFile = File(...)):
+# Worker pool priority per tier, cheaper tiers run first under load
+TIER_PRIORITY = {
+    pipeline_info.TIER_COLOR: PRIORITY_HIGH,
+    pipeline_info.TIER_COLOR_TYPE: PRIORITY_NORMAL,
+    pipeline_info.TIER_FULL: PRIORITY_LOW,
+}
+
+def _garment_response(
+    filename: str,
+    result: dict,
+    garment_id: Optional[str] = None,
+    images: Optional[dict] = None
+) -> dict:
     """
-    Scan garment image with accurate color extraction
+    Build the public scan response from a processor result
     
-    AI System #1: Garment Processor
-    - Extracts dominant color using KMeans
-    - Measures garment dimensions
-    - Classifies garment type
+    Args:
+        images: image_url and thumbnails of the stored upload (see
+            _store_images), None keeps the plain /images/{filename} URL
     """
+    response = {
+        "garment_id": garment_id or f"garment_{filename.split('.')[0]}",
+        "color_hex": result["color_hex"],
+        "color_name": result["color_name"],
+        "palette": result["palette"],
+        "garment_type": result.get("garment_type"),
+        "measurements": result.get("measurements"),
+        "confidence": result["confidence"],
+        "image_url": f"/images/{filename}"
+    }
+    if images is not None:
+        response.update(images)
+    if result.get("tier", pipeline_info.TIER_FULL) != pipeline_info.TIER_FULL:
+        response["tier"] = result["tier"]
+    return response
+
+def _wardrobe_record(filename: str, digest: str, response: dict) -> dict:
+    """Wardrobe store row for a scan response"""
+    return {**response, "content_hash": digest, "filename": filename}
+
+async def _process_cached(
+    contents: memoryview,
+    tier: str = pipeline_info.TIER_FULL,
+    priority: Optional[int] = None,
+    store: bool = False
+) -> Tuple[str, dict]:
+    """
+    Run the garment pipeline tier, reusing results for identical uploads
     
-    # Validate file
-    if file.content_type not in ["image/jpeg", "image/png", "image/webp"]:
-        raise HTTPException(
-            status_code=400,
-            detail="Invalid file type. Accepted: JPEG, PNG, WebP"
+    Args:
+        priority: Worker pool priority, defaults to the tier's TIER_PRIORITY
+        store: Also write the upload and its thumbnails to the image store,
+            from the worker's decode
+    
+    Returns:
+        Tuple of (content_hash, processor result)
+    """
+    digest = await content_hash_async(contents)
+    key = result_cache.make_key(f"garment-{tier}", pipeline_info.garment_cache_version(), digest)
+    result = await result_cache.get_or_compute(
+        key,
+        lambda: analysis_executor.run(
+            tasks.process_garment, contents, tier, digest if store else None,
+            priority=TIER_PRIORITY[tier] if priority is None else priority
         )
+    )
+    return digest, result
+
+async def _store_images(digest: str, contents: memoryview, priority: int) -> Optional[dict]:
+    """
+    image_url and thumbnails of a scanned upload in the image store
     
-    # Read file
-    contents = await file.read()
+    Uploads are normally stored by the scan itself. Cached results skip
+    the worker, so a missing upload is stored here with a separate decode.
     
-    if len(contents) > settings.MAX_UPLOAD_SIZE:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File too large. Max size: {settings.MAX_UPLOAD_SIZE} bytes"
-        )
+    Returns:
+        None when the store is disabled or the upload could not be stored
+    """
+    extension = image_extension(contents)
+    if not image_store.enabled or extension is None:
+        return None
+    
+    if not await run_in_threadpool(image_store.has, digest):
+        try:
+            await analysis_executor.run(tasks.store_image, contents, digest, priority=priority)
+        except (WorkerPoolFull, WorkerTimeout, ValueError, OSError):
+            # The scan result is still valid, only its images are missing
+            return None
     
-    # Process garment
-    result = garment_processor.process_garment(contents)
+    return image_store.urls(digest, extension)
+
+async def _scan(
+    filename: str,
+    contents: memoryview,
+    tier: str,
+    user_id: Optional[str],
+    priority: Optional[int] = None
+) -> dict:
+    """Scan one upload and save it to the user's wardrobe when user_id is given"""
+    priority = TIER_PRIORITY[tier] if priority is None else priority
+    
+    # Process garment in the worker pool (cached by content)
+    digest, result = await _process_cached(contents, tier, priority, store=True)
     
     if result["status"] != "success":
         raise HTTPException(
@@ -42,29 +133,89 @@ async def scan_garment_accurate(file: UploadFile = File(...)):
             detail=result.get("message", "Failed to process garment")
         )
     
-    return {
-        "garment_id": f"garment_{file.filename.split('.')[0]}",
-        "color_hex": result["color_hex"],
-        "color_name": result["color_name"],
-        "garment_type": result["garment_type"],
-        "measurements": result["measurements"],
-        "confidence": result["confidence"],
-        "image_url": f"/images/{file.filename}"
-    }
-
-@router.post("/scan/quick")
-async def scan_garment_quick(file: UploadFile = File(...)):
-    """Quick color extraction without detailed measurements"""
+    images = await _store_images(digest, contents, priority)
+    
+    if user_id is None:
+        return _garment_response(filename, result, images=images)
     
-    # Validate file
-    if file.content_type not in ["image/jpeg", "image/png", "image/webp"]:
+    response = _garment_response(filename, result, wardrobe_store.make_garment_id(user_id, digest), images)
+    await run_in_threadpool(
+        wardrobe_store.save_items, user_id, [_wardrobe_record(filename, digest, response)]
+    )
+    return response
+
+def _check_tier(tier: str):
+    if tier not in pipeline_info.GARMENT_TIERS:
         raise HTTPException(
             status_code=400,
-            detail="Invalid file type"
+            detail="Tier must be: color, color_type, or full"
         )
+
+@router.post("/scan/accurate")
+async def scan_garment_accurate(
+    file: UploadFile = File(...),
+    user_id: Optional[str] = Query(None, description="Save the result to this user's wardrobe")
+):
+    """
+    Scan garment image with accurate color extraction
     
-    contents = await file.read()
-    result = garment_processor.process_garment(contents)
+    AI System #1: Garment Processor
+    - Extracts the color palette (top colors with pixel share)
+    - Measures garment dimensions
+    - Classifies garment type
+    - Saves to the user's wardrobe when user_id is given
+    """
+    
+    # Validate and read file
+    check_content_type(file.content_type)
+    contents = await read_upload(file)
+    
+    return await _scan(file.filename, contents, pipeline_info.TIER_FULL, user_id)
+
+@router.post("/scan/jobs", status_code=202)
+async def submit_scan_job(
+    response: Response,
+    file: UploadFile = File(...),
+    tier: str = Query(pipeline_info.TIER_FULL, description="Pipeline tier: color, color_type, or full"),
+    user_id: Optional[str] = Query(None, description="Save the result to this user's wardrobe")
+):
+    """
+    Scan a garment image in the background
+    
+    Returns a job id right away; fetch the result (the /scan/accurate
+    response) from /jobs/{job_id}. Resubmitting the same image while its
+    job is still running returns the same job.
+    """
+    
+    _check_tier(tier)
+    check_content_type(file.content_type)
+    contents = await read_upload(file)
+    
+    digest = await content_hash_async(contents)
+    job = job_manager.submit(
+        "scan",
+        lambda: _scan(file.filename, contents, tier, user_id, PRIORITY_BACKGROUND),
+        key=f"scan:{tier}:{user_id}:{file.filename}:{digest}"
+    )
+    
+    status_url = f"{settings.API_V1_STR}/jobs/{job.job_id}"
+    response.headers["Location"] = status_url
+    return {"job_id": job.job_id, "status": job.status, "status_url": status_url}
+
+@router.post("/scan/quick")
+async def scan_garment_quick(file: UploadFile = File(...)):
+    """
+    Quick color extraction without detailed measurements
+    
+    Runs only the color stage on a reduced-resolution decode
+    (pipeline_info.TIER_COLOR).
+    """
+    
+    # Validate and read file
+    check_content_type(file.content_type)
+    contents = await read_upload(file)
+    
+    _, result = await _process_cached(contents, pipeline_info.TIER_COLOR)
     
     if result["status"] != "success":
         raise HTTPException(status_code=400, detail=result.get("message"))
@@ -72,5 +223,152 @@ async def scan_garment_quick(file: UploadFile = File(...)):
     return {
         "color_hex": result["color_hex"],
         "color_name": result["color_name"],
+        "palette": result["palette"],
         "confidence": result["confidence"]
     }
+
+@router.post("/scan/batch")
+async def scan_garment_batch(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    tier: str = Query(pipeline_info.TIER_FULL, description="Pipeline tier: color, color_type, or full"),
+    user_id: Optional[str] = Query(None, description="Save the results to this user's wardrobe")
+):
+    """
+    Scan many garment images in one request
+    
+    Files are processed in parallel and results are streamed back as
+    NDJSON, one line per file in completion order, followed by a summary
+    line. A failing file produces an error line without failing the batch.
+    With user_id, successful scans are saved to the wardrobe in bulk
+    inserts of WARDROBE_WRITE_BATCH rows. Each file costs one scan
+    against the client's rate limit.
+    """
+    
+    _check_tier(tier)
+    
+    if len(files) > settings.SCAN_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files. Max per batch: {settings.SCAN_BATCH_MAX_FILES}"
+        )
+    
+    # The rate limit middleware charged the first file, the rest may leave the
+    # client in debt so its next requests wait (a batch is never refused here)
+    rate_limiter.charge(
+        request.client.host if request.client else "unknown",
+        settings.RATE_LIMIT_SCAN_COST * (len(files) - 1)
+    )
+    
+    # Read everything before streaming, uploads are closed once the handler returns.
+    # A file that fails validation keeps its error instead of its contents.
+    items = []
+    for index, file in enumerate(files):
+        try:
+            check_content_type(file.content_type)
+            contents = await read_upload(file)
+        except HTTPException as e:
+            contents = e
+        items.append((index, file.filename, contents))
+    
+    return StreamingResponse(_stream_batch(items, tier, user_id), media_type="application/x-ndjson")
+
+async def _scan_batch_item(
+    semaphore: asyncio.Semaphore,
+    index: int,
+    filename: str,
+    contents: Union[memoryview, HTTPException],
+    tier: str,
+    user_id: Optional[str]
+) -> Tuple[dict, Optional[dict]]:
+    """
+    Scan one batch file, turning failures into an error entry
+    
+    Returns:
+        Tuple of (NDJSON entry, wardrobe record or None)
+    """
+    item = {"index": index, "filename": filename}
+    
+    try:
+        if isinstance(contents, HTTPException):
+            raise contents
+        
+        async with semaphore:
+            digest, result = await _process_cached(contents, tier, store=True)
+        
+        if result["status"] != "success":
+            raise HTTPException(
+                status_code=400,
+                detail=result.get("message", "Failed to process garment")
+            )
+        
+        images = await _store_images(digest, contents, TIER_PRIORITY[tier])
+    except HTTPException as e:
+        return {**item, "status": "error", "status_code": e.status_code, "detail": e.detail}, None
+    except WorkerPoolFull as e:
+        return {**item, "status": "error", "status_code": 503, "detail": str(e)}, None
+    except WorkerTimeout as e:
+        return {**item, "status": "error", "status_code": 504, "detail": str(e)}, None
+    except Exception:
+        # E.g. a broken worker process or a failed image store write, the other files carry on
+        logger.exception("Batch scan of %s failed", filename)
+        return {**item, "status": "error", "status_code": 500, "detail": "Failed to process garment"}, None
+    
+    if user_id is None:
+        return {**item, "status": "success", **_garment_response(filename, result, images=images)}, None
+    
+    response = _garment_response(filename, result, wardrobe_store.make_garment_id(user_id, digest), images)
+    return {**item, "status": "success", **response}, _wardrobe_record(filename, digest, response)
+
+async def _stream_batch(items: list, tier: str, user_id: Optional[str]):
+    """Yield one NDJSON line per finished item, then a summary line"""
+    semaphore = asyncio.Semaphore(settings.SCAN_BATCH_CONCURRENCY)
+    pending = [
+        asyncio.ensure_future(_scan_batch_item(semaphore, *item, tier, user_id))
+        for item in items
+    ]
+    succeeded = 0
+    records = []
+    stored = 0
+    store_error = None
+    
+    async def flush():
+        nonlocal stored, store_error
+        batch = records[:]
+        records.clear()
+        if not batch or store_error is not None:
+            return
+        try:
+            await run_in_threadpool(wardrobe_store.save_items, user_id, batch)
+            stored += len(batch)
+        except Exception as e:
+            store_error = str(e)
+    
+    try:
+        for next_done in asyncio.as_completed(pending):
+            entry, record = await next_done
+            if entry["status"] == "success":
+                succeeded += 1
+            if record is not None:
+                records.append(record)
+                if len(records) >= settings.WARDROBE_WRITE_BATCH:
+                    await flush()
+            yield json.dumps(entry) + "\n"
+        
+        await flush()
+        
+        summary = {
+            "done": True,
+            "total": len(items),
+            "succeeded": succeeded,
+            "failed": len(items) - succeeded
+        }
+        if user_id is not None:
+            summary["stored"] = stored
+            if store_error is not None:
+                summary["store_error"] = store_error
+        yield json.dumps(summary) + "\n"
+    finally:
+        # Client went away or the stream finished, drop whatever is left
+        for task in pending:
+            task.cancel()
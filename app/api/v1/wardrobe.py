@@ -0,0 +1,53 @@
+"""Wardrobe endpoints (saved scan results)"""
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from app.config import settings
+from app.services.image_store import image_store
+from app.services.wardrobe_store import wardrobe_store
+
+router = APIRouter()
+
+def _with_thumbnails(item: dict) -> dict:
+    """Add the thumbnail URLs of items whose image is in the image store"""
+    thumbnails = image_store.thumbnails_for_url(item.get("image_url"))
+    if thumbnails is not None:
+        item["thumbnails"] = thumbnails
+    return item
+
+@router.get("/wardrobe/{user_id}/items")
+def list_wardrobe_items(
+    user_id: str,
+    limit: int = Query(50, ge=1),
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page")
+):
+    """
+    List a user's saved garments, newest first
+    
+    Uses keyset pagination: pass next_cursor back as cursor to get the
+    following page. next_cursor is null on the last page.
+    """
+    
+    if limit > settings.WARDROBE_PAGE_SIZE_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Limit too large. Max: {settings.WARDROBE_PAGE_SIZE_MAX}"
+        )
+    
+    page = wardrobe_store.list_items(user_id, limit=limit, cursor=cursor)
+    
+    return {
+        "user_id": user_id,
+        "items": [_with_thumbnails(item) for item in page["items"]],
+        "next_cursor": page["next_cursor"]
+    }
+
+@router.get("/wardrobe/{user_id}/items/{garment_id}")
+def get_wardrobe_item(user_id: str, garment_id: str):
+    """Get one saved garment"""
+    
+    item = wardrobe_store.get_item(user_id, garment_id)
+    
+    if item is None:
+        raise HTTPException(status_code=404, detail="Garment not found")
+    
+    return _with_thumbnails(item)
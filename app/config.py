@@ -23,8 +23,87 @@ class Settings:
     # File upload
     MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "webp"}
+    MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(50_000_000)))  # Decompression bomb guard (width x height)
     
     # Color system
     COLOR_PALETTE_COUNT = 5  # Number of dominant colors to extract
+    
+    # Skin tone analysis
+    SKIN_DETECTION_BUDGET_MS = float(os.getenv("SKIN_DETECTION_BUDGET_MS", "15"))  # Per-photo target for face + skin mask
+    SKIN_PROFILE_MAX_USERS = int(os.getenv("SKIN_PROFILE_MAX_USERS", "10000"))  # Multi-photo profiles kept in memory
+    
+    # Garment segmentation (rembg background removal, optional)
+    SEGMENTATION_ENABLED = os.getenv("SEGMENTATION_ENABLED", "false").lower() == "true"
+    SEGMENTATION_MODEL = os.getenv("SEGMENTATION_MODEL", "u2netp")
+    SEGMENTATION_THREADS = int(os.getenv("SEGMENTATION_THREADS", "1"))  # ONNX intra- and inter-op threads per session
+    SEGMENTATION_MAX_SIDE = int(os.getenv("SEGMENTATION_MAX_SIDE", "320"))  # Model input is downscaled to this
+    
+    # Worker pool (AI core execution)
+    WORKER_POOL_MODE = os.getenv("WORKER_POOL_MODE", "thread")  # "thread" or "process"
+    WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", str(os.cpu_count() or 1)))
+    WORKER_QUEUE_SIZE = int(os.getenv("WORKER_QUEUE_SIZE", "16"))  # Waiting tasks beyond busy workers
+    WORKER_TIMEOUT_SECONDS = float(os.getenv("WORKER_TIMEOUT_SECONDS", "30"))
+    WORKER_RETRY_AFTER_SECONDS = int(os.getenv("WORKER_RETRY_AFTER_SECONDS", "2"))
+    WORKER_RESERVED_SLOTS = int(os.getenv("WORKER_RESERVED_SLOTS", "4"))  # Queue slots kept for quick scans
+    
+    # Per-client rate limit (token bucket per client address, 0 disables).
+    # Behind a proxy, run uvicorn with --forwarded-allow-ips so the client
+    # address comes from X-Forwarded-For.
+    RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "10"))  # Tokens refilled per second
+    RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "30"))  # Bucket size
+    RATE_LIMIT_SCAN_COST = float(os.getenv("RATE_LIMIT_SCAN_COST", "5"))  # Tokens per full-resolution scan or job
+    RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))  # Buckets kept in memory
+    
+    # Batch scanning
+    SCAN_BATCH_MAX_FILES = int(os.getenv("SCAN_BATCH_MAX_FILES", "100"))
+    SCAN_BATCH_CONCURRENCY = int(os.getenv("SCAN_BATCH_CONCURRENCY", str(WORKER_POOL_SIZE)))
+    SCAN_BATCH_MAX_BYTES = int(os.getenv("SCAN_BATCH_MAX_BYTES", str(100 * 1024 * 1024)))  # Whole request body
+    
+    # Asynchronous scan/profile jobs (in-process, lost on restart)
+    JOBS_MAX_RUNNING = int(os.getenv("JOBS_MAX_RUNNING", str(max(1, WORKER_POOL_SIZE // 2))))  # Leaves pool slots for regular requests
+    JOBS_MAX_PENDING = int(os.getenv("JOBS_MAX_PENDING", "32"))  # Queued + running, uploads are held in memory meanwhile
+    JOBS_RETENTION_SECONDS = float(os.getenv("JOBS_RETENTION_SECONDS", "600"))  # Finished jobs stay fetchable this long
+    JOBS_MAX_FINISHED = int(os.getenv("JOBS_MAX_FINISHED", "1000"))
+    JOBS_MAX_WAIT_SECONDS = float(os.getenv("JOBS_MAX_WAIT_SECONDS", "30"))  # Long-poll cap for GET /jobs/{id}?wait=
+    
+    # Recommendations
+    RECOMMEND_BATCH_MAX_ITEMS = int(os.getenv("RECOMMEND_BATCH_MAX_ITEMS", "1000"))
+    RECOMMEND_MEMO_MAX_ENTRIES = int(os.getenv("RECOMMEND_MEMO_MAX_ENTRIES", "4096"))  # Memoized (color, undertone) results
+    RECOMMEND_COLOR_STEP = int(os.getenv("RECOMMEND_COLOR_STEP", "1"))  # Round input channels to this step, 1 = exact
+    RECOMMEND_CACHE_MAX_AGE = int(os.getenv("RECOMMEND_CACHE_MAX_AGE", "86400"))  # Cache-Control max-age of /recommend/instant
+    WARDROBE_MATCH_COUNT = int(os.getenv("WARDROBE_MATCH_COUNT", "3"))  # Owned garments per recommended color
+    WARDROBE_MATCH_MAX_DISTANCE = float(os.getenv("WARDROBE_MATCH_MAX_DISTANCE", "25"))  # Delta E (CIE76)
+    CURATION_BEAM_WIDTH = int(os.getenv("CURATION_BEAM_WIDTH", "8"))  # Bottoms kept per top in weekly curation
+    CURATION_CACHE_MAX_ENTRIES = int(os.getenv("CURATION_CACHE_MAX_ENTRIES", "2048"))  # Cached (user, week, undertone) results
+    COLOR_INDEX_MAX_USERS = int(os.getenv("COLOR_INDEX_MAX_USERS", "1000"))  # Wardrobe color indexes kept in memory
+    
+    # Wardrobe store (sqlite:///path.db or postgresql://...)
+    WARDROBE_DATABASE_URL = os.getenv("WARDROBE_DATABASE_URL", DATABASE_URL or "sqlite:///./data/wardrobe.db")
+    WARDROBE_POOL_SIZE = int(os.getenv("WARDROBE_POOL_SIZE", "5"))
+    WARDROBE_WRITE_BATCH = int(os.getenv("WARDROBE_WRITE_BATCH", "50"))  # Rows per bulk insert during batch scans
+    WARDROBE_PAGE_SIZE_MAX = int(os.getenv("WARDROBE_PAGE_SIZE_MAX", "200"))
+    
+    # Preference events (write-behind buffer)
+    PREFERENCE_FLUSH_BATCH = int(os.getenv("PREFERENCE_FLUSH_BATCH", "500"))  # Flush once this many events wait
+    PREFERENCE_FLUSH_INTERVAL_SECONDS = float(os.getenv("PREFERENCE_FLUSH_INTERVAL_SECONDS", "2"))
+    PREFERENCE_MAX_USERS = int(os.getenv("PREFERENCE_MAX_USERS", "10000"))  # Preference vectors kept in memory
+    PREFERENCE_ITEMS_PER_USER = int(os.getenv("PREFERENCE_ITEMS_PER_USER", "200"))  # Recent votes per vector
+    
+    # Result cache (keyed by upload content hash)
+    RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+    RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "")  # Empty disables the disk tier
+    
+    # Image store (scanned uploads + WebP thumbnails by content hash, served at /images)
+    IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", "./data/images")  # Empty disables the store
+    IMAGE_THUMBNAIL_SIZES = tuple(
+        int(size) for size in os.getenv("IMAGE_THUMBNAIL_SIZES", "160,320,640").split(",") if size.strip()
+    )  # Longest side of each thumbnail
+    IMAGE_THUMBNAIL_QUALITY = int(os.getenv("IMAGE_THUMBNAIL_QUALITY", "80"))  # WebP quality, 0-100
+    
+    # Admin endpoints and opt-in profiling (empty token disables both the
+    # admin endpoints and the X-Profile header trigger)
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+    PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))  # Share of requests profiled, 0-1
+    PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "50"))  # Ring size
 
 settings = Settings()
@@ -0,0 +1 @@
+"""Runtime services for LokaFit (worker pool, caching, storage)"""
@@ -0,0 +1,327 @@
+"""
+Bounded worker pool for AI core processing
+Runs CPU-heavy image analysis off the event loop with a bounded
+queue and per-request timeouts. Waiting tasks are dispatched by priority,
+part of the queue is reserved for high-priority (cheap) work, and when the
+pool is full a new task sheds the lowest-priority waiting one.
+"""
+import asyncio
+import heapq
+import itertools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from app.ai_core import tasks
+from app.config import settings
+from app.services import metrics, profiling
+
+# Task priorities, lower runs first
+PRIORITY_HIGH = 0        # Cheap interactive work (quick scans), may use reserved slots
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2         # Full-resolution scans
+PRIORITY_BACKGROUND = 3  # Async jobs, shed first
+PRIORITY_NAMES = {
+    PRIORITY_HIGH: "high",
+    PRIORITY_NORMAL: "normal",
+    PRIORITY_LOW: "low",
+    PRIORITY_BACKGROUND: "background",
+}
+
+class WorkerPoolFull(Exception):
+    """Raised when every worker is busy and the queue is full"""
+    
+    def __init__(self, retry_after: int):
+        super().__init__("Server is busy, please retry shortly")
+        self.retry_after = retry_after
+
+class WorkerTimeout(Exception):
+    """Raised when a task does not finish within its timeout"""
+
+def _hold(seconds: float):
+    """Keep a worker busy briefly so start() brings up every worker"""
+    time.sleep(seconds)
+
+class _Waiter:
+    """A task admitted to the queue, waiting for a free worker"""
+    
+    __slots__ = ("priority", "seq", "ticket", "loop", "state")
+    
+    def __init__(self, priority: int, seq: int, loop: asyncio.AbstractEventLoop):
+        self.priority = priority
+        self.seq = seq
+        self.ticket = loop.create_future()
+        self.loop = loop
+        self.state = "waiting"  # -> "granted" (holds a worker slot) or "shed"
+    
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+def _grant(ticket: asyncio.Future):
+    if not ticket.done():
+        ticket.set_result(None)
+
+def _shed(ticket: asyncio.Future, retry_after: int):
+    if not ticket.done():
+        ticket.set_exception(WorkerPoolFull(retry_after))
+
+class AnalysisExecutor:
+    """Thread or process pool with priority admission bounded by workers + queue size"""
+    
+    def __init__(
+        self,
+        mode: str = "thread",
+        max_workers: int = 1,
+        queue_size: int = 0,
+        timeout: float = 30.0,
+        retry_after: int = 1,
+        initializer: Optional[Callable[[], Any]] = None,
+        reserved: int = 0
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError("Worker pool mode must be 'thread' or 'process'")
+        
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self.queue_size = max(0, queue_size)
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.initializer = initializer
+        # Slots only PRIORITY_HIGH tasks may take, at least one stays open to all
+        self.reserved = min(max(0, reserved), self.capacity - 1)
+        
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0  # Running + queued tasks
+        self._running = 0  # Tasks holding a worker
+        self._waiting: List[_Waiter] = []  # Heap by (priority, arrival)
+        self._seq = itertools.count()
+        self._completed = 0
+        self._rejected = 0
+        self._shed = 0
+        self._timed_out = 0
+    
+    @property
+    def capacity(self) -> int:
+        """Maximum number of tasks accepted at once"""
+        return self.max_workers + self.queue_size
+    
+    async def run(
+        self,
+        func: Callable,
+        *args: Any,
+        timeout: Optional[float] = None,
+        priority: int = PRIORITY_NORMAL
+    ) -> Any:
+        """
+        Run func(*args) in the pool and await its result
+        
+        Args:
+            func: Module-level callable (must be picklable in process mode)
+            timeout: Seconds to wait, queueing included, defaults to the
+                pool timeout
+            priority: One of the PRIORITY_* levels
+        
+        Raises:
+            WorkerPoolFull: No free slot (or the task was shed for a
+                higher-priority one), the caller should retry later
+            WorkerTimeout: The task did not finish in time
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        started = time.perf_counter()
+        
+        waiter = self._admit(priority)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(waiter.ticket, timeout)
+            except asyncio.TimeoutError:
+                self._abandon(waiter)
+                with self._lock:
+                    self._timed_out += 1
+                raise WorkerTimeout("Image analysis timed out")
+            except asyncio.CancelledError:
+                self._abandon(waiter)
+                raise
+            timeout = max(0.0, timeout - (time.perf_counter() - started))
+        
+        if self.mode == "process":
+            # Upload buffers are memoryviews, which cannot be pickled
+            args = tuple(bytes(arg) if isinstance(arg, (memoryview, bytearray)) else arg for arg in args)
+        
+        profile = profiling.current()
+        try:
+            if profile is not None:
+                future = self._get_pool().submit(profiling.profiled_call, func, *args)
+            else:
+                future = self._get_pool().submit(func, *args)
+        except Exception:
+            self._release()
+            raise
+        
+        # The slot is held until the task really finishes, even after a timeout
+        future.add_done_callback(self._release)
+        
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timed_out += 1
+            raise WorkerTimeout("Image analysis timed out")
+        
+        if profile is not None:
+            result, duration_ms, stats = result
+            profile.add_task(func.__name__, duration_ms, stats)
+        
+        # Stage timings travel back in the result, so this works in process mode too
+        metrics.task_duration.observe(time.perf_counter() - started, task=func.__name__)
+        if isinstance(result, dict):
+            metrics.observe_stages(func.__name__, result.get("timings"))
+        return result
+    
+    async def start(self):
+        """
+        Start every worker now instead of on the first requests
+        
+        Each worker runs the initializer as it starts, this returns once
+        all of them have.
+        """
+        pool = self._get_pool()
+        await asyncio.gather(*(
+            asyncio.wrap_future(pool.submit(_hold, 0.05)) for _ in range(self.max_workers)
+        ))
+    
+    def stats(self) -> Dict:
+        """Current pool and admission state"""
+        with self._lock:
+            waiting = {name: 0 for name in PRIORITY_NAMES.values()}
+            for waiter in self._waiting:
+                waiting[PRIORITY_NAMES[waiter.priority]] += 1
+            return {
+                "mode": self.mode,
+                "workers": self.max_workers,
+                "queue_size": self.queue_size,
+                "capacity": self.capacity,
+                "reserved": self.reserved,
+                "pending": self._pending,
+                "running": self._running,
+                "waiting": waiting,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "shed": self._shed,
+                "timed_out": self._timed_out,
+            }
+    
+    def shutdown(self):
+        """Stop the pool, waiting for running tasks"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    if self.mode == "process":
+                        # Workers are started on demand while other threads run; a
+                        # plain fork could copy a lock they hold and hang the child
+                        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                        self._pool = ProcessPoolExecutor(
+                            max_workers=self.max_workers,
+                            mp_context=multiprocessing.get_context(method),
+                            initializer=self.initializer
+                        )
+                    else:
+                        self._pool = ThreadPoolExecutor(
+                            max_workers=self.max_workers,
+                            thread_name_prefix="ai-worker",
+                            initializer=self.initializer
+                        )
+        return self._pool
+    
+    def _admit(self, priority: int) -> Optional[_Waiter]:
+        """
+        Take a slot for a task
+        
+        Returns:
+            None when a worker is free right away, otherwise the queue
+            entry to wait on
+        
+        Raises:
+            WorkerPoolFull: Over the priority's limit and nothing lower to shed
+        """
+        limit = self.capacity if priority <= PRIORITY_HIGH else self.capacity - self.reserved
+        with self._lock:
+            if self._pending >= limit:
+                victim = self._shed_candidate(priority) if self._pending - 1 < limit else None
+                if victim is None:
+                    self._rejected += 1
+                    metrics.admission.inc(priority=PRIORITY_NAMES[priority], outcome="rejected")
+                    raise WorkerPoolFull(self.retry_after)
+                self._waiting.remove(victim)
+                heapq.heapify(self._waiting)
+                victim.state = "shed"
+                victim.loop.call_soon_threadsafe(_shed, victim.ticket, self.retry_after)
+                self._pending -= 1
+                self._shed += 1
+                metrics.admission.inc(priority=PRIORITY_NAMES[victim.priority], outcome="shed")
+            
+            metrics.admission.inc(priority=PRIORITY_NAMES[priority], outcome="admitted")
+            self._pending += 1
+            if self._running < self.max_workers and not self._waiting:
+                self._running += 1
+                return None
+            
+            waiter = _Waiter(priority, next(self._seq), asyncio.get_running_loop())
+            heapq.heappush(self._waiting, waiter)
+            return waiter
+    
+    def _shed_candidate(self, priority: int) -> Optional[_Waiter]:
+        """Newest waiting task of the lowest priority, if lower than priority"""
+        if not self._waiting:
+            return None
+        victim = max(self._waiting, key=lambda waiter: (waiter.priority, waiter.seq))
+        return victim if victim.priority > priority else None
+    
+    def _abandon(self, waiter: _Waiter):
+        """Give up a queue entry whose caller stopped waiting"""
+        with self._lock:
+            if waiter.state == "waiting":
+                self._waiting.remove(waiter)
+                heapq.heapify(self._waiting)
+                self._pending -= 1
+            elif waiter.state == "granted":
+                # Granted a worker just as the caller gave up, pass it on
+                waiter.state = "abandoned"
+                self._running -= 1
+                self._pending -= 1
+                self._dispatch()
+    
+    def _dispatch(self):
+        """Hand free workers to the highest-priority waiting tasks (lock held)"""
+        while self._waiting and self._running < self.max_workers:
+            waiter = heapq.heappop(self._waiting)
+            waiter.state = "granted"
+            self._running += 1
+            waiter.loop.call_soon_threadsafe(_grant, waiter.ticket)
+    
+    def _release(self, future: Optional[Future] = None):
+        with self._lock:
+            self._pending -= 1
+            self._running -= 1
+            if future is not None:
+                self._completed += 1
+            self._dispatch()
+
+# Singleton instance
+analysis_executor = AnalysisExecutor(
+    mode=settings.WORKER_POOL_MODE,
+    max_workers=settings.WORKER_POOL_SIZE,
+    queue_size=settings.WORKER_QUEUE_SIZE,
+    timeout=settings.WORKER_TIMEOUT_SECONDS,
+    retry_after=settings.WORKER_RETRY_AFTER_SECONDS,
+    initializer=tasks.init_worker,
+    reserved=settings.WORKER_RESERVED_SLOTS
+)
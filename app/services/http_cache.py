@@ -0,0 +1,36 @@
+"""
+HTTP caching helpers
+Strong ETags and If-None-Match handling, so clients and CDNs can revalidate
+responses with a 304 instead of downloading them again.
+"""
+import hashlib
+import json
+from typing import Any
+from fastapi import Request, Response
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag over the given parts (inputs and versions that fully determine a response)"""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+def body_etag(content: Any) -> str:
+    """Strong ETag over a JSON-serializable response body"""
+    return make_etag(json.dumps(content, sort_keys=True, separators=(",", ":")))
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    True if the request's If-None-Match already names etag
+    
+    If-None-Match uses weak comparison, so a W/ prefix added by a proxy
+    still matches.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    """304 response repeating the validators the client should keep"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
@@ -0,0 +1,165 @@
+"""
+Content-addressed image store
+Keeps each scanned upload once, under its SHA-256 content hash, next to
+WebP thumbnails at a few fixed sizes. Thumbnails are encoded in the worker
+from the image it already decoded for analysis. Files never change once
+written, so they are served with immutable cache headers.
+"""
+import os
+import tempfile
+from typing import Dict, Optional, Sequence
+import numpy as np
+from fastapi.staticfiles import StaticFiles
+from app.config import settings
+
+# Served for every stored file, the name changes whenever the content does
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def image_extension(data) -> Optional[str]:
+    """File extension of a JPEG, PNG or WebP upload from its magic bytes"""
+    header = bytes(data[:12])
+    if header[:2] == b"\xff\xd8":
+        return "jpg"
+    if header[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+class ImageStore:
+    """Originals and WebP thumbnails on disk, keyed by content hash"""
+    
+    def __init__(
+        self,
+        directory: str,
+        sizes: Sequence[int] = (160, 320, 640),
+        quality: int = 80,
+        url_prefix: str = "/images"
+    ):
+        """
+        Args:
+            directory: Root directory, empty disables the store
+            sizes: Longest side of each thumbnail (images are never upscaled)
+            quality: WebP quality, 0-100
+            url_prefix: Path the directory is served under
+        """
+        self.directory = directory
+        self.sizes = tuple(sorted(set(sizes)))
+        self.quality = quality
+        self.url_prefix = url_prefix.rstrip("/")
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory) and bool(self.sizes)
+    
+    def original_name(self, digest: str, extension: str) -> str:
+        return f"{digest[:2]}/{digest}.{extension}"
+    
+    def thumbnail_name(self, digest: str, size: int) -> str:
+        return f"{digest[:2]}/{digest}_{size}.webp"
+    
+    def has(self, digest: str) -> bool:
+        """Whether an upload is fully stored (the largest thumbnail is written last)"""
+        return os.path.exists(os.path.join(self.directory, self.thumbnail_name(digest, self.sizes[-1])))
+    
+    def urls(self, digest: str, extension: str) -> Dict:
+        """image_url of the original and thumbnail URLs by size"""
+        return {
+            "image_url": f"{self.url_prefix}/{self.original_name(digest, extension)}",
+            "thumbnails": {
+                str(size): f"{self.url_prefix}/{self.thumbnail_name(digest, size)}" for size in self.sizes
+            }
+        }
+    
+    def thumbnails_for_url(self, image_url: Optional[str]) -> Optional[Dict[str, str]]:
+        """Thumbnail URLs of a stored original's image_url, None for other URLs"""
+        if not image_url or not image_url.startswith(self.url_prefix + "/"):
+            return None
+        name = image_url.rsplit("/", 1)[-1]
+        digest, _, extension = name.partition(".")
+        if len(digest) != 64 or extension not in ("jpg", "png", "webp"):
+            return None
+        return self.urls(digest, extension)["thumbnails"]
+    
+    def save(self, digest: str, data, image: Optional[np.ndarray] = None, scale: int = 1) -> bool:
+        """
+        Store an upload and its thumbnails unless already stored
+        
+        Args:
+            digest: SHA-256 hex digest of data
+            data: Encoded upload, written as is
+            image: Already decoded BGR image, reused when large enough
+            scale: Decode reduction of image (1 = full resolution)
+        
+        Returns:
+            Whether anything was written
+        
+        Raises:
+            ValueError: Not a JPEG, PNG or WebP image
+        """
+        if not self.enabled or self.has(digest):
+            return False
+        
+        extension = image_extension(data)
+        if extension is None:
+            raise ValueError("Invalid image format")
+        
+        # Imported here so the API process only loads cv2 when it has to
+        import cv2
+        from app.ai_core.image_decode import decode_image
+        
+        # A reduced decode only serves if it still covers the largest thumbnail
+        if image is None or (scale > 1 and max(image.shape[:2]) < self.sizes[-1]):
+            image, _ = decode_image(data, self.sizes[-1])
+        
+        self._write(self.original_name(digest, extension), data)
+        
+        height, width = image.shape[:2]
+        for size in self.sizes:
+            factor = size / max(height, width)
+            thumbnail = image
+            if factor < 1.0:
+                thumbnail_size = (max(1, round(width * factor)), max(1, round(height * factor)))
+                thumbnail = cv2.resize(image, thumbnail_size, interpolation=cv2.INTER_AREA)
+            ok, encoded = cv2.imencode(".webp", thumbnail, [cv2.IMWRITE_WEBP_QUALITY, self.quality])
+            if not ok:
+                raise ValueError("Could not encode thumbnail")
+            self._write(self.thumbnail_name(digest, size), encoded)
+        
+        return True
+    
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "directory": self.directory,
+            "sizes": list(self.sizes),
+            "quality": self.quality
+        }
+    
+    def _write(self, name: str, data):
+        """Write a file atomically, readers never see a partial image"""
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles that marks every response as cacheable forever"""
+    
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+# Singleton instance
+image_store = ImageStore(
+    directory=settings.IMAGE_STORE_DIR,
+    sizes=settings.IMAGE_THUMBNAIL_SIZES,
+    quality=settings.IMAGE_THUMBNAIL_QUALITY
+)
@@ -0,0 +1,126 @@
+"""
+Upload ingestion
+Enforces body size limits while the request streams in, and reads each
+uploaded file into one preallocated buffer handed to the processors
+"""
+from typing import Dict, Optional
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from starlette.formparsers import MultiPartParser
+from app.config import settings
+from app.services.metrics import upload_size
+
+ACCEPTED_CONTENT_TYPES = ["image/jpeg", "image/png", "image/webp"]
+
+# Room for multipart boundaries and part headers on top of the file bytes
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Read size when the upload size is not known up front
+CHUNK_SIZE = 256 * 1024
+
+def too_large(max_size: int) -> HTTPException:
+    """413 error for a body or file over max_size"""
+    return HTTPException(
+        status_code=413,
+        detail=f"File too large. Max size: {max_size} bytes"
+    )
+
+class UploadLimitMiddleware:
+    """
+    Reject request bodies over the limit before they are buffered
+    
+    Requests announcing a larger Content-Length get a 413 without the body
+    being read; otherwise the received bytes are counted and the request
+    fails with 413 as soon as they pass the limit.
+    """
+    
+    def __init__(self, app, max_body_size: int, path_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.path_limits = path_limits or {}
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+        
+        limit = self.path_limits.get(scope["path"], self.max_body_size)
+        
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > limit:
+                    response = JSONResponse(
+                        status_code=413,
+                        content={"detail": too_large(limit).detail},
+                        headers={"Connection": "close"}
+                    )
+                    await response(scope, receive, send)
+                    return
+                break
+        
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise too_large(limit)
+            return message
+        
+        await self.app(scope, limited_receive, send)
+
+def check_content_type(content_type: Optional[str]):
+    """Reject uploads that are not a supported image type"""
+    if content_type not in ACCEPTED_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid file type. Accepted: JPEG, PNG, WebP"
+        )
+
+async def read_upload(file: UploadFile, max_size: int = settings.MAX_UPLOAD_SIZE) -> memoryview:
+    """
+    Read an uploaded file into a single buffer
+    
+    The buffer is allocated once at the upload's size and filled in place,
+    so no intermediate bytes objects are created. Uploads of unknown size
+    are read in chunks and rejected as soon as they pass max_size.
+    
+    Raises:
+        HTTPException: 413 when the file is larger than max_size
+    """
+    size = file.size
+    if size is not None and size > max_size:
+        raise too_large(max_size)
+    
+    await file.seek(0)
+    
+    if size is None:
+        buffer = bytearray()
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                upload_size.observe(len(buffer))
+                return memoryview(buffer)
+            buffer += chunk
+            if len(buffer) > max_size:
+                raise too_large(max_size)
+    
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    # Spooled uploads larger than the spool size live on disk
+    in_memory = size <= MultiPartParser.spool_max_size
+    filled = 0
+    while filled < size:
+        if in_memory:
+            count = file.file.readinto(view[filled:])
+        else:
+            count = await run_in_threadpool(file.file.readinto, view[filled:])
+        if not count:
+            break
+        filled += count
+    
+    upload_size.observe(filled)
+    return view[:filled]
@@ -0,0 +1,241 @@
+"""
+Asynchronous analysis jobs
+Lets clients submit a scan or profile analysis and fetch the result later
+instead of holding a request open. Jobs run on the event loop of this
+process (no external broker), at most max_running at a time so they leave
+worker pool slots for regular requests. Finished jobs are kept for
+retention_seconds; jobs do not survive a restart.
+"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional
+from fastapi import HTTPException
+from app.config import settings
+from app.services.executor import WorkerPoolFull, WorkerTimeout
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+# Times a job waits out a full worker pool before failing with 503
+POOL_FULL_RETRIES = 5
+
+class JobQueueFull(Exception):
+    """Raised when max_pending jobs are already queued or running"""
+    
+    def __init__(self, retry_after: int):
+        super().__init__("Too many jobs in progress, please retry shortly")
+        self.retry_after = retry_after
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+class Job:
+    """One submitted analysis and its outcome"""
+    
+    def __init__(self, kind: str, key: Optional[str]):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = JOB_QUEUED
+        self.created_at = _now()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.finished: Optional[float] = None  # time.monotonic(), for retention
+        self.result: Optional[Dict] = None
+        self.error: Optional[Dict] = None
+        self.done = asyncio.Event()
+    
+    def view(self) -> Dict:
+        """Public representation returned by the jobs endpoints"""
+        view = {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+        if self.status == JOB_SUCCEEDED:
+            view["result"] = self.result
+        elif self.status == JOB_FAILED:
+            view["error"] = self.error
+        return view
+
+class JobManager:
+    """In-process job queue with bounded concurrency and retention"""
+    
+    def __init__(
+        self,
+        max_running: int = 1,
+        max_pending: int = 16,
+        retention_seconds: float = 600.0,
+        max_finished: int = 1000,
+        retry_after: int = 1
+    ):
+        self.max_running = max(1, max_running)
+        self.max_pending = max(1, max_pending)
+        self.retention_seconds = retention_seconds
+        self.max_finished = max(1, max_finished)
+        self.retry_after = retry_after
+        
+        self._jobs: Dict[str, Job] = {}
+        self._finished: "OrderedDict[str, Job]" = OrderedDict()  # In finishing order
+        self._active_keys: Dict[str, Job] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._submitted = 0
+        self._deduplicated = 0
+        self._rejected = 0
+        self._succeeded = 0
+        self._failed = 0
+        self._expired = 0
+    
+    def submit(self, kind: str, run: Callable[[], Awaitable[Dict]], key: Optional[str] = None) -> Job:
+        """
+        Queue a job (call from the running event loop)
+        
+        Args:
+            kind: Job type reported to clients (e.g. "scan")
+            run: Coroutine factory producing the job result. HTTPException,
+                WorkerTimeout and other errors fail the job; a full worker
+                pool is waited out.
+            key: Identifies identical work, submitting the same key while
+                a job for it is queued or running returns that job
+        
+        Raises:
+            JobQueueFull: max_pending jobs are already queued or running
+        """
+        self._expire()
+        
+        if key is not None and key in self._active_keys:
+            self._deduplicated += 1
+            return self._active_keys[key]
+        
+        if len(self._tasks) >= self.max_pending:
+            self._rejected += 1
+            raise JobQueueFull(self.retry_after)
+        
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_running)
+        
+        job = Job(kind, key)
+        self._jobs[job.job_id] = job
+        if key is not None:
+            self._active_keys[key] = job
+        self._tasks[job.job_id] = asyncio.create_task(self._execute(job, run))
+        self._submitted += 1
+        return job
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        """A job by id, None if unknown or expired"""
+        self._expire()
+        return self._jobs.get(job_id)
+    
+    async def wait(self, job: Job, timeout: float) -> Job:
+        """Wait up to timeout seconds for a job to finish (long polling)"""
+        if timeout > 0 and not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+    
+    async def stop(self):
+        """Cancel queued and running jobs"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # Tasks cancelled before they started never ran their cleanup
+        for job in self._jobs.values():
+            if not job.done.is_set():
+                job.status = JOB_FAILED
+                job.error = {"status_code": 503, "detail": "Job was cancelled"}
+                job.done.set()
+        self._tasks.clear()
+        self._active_keys.clear()
+    
+    def stats(self) -> Dict:
+        self._expire()
+        running = sum(1 for job in self._jobs.values() if job.status == JOB_RUNNING)
+        return {
+            "queued": len(self._tasks) - running,
+            "running": running,
+            "max_running": self.max_running,
+            "max_pending": self.max_pending,
+            "finished": len(self._finished),
+            "submitted": self._submitted,
+            "deduplicated": self._deduplicated,
+            "rejected": self._rejected,
+            "succeeded": self._succeeded,
+            "failed": self._failed,
+            "expired": self._expired
+        }
+    
+    async def _execute(self, job: Job, run: Callable[[], Awaitable[Dict]]):
+        try:
+            async with self._semaphore:
+                job.status = JOB_RUNNING
+                job.started_at = _now()
+                
+                for attempt in range(POOL_FULL_RETRIES + 1):
+                    try:
+                        job.result = await run()
+                        job.status = JOB_SUCCEEDED
+                        break
+                    except WorkerPoolFull as e:
+                        if attempt == POOL_FULL_RETRIES:
+                            job.error = {"status_code": 503, "detail": str(e)}
+                        else:
+                            await asyncio.sleep(e.retry_after)
+                    except HTTPException as e:
+                        job.error = {"status_code": e.status_code, "detail": e.detail}
+                        break
+                    except WorkerTimeout as e:
+                        job.error = {"status_code": 504, "detail": str(e)}
+                        break
+                    except Exception as e:
+                        job.error = {"status_code": 500, "detail": str(e)}
+                        break
+        finally:
+            if job.status != JOB_SUCCEEDED:
+                job.status = JOB_FAILED
+                job.error = job.error or {"status_code": 503, "detail": "Job was cancelled"}
+            job.finished_at = _now()
+            job.finished = time.monotonic()
+            if job.status == JOB_SUCCEEDED:
+                self._succeeded += 1
+            else:
+                self._failed += 1
+            
+            self._tasks.pop(job.job_id, None)
+            if job.key is not None and self._active_keys.get(job.key) is job:
+                del self._active_keys[job.key]
+            self._finished[job.job_id] = job
+            job.done.set()
+    
+    def _expire(self):
+        """Drop finished jobs past retention_seconds, or beyond max_finished"""
+        deadline = time.monotonic() - self.retention_seconds
+        while self._finished:
+            job_id, job = next(iter(self._finished.items()))
+            if job.finished > deadline and len(self._finished) <= self.max_finished:
+                break
+            del self._finished[job_id]
+            del self._jobs[job_id]
+            self._expired += 1
+
+# Singleton instance
+job_manager = JobManager(
+    max_running=settings.JOBS_MAX_RUNNING,
+    max_pending=settings.JOBS_MAX_PENDING,
+    retention_seconds=settings.JOBS_RETENTION_SECONDS,
+    max_finished=settings.JOBS_MAX_FINISHED,
+    retry_after=settings.WORKER_RETRY_AFTER_SECONDS
+)
@@ -0,0 +1,273 @@
+"""
+Prometheus metrics
+Counters, gauges and histograms kept in process and rendered in the
+Prometheus text format, plus the HTTP middleware and the timers used by
+the AI core. Updates take one lock and a dict lookup, so they are cheap
+enough for every request and stage.
+"""
+import bisect
+import functools
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, from sub-millisecond stages up to slow batches
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Upload size buckets in bytes (10KB to 100MB)
+SIZE_BUCKETS = (10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000, 10_000_000, 100_000_000)
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    """Base class for labelled metrics"""
+    
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+    
+    def _render_sample(self, key: Tuple[str, ...], value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+class Counter(_Metric):
+    """Monotonic counter"""
+    
+    kind = "counter"
+    
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """Value that goes up and down"""
+    
+    kind = "gauge"
+    
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+    
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed buckets"""
+    
+    kind = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last one is +Inf), then sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+    
+    def _render_sample(self, key: Tuple[str, ...], value) -> List[str]:
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Named metrics plus stats() sources exported as gauges at scrape time"""
+    
+    def __init__(self, prefix: str = "lokafit"):
+        self.prefix = prefix
+        self._metrics: List[_Metric] = []
+        self._sources: List[Tuple[str, Callable[[], Dict]]] = []
+    
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(f"{self.prefix}_{name}", documentation, labelnames))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(f"{self.prefix}_{name}", documentation, labelnames))
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(f"{self.prefix}_{name}", documentation, labelnames, buckets))
+    
+    def add_stats_source(self, name: str, stats: Callable[[], Dict]):
+        """
+        Export the numeric fields of a component's stats() as gauges
+        
+        Fields become {prefix}_{name}_{field}; booleans export as 0/1,
+        strings, lists and nested dicts are skipped.
+        """
+        self._sources.append((name, stats))
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        
+        for name, stats in self._sources:
+            try:
+                values = stats()
+            except Exception:
+                continue
+            for field, value in values.items():
+                if not isinstance(value, (int, float)):
+                    continue
+                metric = f"{self.prefix}_{name}_{field}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {_format_value(value)}")
+        
+        return "\n".join(lines) + "\n"
+    
+    def _register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+# Singleton instance
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+)
+http_in_flight = registry.gauge("http_requests_in_flight", "HTTP requests being handled")
+upload_size = registry.histogram("upload_size_bytes", "Size of uploaded image files", buckets=SIZE_BUCKETS)
+task_duration = registry.histogram(
+    "ai_task_duration_seconds", "Worker pool task latency including queue wait", ("task",)
+)
+stage_duration = registry.histogram(
+    "ai_stage_duration_seconds", "AI core stage latency", ("component", "stage")
+)
+admission = registry.counter(
+    "ai_admission_total", "Worker pool admission outcomes (admitted, rejected, shed) by priority", ("priority", "outcome")
+)
+
+def observe_stages(component: str, timings: Optional[Dict]):
+    """Record a processor result's timings ({stage}_ms entries) as stage latencies"""
+    for field, value in (timings or {}).items():
+        if field.endswith("_ms") and isinstance(value, (int, float)):
+            stage_duration.observe(value / 1000, component=component, stage=field[:-3])
+
+def timed(component: str, stage: str):
+    """Decorator recording each call of a function as a stage latency"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stage_duration.observe(time.perf_counter() - started, component=component, stage=stage)
+        return wrapper
+    return decorator
+
+class MetricsMiddleware:
+    """
+    Count HTTP requests and time them per route template
+    
+    Routes are labelled by their path template (e.g.
+    /api/v1/wardrobe/{user_id}/items) so label sets stay bounded. Requests
+    that never reach a route (404s, uploads rejected by the size limit)
+    are labelled "unmatched".
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = 500
+        
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        http_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_in_flight.dec()
+            route = self._route(scope)
+            http_request_duration.observe(time.perf_counter() - started, method=scope["method"], route=route)
+            http_requests.inc(method=scope["method"], route=route, status=status)
+    
+    def _route(self, scope) -> str:
+        """Path template of the matched route, rebuilt from the path parameters"""
+        if "endpoint" not in scope:
+            return "unmatched"
+        mount_path = scope.get("root_path", "")[len(scope.get("app_root_path", "")):]
+        if mount_path:
+            # Mounted app (e.g. the image files), one label for all its paths
+            return f"{mount_path}/{{path}}"
+        names = {str(value): f"{{{name}}}" for name, value in scope.get("path_params", {}).items()}
+        return "/".join(names.get(segment, segment) for segment in scope["path"].split("/"))
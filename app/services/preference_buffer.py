@@ -0,0 +1,209 @@
+"""
+Write-behind preference buffer
+Like/dislike events are coalesced in memory and written to the wardrobe
+store in batches, while a compact per-user hue preference vector is kept
+for re-ranking recommendations without a database read.
+"""
+import asyncio
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from app.ai_core.mixmatch_logic import MixMatchRecommender, mixmatch_recommender
+from app.config import settings
+from app.services.wardrobe_store import WardrobeStore, wardrobe_store
+
+class _UserPreferences:
+    """Recent votes of one user and the hue vector they add up to"""
+    
+    __slots__ = ("votes", "totals")
+    
+    def __init__(self, bins: int):
+        self.votes: "OrderedDict[str, Tuple[int, int]]" = OrderedDict()  # item_id -> (bin, +1/-1)
+        self.totals = np.zeros(bins)
+
+class PreferenceBuffer:
+    """Coalescing write-behind queue for preference events"""
+    
+    def __init__(
+        self,
+        store: WardrobeStore,
+        recommender: MixMatchRecommender,
+        flush_batch: int = 500,
+        flush_interval: float = 2.0,
+        max_users: int = 10000,
+        items_per_user: int = 200
+    ):
+        self.store = store
+        self.recommender = recommender
+        self.flush_batch = flush_batch
+        self.flush_interval = flush_interval
+        self.max_users = max_users
+        self.items_per_user = items_per_user
+        
+        self._pending: Dict[Tuple[str, str], Dict] = {}
+        self._users: "OrderedDict[str, _UserPreferences]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        
+        self._recorded = 0
+        self._coalesced = 0
+        self._written = 0
+        self._flushes = 0
+        self._failures = 0
+        self._last_error: Optional[str] = None
+    
+    def record(self, user_id: str, item_id: str, liked: bool, color_hex: Optional[str] = None) -> int:
+        """
+        Queue a like/dislike event
+        
+        Repeated votes on the same item before a flush collapse into the
+        latest one. Votes with a non-neutral color also update the user's
+        preference vector immediately.
+        
+        Returns:
+            Number of events waiting to be written
+        """
+        with self._lock:
+            key = (user_id, item_id)
+            if key in self._pending:
+                self._coalesced += 1
+            self._pending[key] = {
+                "user_id": user_id,
+                "item_id": item_id,
+                "liked": liked,
+                "color_hex": color_hex,
+                "updated_at": time.time()
+            }
+            self._recorded += 1
+            pending = len(self._pending)
+            
+            if color_hex is not None:
+                self._vote(user_id, item_id, color_hex, 1 if liked else -1)
+        
+        if pending >= self.flush_batch and self._wakeup is not None:
+            self._wakeup.set()
+        
+        return pending
+    
+    def preference_vector(self, user_id: str) -> Optional[np.ndarray]:
+        """
+        Hue preferences in [-1, 1] per MixMatchRecommender.PREFERENCE_BINS
+        bin, or None when the user has no recent colored votes
+        """
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None or not user.votes:
+                return None
+            self._users.move_to_end(user_id)
+            # Saturates after a handful of votes on the same hue
+            return np.tanh(user.totals / 3.0)
+    
+    async def start(self):
+        """Start the background flusher (call from the running event loop)"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the flusher and write everything still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+    
+    async def flush(self) -> int:
+        """Write pending events now, returns how many were written"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        
+        async with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            
+            if not batch:
+                return 0
+            
+            try:
+                await run_in_threadpool(self.store.save_preferences, list(batch.values()))
+            except Exception as e:
+                with self._lock:
+                    # Keep the batch for the next flush, events recorded meanwhile are newer
+                    for key, row in batch.items():
+                        self._pending.setdefault(key, row)
+                    self._failures += 1
+                    self._last_error = str(e)
+                return 0
+            
+            with self._lock:
+                self._written += len(batch)
+                self._flushes += 1
+            return len(batch)
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "users": len(self._users),
+                "recorded": self._recorded,
+                "coalesced": self._coalesced,
+                "written": self._written,
+                "flushes": self._flushes,
+                "failures": self._failures,
+                "last_error": self._last_error,
+                "running": self._task is not None
+            }
+    
+    async def _run(self):
+        """Flush when flush_batch events are waiting or every flush_interval seconds"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+    
+    def _vote(self, user_id: str, item_id: str, color_hex: str, sign: int):
+        """Apply one vote to the user's vector, replacing an earlier vote on the item"""
+        hue_bin = int(self.recommender.preference_bins([color_hex])[0])
+        
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _UserPreferences(self.recommender.PREFERENCE_BINS)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        self._users.move_to_end(user_id)
+        
+        previous = user.votes.pop(item_id, None)
+        if previous is not None and previous[0] >= 0:
+            user.totals[previous[0]] -= previous[1]
+        
+        user.votes[item_id] = (hue_bin, sign)
+        if hue_bin >= 0:
+            user.totals[hue_bin] += sign
+        
+        # Only recent votes count
+        while len(user.votes) > self.items_per_user:
+            old_bin, old_sign = user.votes.popitem(last=False)[1]
+            if old_bin >= 0:
+                user.totals[old_bin] -= old_sign
+
+# Singleton instance
+preference_buffer = PreferenceBuffer(
+    wardrobe_store,
+    mixmatch_recommender,
+    flush_batch=settings.PREFERENCE_FLUSH_BATCH,
+    flush_interval=settings.PREFERENCE_FLUSH_INTERVAL_SECONDS,
+    max_users=settings.PREFERENCE_MAX_USERS,
+    items_per_user=settings.PREFERENCE_ITEMS_PER_USER
+)
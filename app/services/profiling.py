@@ -0,0 +1,211 @@
+"""
+Opt-in request profiling
+Requests carrying the admin token in the profiling header, or picked by the
+sample rate, get their worker pool tasks run under cProfile. cv2 and numpy
+calls show up as built-in functions in the profile. Profiles are kept in a
+bounded in-memory ring for download from the admin endpoints.
+
+Only one task per process is profiled at a time: from Python 3.12 cProfile
+hooks the whole interpreter and a second profiler cannot start. A task that
+finds the profiler busy runs unprofiled and is listed as such. In thread
+mode on 3.12 a profile also includes work of the other worker threads.
+"""
+import cProfile
+import hmac
+import itertools
+import marshal
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.config import settings
+
+PROFILE_HEADER = b"x-profile"
+
+class RequestProfile:
+    """Profiles of the worker tasks run for one request"""
+    
+    def __init__(self, profile_id: int, method: str, path: str, trigger: str):
+        self.profile_id = profile_id
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.duration_ms: Optional[float] = None
+        self.status: Optional[int] = None
+        self.tasks: List[Dict] = []
+        self._lock = threading.Lock()
+    
+    def add_task(self, name: str, duration_ms: float, stats: Optional[bytes]):
+        """Record a task, stats is None when it ran unprofiled"""
+        with self._lock:
+            self.tasks.append({"task": name, "duration_ms": duration_ms, "stats": stats})
+    
+    def summary(self) -> Dict:
+        return {
+            "id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "tasks": [
+                {"task": task["task"], "duration_ms": task["duration_ms"], "profiled": task["stats"] is not None}
+                for task in self.tasks
+            ]
+        }
+    
+    def stats(self) -> Optional[pstats.Stats]:
+        """All task profiles merged, or None if the request ran no worker task"""
+        merged = None
+        for task in self.tasks:
+            if task["stats"] is None:
+                continue
+            loaded = pstats.Stats(_LoadedStats(marshal.loads(task["stats"])))
+            if merged is None:
+                merged = loaded
+            else:
+                merged.add(loaded)
+        return merged
+
+class _LoadedStats:
+    """Adapter so pstats.Stats accepts a stats dict shipped from a worker"""
+    
+    def __init__(self, stats: Dict):
+        self.stats = stats
+    
+    def create_stats(self):
+        pass
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+# Held while a task runs under cProfile in this process
+_profiler_lock = threading.Lock()
+
+def current() -> Optional[RequestProfile]:
+    """Profile of the request being handled, if it is being profiled"""
+    return _current.get()
+
+def profiled_call(func: Callable, *args: Any) -> Tuple[Any, float, bytes]:
+    """
+    Run func(*args) under cProfile
+    
+    Module-level so it can run in process-mode workers; the profile comes
+    back as marshalled pstats data. When another task in this process is
+    being profiled (or another profiling tool is active), func runs
+    unprofiled instead of failing.
+    
+    Returns:
+        Tuple of (result, duration_ms, stats), stats is None when unprofiled
+    """
+    if not _profiler_lock.acquire(blocking=False):
+        return _unprofiled_call(func, *args)
+    try:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool is already active
+            return _unprofiled_call(func, *args)
+        started = time.perf_counter()
+        try:
+            result = func(*args)
+        finally:
+            profiler.disable()
+        duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        profiler.create_stats()
+        return result, duration_ms, marshal.dumps(profiler.stats)
+    finally:
+        _profiler_lock.release()
+
+def _unprofiled_call(func: Callable, *args: Any) -> Tuple[Any, float, None]:
+    started = time.perf_counter()
+    result = func(*args)
+    return result, round((time.perf_counter() - started) * 1000, 2), None
+
+class ProfileStore:
+    """Ring of the most recent request profiles"""
+    
+    def __init__(self, max_profiles: int = 50):
+        self._profiles: "deque[RequestProfile]" = deque(maxlen=max(1, max_profiles))
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+    
+    def start(self, method: str, path: str, trigger: str) -> RequestProfile:
+        with self._lock:
+            profile = RequestProfile(next(self._ids), method, path, trigger)
+            self._profiles.append(profile)
+        return profile
+    
+    def get(self, profile_id: int) -> Optional[RequestProfile]:
+        with self._lock:
+            for profile in self._profiles:
+                if profile.profile_id == profile_id:
+                    return profile
+        return None
+    
+    def list(self) -> List[Dict]:
+        """Summaries, newest first"""
+        with self._lock:
+            profiles = list(self._profiles)
+        return [profile.summary() for profile in reversed(profiles)]
+
+class ProfilingMiddleware:
+    """
+    Profile requests that ask for it or fall in the sample
+    
+    A request is profiled when its X-Profile header equals the admin token,
+    or with probability sample_rate. Other requests only pay for a header
+    lookup. Profiled responses carry an X-Profile-Id header.
+    """
+    
+    def __init__(self, app, store: ProfileStore, token: str = "", sample_rate: float = 0.0):
+        self.app = app
+        self.store = store
+        self.token = token.encode()
+        self.sample_rate = sample_rate
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        trigger = self._trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+        
+        profile = self.store.start(scope["method"], scope["path"], trigger)
+        
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", str(profile.profile_id).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+        
+        token = _current.set(profile)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            _current.reset(token)
+    
+    def _trigger(self, scope) -> Optional[str]:
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    return "header" if hmac.compare_digest(value, self.token) else None
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+# Singleton instance
+profile_store = ProfileStore(max_profiles=settings.PROFILING_MAX_PROFILES)
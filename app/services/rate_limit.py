@@ -0,0 +1,155 @@
+"""
+Per-client rate limiting
+A token bucket per client address in front of the API. Every request
+costs one token and expensive endpoints cost more; a client whose bucket
+is empty gets a 429 with Retry-After before its upload is read. Batch
+uploads pay the rest of their per-file cost once the form is parsed and
+may go into debt, which throttles the client's next requests (see charge).
+Buckets are kept for the most recent max_clients addresses.
+"""
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from fastapi.responses import JSONResponse
+from app.config import settings
+
+class RateLimiter:
+    """Token buckets keyed by client address"""
+    
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_clients: int = 10000,
+        costs: Optional[Dict[str, float]] = None,
+        exempt_prefixes: Iterable[str] = ()
+    ):
+        """
+        Args:
+            rate: Tokens added per second, 0 disables limiting
+            burst: Bucket size (tokens a new or idle client starts with)
+            costs: Tokens per request for specific paths, others cost 1
+            exempt_prefixes: Path prefixes that are never limited
+        """
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_clients = max(1, max_clients)
+        self.costs = costs or {}
+        self.exempt_prefixes = tuple(exempt_prefixes)
+        # client -> (tokens, monotonic time of the last update); only used
+        # from the event loop, so no lock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._allowed = 0
+        self._limited = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+    
+    def cost(self, path: str) -> float:
+        """Tokens a request to path costs, 0 for exempt paths"""
+        if path.startswith(self.exempt_prefixes):
+            return 0.0
+        return self.costs.get(path, 1.0)
+    
+    def acquire(self, client: str, cost: float, now: Optional[float] = None) -> float:
+        """
+        Take cost tokens from a client's bucket
+        
+        Returns:
+            0 when the request may proceed, otherwise the seconds until the
+            bucket holds enough tokens
+        """
+        now = time.monotonic() if now is None else now
+        tokens = self._refill(client, now)
+        
+        # A cost above the bucket size would never pass: it needs a full
+        # bucket and leaves the client in debt for the rest
+        needed = min(cost, self.burst)
+        if tokens >= needed:
+            tokens -= cost
+            wait = 0.0
+            self._allowed += 1
+        else:
+            wait = (needed - tokens) / self.rate
+            self._limited += 1
+        
+        self._store(client, tokens, now)
+        return wait
+    
+    def charge(self, client: str, cost: float, now: Optional[float] = None):
+        """
+        Take extra tokens for a request already admitted (e.g. per batch file)
+        
+        Never refuses: a short bucket goes into debt, and the client's next
+        requests wait until it is paid off.
+        """
+        if not self.enabled or cost <= 0:
+            return
+        now = time.monotonic() if now is None else now
+        self._store(client, self._refill(client, now) - cost, now)
+    
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "rate": self.rate,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "max_clients": self.max_clients,
+            "allowed": self._allowed,
+            "limited": self._limited
+        }
+    
+    def _refill(self, client: str, now: float) -> float:
+        """Tokens in a client's bucket at now, taking the bucket out of the LRU order"""
+        tokens, updated = self._buckets.pop(client, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+    
+    def _store(self, client: str, tokens: float, now: float):
+        self._buckets[client] = (tokens, now)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+
+class RateLimitMiddleware:
+    """Answer 429 to clients that ran out of tokens"""
+    
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.limiter.enabled:
+            await self.app(scope, receive, send)
+            return
+        
+        cost = self.limiter.cost(scope["path"])
+        if cost > 0:
+            client = scope.get("client")
+            wait = self.limiter.acquire(client[0] if client else "unknown", cost)
+            if wait > 0:
+                response = JSONResponse(
+                    status_code=429,
+                    content={"detail": "Too many requests, please slow down"},
+                    headers={"Retry-After": str(math.ceil(wait))}
+                )
+                await response(scope, receive, send)
+                return
+        
+        await self.app(scope, receive, send)
+
+# Singleton instance
+_API = settings.API_V1_STR
+rate_limiter = RateLimiter(
+    rate=settings.RATE_LIMIT_PER_SECOND,
+    burst=settings.RATE_LIMIT_BURST,
+    max_clients=settings.RATE_LIMIT_MAX_CLIENTS,
+    costs={
+        f"{_API}/scan/accurate": settings.RATE_LIMIT_SCAN_COST,
+        f"{_API}/scan/batch": settings.RATE_LIMIT_SCAN_COST,  # First file, the rest in scan_garment_batch
+        f"{_API}/scan/jobs": settings.RATE_LIMIT_SCAN_COST,
+        f"{_API}/profile/skin-tone/jobs": settings.RATE_LIMIT_SCAN_COST,
+    },
+    # Probes, scrapers and immutable image files must not be throttled
+    exempt_prefixes=(f"{_API}/health", f"{_API}/metrics", "/images/")
+)
@@ -0,0 +1,187 @@
+"""
+Content-addressed result cache for AI core outputs
+Keyed by a hash of the uploaded bytes plus the processor version, with a
+memory-bounded LRU tier, an optional on-disk tier and single-flight dedupe
+"""
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.config import settings
+
+# Hash large uploads off the event loop (hashlib releases the GIL)
+_HASH_OFFLOAD_BYTES = 1024 * 1024
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest of raw upload bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+async def content_hash_async(data: bytes) -> str:
+    """content_hash that moves large payloads to a thread"""
+    if len(data) >= _HASH_OFFLOAD_BYTES:
+        return await asyncio.to_thread(content_hash, data)
+    return content_hash(data)
+
+class ResultCache:
+    """Two-tier cache for processor results, safe to use from the event loop"""
+    
+    def __init__(self, max_bytes: int, disk_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir or None
+        
+        self._entries: "OrderedDict[str, Tuple[Dict, int]]" = OrderedDict()
+        self._size = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+        }
+        
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+    
+    @staticmethod
+    def make_key(namespace: str, version: str, digest: str) -> str:
+        """Build a cache key from a namespace, processor version and content hash"""
+        return f"{namespace}-v{version}-{digest}"
+    
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Dict]]
+    ) -> Dict:
+        """
+        Return the cached result for key, computing it at most once
+        
+        Concurrent callers with the same key wait on a single computation.
+        Only successful results are stored. Returned dicts are shared and
+        must be treated as read-only.
+        
+        Args:
+            key: Key from make_key
+            compute: Coroutine factory producing the processor result
+        """
+        value = self._get_memory(key)
+        if value is not None:
+            self._counters["memory_hits"] += 1
+            return value
+        
+        task = self._inflight.get(key)
+        if task is not None:
+            self._counters["coalesced"] += 1
+        else:
+            # Run as its own task so a disconnecting caller does not cancel it for the others
+            task = asyncio.ensure_future(self._load(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        
+        return await asyncio.shield(task)
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and tier sizes"""
+        return {
+            **self._counters,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "disk_enabled": self.disk_dir is not None,
+            "inflight": len(self._inflight),
+        }
+    
+    def clear(self):
+        """Drop the memory tier"""
+        self._entries.clear()
+        self._size = 0
+    
+    async def _load(self, key: str, compute: Callable[[], Awaitable[Dict]]) -> Dict:
+        value = await self._get_disk(key)
+        if value is not None:
+            self._counters["disk_hits"] += 1
+            self._put_memory(key, value)
+            return value
+        
+        self._counters["misses"] += 1
+        value = await compute()
+        if value.get("status") == "success":
+            self._put_memory(key, value)
+            await self._put_disk(key, value)
+        return value
+    
+    def _finish(self, key: str, task: asyncio.Future):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            # Mark retrieved so a failure nobody awaited is not logged
+            task.exception()
+    
+    def _get_memory(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+    
+    def _put_memory(self, key: str, value: Dict):
+        size = len(json.dumps(value))
+        if size > self.max_bytes:
+            return
+        
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= old[1]
+        
+        self._entries[key] = (value, size)
+        self._size += size
+        
+        while self._size > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+            self._counters["evictions"] += 1
+    
+    def _disk_path(self, key: str) -> str:
+        digest = key.rsplit("-", 1)[-1]
+        return os.path.join(self.disk_dir, digest[:2], f"{key}.json")
+    
+    async def _get_disk(self, key: str) -> Optional[Dict]:
+        if not self.disk_dir:
+            return None
+        return await asyncio.to_thread(self._read_disk, self._disk_path(key))
+    
+    async def _put_disk(self, key: str, value: Dict):
+        if not self.disk_dir:
+            return
+        await asyncio.to_thread(self._write_disk, self._disk_path(key), value)
+    
+    @staticmethod
+    def _read_disk(path: str) -> Optional[Dict]:
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    @staticmethod
+    def _write_disk(path: str, value: Dict):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            # The disk tier is best effort
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+# Singleton instance
+result_cache = ResultCache(
+    max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+    disk_dir=settings.RESULT_CACHE_DIR
+)
@@ -0,0 +1,412 @@
+"""
+Wardrobe persistence
+Stores scan results and preference events per user with pooled
+connections, bulk upserts and keyset-paginated reads. SQLite for local
+runs, PostgreSQL in production.
+"""
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Scan result fields persisted per garment (JSON columns are marked)
+ITEM_FIELDS = [
+    "color_hex",
+    "color_name",
+    "palette",  # JSON
+    "garment_type",
+    "measurements",  # JSON
+    "confidence",
+    "image_url",
+]
+JSON_FIELDS = {"palette", "measurements"}
+
+# Fields only some pipeline tiers produce, a rescan without them keeps the stored values
+TIER_FIELDS = {"garment_type", "measurements"}
+
+class _SQLitePool:
+    """Small pool of SQLite connections shared across threads"""
+    
+    name = "sqlite"
+    placeholder = "?"
+    serial_type = "INTEGER PRIMARY KEY AUTOINCREMENT"
+    float_type = "REAL"  # 8-byte float in SQLite
+    
+    def __init__(self, path: str, size: int):
+        self._uri = path == ":memory:"
+        if self._uri:
+            # Named shared-cache database so every pooled connection sees the same data
+            path = f"file:wardrobe-{id(self)}?mode=memory&cache=shared"
+        elif os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        self._path = path
+        self._size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._keepalive = self._connect() if self._uri else None
+    
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._acquire()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+    
+    def executemany(self, cursor, sql: str, rows: List[tuple]):
+        cursor.executemany(sql, rows)
+    
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+        if self._keepalive is not None:
+            self._keepalive.close()
+    
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            if self._created < self._size:
+                self._created += 1
+                return self._connect()
+        
+        return self._idle.get()
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._path, timeout=30, check_same_thread=False, uri=self._uri)
+        if not self._uri:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+class _PostgresPool:
+    """psycopg2 threaded connection pool, callers wait for a free connection"""
+    
+    name = "postgresql"
+    placeholder = "%s"
+    serial_type = "BIGSERIAL PRIMARY KEY"
+    float_type = "DOUBLE PRECISION"  # REAL is 4 bytes in PostgreSQL, too coarse for epoch timestamps
+    
+    def __init__(self, dsn: str, size: int):
+        # Optional dependency, only needed when a PostgreSQL URL is configured
+        import psycopg2.extras
+        import psycopg2.pool
+        
+        self._extras = psycopg2.extras
+        self._pool = psycopg2.pool.ThreadedConnectionPool(1, size, dsn=dsn)
+        # getconn raises PoolError instead of blocking once size connections are out
+        self._slots = threading.BoundedSemaphore(size)
+    
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            conn = self._pool.getconn()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self._pool.putconn(conn)
+        finally:
+            self._slots.release()
+    
+    def executemany(self, cursor, sql: str, rows: List[tuple]):
+        # One round trip per page instead of per row
+        self._extras.execute_batch(cursor, sql, rows, page_size=100)
+    
+    def close(self):
+        self._pool.closeall()
+
+class WardrobeStore:
+    """Persist and page through scanned garments per user"""
+    
+    def __init__(self, url: str, pool_size: int = 5):
+        self.url = url
+        self.pool_size = pool_size
+        self._pool = None
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[str, List[Dict]], None]] = []
+    
+    @property
+    def backend(self) -> str:
+        """Backend name derived from the URL"""
+        return "postgresql" if self.url.startswith(("postgres://", "postgresql://")) else "sqlite"
+    
+    def add_listener(self, callback: Callable[[str, List[Dict]], None]):
+        """
+        Call callback(user_id, items) after every successful save
+        
+        Items are the saved dicts with garment_id filled in. Exceptions
+        from callbacks are logged, the save still succeeds.
+        """
+        self._listeners.append(callback)
+    
+    @staticmethod
+    def make_garment_id(user_id: str, content_hash: str) -> str:
+        """Stable garment id for one image in one user's wardrobe"""
+        digest = hashlib.sha256(f"{user_id}:{content_hash}".encode()).hexdigest()
+        return f"garment_{digest[:20]}"
+    
+    def save_items(self, user_id: str, items: List[Dict]) -> List[str]:
+        """
+        Insert or update scanned garments in one transaction
+        
+        Args:
+            user_id: Wardrobe owner
+            items: Dicts with content_hash, filename and ITEM_FIELDS
+        
+        Returns:
+            Garment ids in input order
+        """
+        if not items:
+            return []
+        
+        pool = self._get_pool()
+        now = time.time()
+        columns = ["garment_id", "user_id", "content_hash", "filename", *ITEM_FIELDS, "created_at", "updated_at"]
+        updates = ", ".join(
+            f"{column} = COALESCE(excluded.{column}, wardrobe_items.{column})" if column in TIER_FIELDS
+            else f"{column} = excluded.{column}"
+            for column in ["filename", *ITEM_FIELDS, "updated_at"]
+        )
+        sql = (
+            f"INSERT INTO wardrobe_items ({', '.join(columns)}) "
+            f"VALUES ({', '.join([pool.placeholder] * len(columns))}) "
+            f"ON CONFLICT (user_id, content_hash) DO UPDATE SET {updates}"
+        )
+        
+        garment_ids = []
+        rows = []
+        for item in items:
+            garment_id = self.make_garment_id(user_id, item["content_hash"])
+            garment_ids.append(garment_id)
+            rows.append((
+                garment_id,
+                user_id,
+                item["content_hash"],
+                item.get("filename"),
+                *[self._encode(field, item.get(field)) for field in ITEM_FIELDS],
+                now,
+                now,
+            ))
+        
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            pool.executemany(cursor, sql, rows)
+        
+        if self._listeners:
+            saved = [{**item, "garment_id": garment_id} for item, garment_id in zip(items, garment_ids)]
+            for callback in self._listeners:
+                # The rows are committed, a failing listener must not fail the save
+                try:
+                    callback(user_id, saved)
+                except Exception:
+                    logger.exception("Wardrobe save listener failed for user %s", user_id)
+        
+        return garment_ids
+    
+    def list_items(self, user_id: str, limit: int = 50, cursor: Optional[int] = None) -> Dict:
+        """
+        Page through a user's wardrobe, newest first
+        
+        Args:
+            limit: Page size
+            cursor: next_cursor from the previous page
+        
+        Returns:
+            Dictionary with items and next_cursor (None on the last page)
+        """
+        pool = self._get_pool()
+        p = pool.placeholder
+        sql = f"SELECT seq, {self._select_columns()} FROM wardrobe_items WHERE user_id = {p}"
+        params: list = [user_id]
+        if cursor is not None:
+            sql += f" AND seq < {p}"
+            params.append(cursor)
+        sql += f" ORDER BY seq DESC LIMIT {p}"
+        params.append(limit + 1)
+        
+        with pool.connection() as conn:
+            db_cursor = conn.cursor()
+            db_cursor.execute(sql, params)
+            rows = db_cursor.fetchall()
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "items": [self._decode(row[1:]) for row in rows],
+            "next_cursor": rows[-1][0] if has_more else None,
+        }
+    
+    def save_preferences(self, rows: List[Dict]):
+        """
+        Upsert like/dislike events in one transaction
+        
+        Args:
+            rows: Dicts with user_id, item_id, liked, color_hex and updated_at
+        """
+        if not rows:
+            return
+        
+        pool = self._get_pool()
+        columns = ["user_id", "item_id", "liked", "color_hex", "updated_at"]
+        sql = (
+            f"INSERT INTO preferences ({', '.join(columns)}) "
+            f"VALUES ({', '.join([pool.placeholder] * len(columns))}) "
+            f"ON CONFLICT (user_id, item_id) DO UPDATE SET "
+            f"liked = excluded.liked, color_hex = excluded.color_hex, updated_at = excluded.updated_at"
+        )
+        
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            pool.executemany(cursor, sql, [tuple(row[column] for column in columns) for row in rows])
+    
+    def iter_items(self, user_id: str, page_size: int = 500) -> Iterator[Dict]:
+        """Yield every garment of a user, newest first, one page at a time"""
+        cursor = None
+        while True:
+            page = self.list_items(user_id, limit=page_size, cursor=cursor)
+            yield from page["items"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+    
+    def get_item(self, user_id: str, garment_id: str) -> Optional[Dict]:
+        """Fetch one garment, or None"""
+        pool = self._get_pool()
+        p = pool.placeholder
+        sql = f"SELECT {self._select_columns()} FROM wardrobe_items WHERE user_id = {p} AND garment_id = {p}"
+        
+        with pool.connection() as conn:
+            db_cursor = conn.cursor()
+            db_cursor.execute(sql, (user_id, garment_id))
+            row = db_cursor.fetchone()
+        
+        return self._decode(row) if row else None
+    
+    def ping(self) -> bool:
+        """Check that the database answers"""
+        try:
+            with self._get_pool().connection() as conn:
+                conn.cursor().execute("SELECT 1")
+            return True
+        except Exception:
+            return False
+    
+    def close(self):
+        """Close pooled connections"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+    
+    def _get_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    if self.backend == "postgresql":
+                        pool = _PostgresPool(self.url, self.pool_size)
+                    else:
+                        pool = _SQLitePool(self._sqlite_path(), self.pool_size)
+                    self._create_schema(pool)
+                    self._pool = pool
+        return self._pool
+    
+    def _sqlite_path(self) -> str:
+        # sqlite:///relative.db, sqlite:////absolute.db, sqlite:// for memory
+        prefix = "sqlite:///"
+        path = self.url[len(prefix):] if self.url.startswith(prefix) else ""
+        return path or ":memory:"
+    
+    def _create_schema(self, pool):
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS wardrobe_items (
+                    seq {pool.serial_type},
+                    garment_id TEXT NOT NULL UNIQUE,
+                    user_id TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    filename TEXT,
+                    color_hex TEXT,
+                    color_name TEXT,
+                    palette TEXT,
+                    garment_type TEXT,
+                    measurements TEXT,
+                    confidence {pool.float_type},
+                    image_url TEXT,
+                    created_at {pool.float_type} NOT NULL,
+                    updated_at {pool.float_type} NOT NULL,
+                    UNIQUE (user_id, content_hash)
+                )
+            """)
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_wardrobe_items_user_seq ON wardrobe_items (user_id, seq)"
+            )
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS preferences (
+                    user_id TEXT NOT NULL,
+                    item_id TEXT NOT NULL,
+                    liked BOOLEAN NOT NULL,
+                    color_hex TEXT,
+                    updated_at {pool.float_type} NOT NULL,
+                    PRIMARY KEY (user_id, item_id)
+                )
+            """)
+            
+            if pool.name == "postgresql":
+                # Widen float4 columns of tables created before DOUBLE PRECISION was used
+                cursor.execute("""
+                    SELECT table_name, column_name FROM information_schema.columns
+                    WHERE table_schema = current_schema()
+                    AND table_name IN ('wardrobe_items', 'preferences') AND data_type = 'real'
+                """)
+                for table, column in cursor.fetchall():
+                    cursor.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE DOUBLE PRECISION")
+    
+    @staticmethod
+    def _select_columns() -> str:
+        return ", ".join(["garment_id", "filename", *ITEM_FIELDS, "created_at"])
+    
+    @staticmethod
+    def _encode(field: str, value):
+        if field in JSON_FIELDS and value is not None:
+            return json.dumps(value)
+        return value
+    
+    @staticmethod
+    def _decode(row: tuple) -> Dict:
+        keys = ["garment_id", "filename", *ITEM_FIELDS, "created_at"]
+        item = dict(zip(keys, row))
+        for field in JSON_FIELDS:
+            if item[field] is not None:
+                item[field] = json.loads(item[field])
+        return item
+
+# Singleton instance
+wardrobe_store = WardrobeStore(
+    url=settings.WARDROBE_DATABASE_URL,
+    pool_size=settings.WARDROBE_POOL_SIZE
+)
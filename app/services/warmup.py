@@ -0,0 +1,94 @@
+"""
+Startup warm-up and readiness
+Brings up the worker pool (each worker warms its pipelines on start) and
+the in-process lookup tables in the background after the server starts
+listening, and records how long startup took. /api/v1/health reports
+ready only once this has finished.
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from app.ai_core import tasks
+from app.ai_core.mixmatch_logic import mixmatch_recommender
+from app.services.executor import AnalysisExecutor, analysis_executor
+
+class Warmup:
+    """Background warm-up with per-step timings"""
+    
+    def __init__(self, executor: AnalysisExecutor):
+        self.executor = executor
+        self.ready = False
+        self._timings: Dict[str, float] = {}
+        self._worker: Dict = {}
+        self._error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._done: Optional[asyncio.Event] = None
+    
+    def record(self, step: str, started: float):
+        """Store the milliseconds since a time.perf_counter() reading for a step"""
+        self._timings[f"{step}_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    
+    def start(self, process_started: float):
+        """
+        Run the warm-up in the background (call from the running event loop)
+        
+        Args:
+            process_started: time.perf_counter() reading taken when the app
+                module started importing, for the total startup time
+        """
+        if self._task is None:
+            self._done = asyncio.Event()
+            self._task = asyncio.create_task(self._run(process_started))
+    
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the warm-up to finish, returns whether the app is ready"""
+        if self._done is not None:
+            try:
+                await asyncio.wait_for(self._done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.ready
+    
+    @property
+    def worker(self) -> Dict:
+        """
+        Segmentation and skin detection stats reported by a worker after
+        its warm-up, empty until then. In process mode the API process never
+        runs the models, so these are the ones to judge readiness by.
+        """
+        return self._worker
+    
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "timings": dict(self._timings),
+            "error": self._error
+        }
+    
+    async def _run(self, process_started: float):
+        try:
+            # Color naming tables used by recommendations outside the workers
+            started = time.perf_counter()
+            await run_in_threadpool(mixmatch_recommender.get_instant_match, "#336699", "Neutral")
+            self.record("recommender", started)
+            
+            # Workers run tasks.warm_up as they start
+            started = time.perf_counter()
+            await self.executor.start()
+            self.record("workers", started)
+            
+            # What the warm-up cost inside a worker and the state it left
+            report = await self.executor.run(tasks.worker_stats)
+            self._timings["worker"] = report.pop("timings")
+            self._worker = report
+        except Exception as e:
+            self._error = f"{type(e).__name__}: {e}"
+        finally:
+            self.record("startup", process_started)
+            # Serve traffic even if a step failed, the error is reported in the stats
+            self.ready = True
+            self._done.set()
+
+# Singleton instance
+warmup = Warmup(analysis_executor)
@@ -0,0 +1 @@
+"""Benchmarks for the AI core and API (run with python -m benchmarks.run)"""
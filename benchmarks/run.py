@@ -0,0 +1,305 @@
+"""
+Benchmark and performance-regression suite
+Times every GarmentProcessor tier, ProfileAnalyzer and MixMatch path on the
+images in public/, then drives the FastAPI app in process under concurrency
+for end-to-end throughput and p50/p95/p99 latency.
+
+Usage (from the repository root):
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --compare bench.json --threshold 0.2
+
+With --compare the run exits with status 1 when any path present in both
+runs got slower than the threshold allows.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# All benchmark requests come from one client, the per-client limit would throttle them
+os.environ.setdefault("RATE_LIMIT_PER_SECOND", "0")
+
+IMAGE_EXTENSIONS = {".jpg": "jpeg", ".jpeg": "jpeg", ".png": "png", ".webp": "webp"}
+
+# Differences below this are noise, whatever the ratio
+MIN_REGRESSION_MS = 0.5
+
+def load_images(directory: str, min_bytes: int) -> List[Tuple[str, str, bytes]]:
+    """(name, format, bytes) of every image in directory, smallest first"""
+    images = []
+    for name in sorted(os.listdir(directory)):
+        image_format = IMAGE_EXTENSIONS.get(os.path.splitext(name)[1].lower())
+        if image_format is None:
+            continue
+        with open(os.path.join(directory, name), "rb") as f:
+            data = f.read()
+        if len(data) >= min_bytes:
+            images.append((name, image_format, data))
+    return sorted(images, key=lambda image: len(image[2]))
+
+def summarize(samples_ms: List[float], errors: int = 0, elapsed_s: Optional[float] = None) -> Dict:
+    """Latency percentiles of one path"""
+    values = np.array(samples_ms or [0.0])
+    summary = {
+        "count": len(samples_ms),
+        "errors": errors,
+        "mean_ms": round(float(values.mean()), 3),
+        "min_ms": round(float(values.min()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+    if elapsed_s:
+        summary["throughput_rps"] = round(len(samples_ms) / elapsed_s, 2)
+    return summary
+
+def time_calls(func: Callable, inputs: List, iterations: int, warmup: int) -> Dict:
+    """Call func on every input `iterations` times and summarize the latencies"""
+    for item in inputs[:warmup]:
+        func(item)
+    
+    samples, errors = [], 0
+    for _ in range(iterations):
+        for item in inputs:
+            started = time.perf_counter()
+            result = func(item)
+            samples.append((time.perf_counter() - started) * 1000)
+            if isinstance(result, dict) and result.get("status") == "error":
+                errors += 1
+    return summarize(samples, errors)
+
+def bench_processors(images: List[Tuple[str, str, bytes]], iterations: int, warmup: int) -> Dict[str, Dict]:
+    """Per-path latency of the AI core, called directly in this process"""
+    from app.ai_core.curation import weekly_curator
+    from app.ai_core.garment_processor import GarmentProcessor, garment_processor
+    from app.ai_core.mixmatch_logic import mixmatch_recommender
+    from app.ai_core.profile_analyzer import profile_analyzer
+    
+    results = {}
+    by_format: Dict[str, List[bytes]] = {}
+    for _, image_format, data in images:
+        by_format.setdefault(image_format, []).append(data)
+    
+    for image_format, datas in sorted(by_format.items()):
+        for tier in GarmentProcessor.TIERS:
+            results[f"garment.{tier}[{image_format}]"] = time_calls(
+                lambda data, tier=tier: garment_processor.process_garment(data, tier), datas, iterations, warmup
+            )
+        results[f"profile.skin_tone[{image_format}]"] = time_calls(
+            profile_analyzer.analyze_skin_tone, datas, iterations, warmup
+        )
+    
+    rng = np.random.default_rng(0)
+    colors = [f"#{value:06X}" for value in rng.integers(0, 0xFFFFFF, 500).tolist()]
+    results["mixmatch.instant_match"] = time_calls(
+        lambda color: mixmatch_recommender.get_instant_match(color, "Warm"), colors[:50], iterations, warmup
+    )
+    results["mixmatch.instant_matches[50]"] = time_calls(
+        lambda batch: mixmatch_recommender.get_instant_matches(batch, "Warm"), [colors[:50]], iterations * 10, warmup
+    )
+    
+    garment_types = ["standard", "long", "wide"]
+    wardrobe = [
+        {"garment_id": f"g{i}", "color_hex": color, "garment_type": garment_types[i % 3]}
+        for i, color in enumerate(colors)
+    ]
+    results["curation.curate[500]"] = time_calls(
+        lambda items: weekly_curator.curate(items, "Warm", seed="bench"), [wardrobe], iterations * 5, warmup
+    )
+    
+    return results
+
+async def _drive(client, requests: List[Tuple[str, str, Dict]], concurrency: int) -> Tuple[List[float], int, float]:
+    """Send requests with `concurrency` in flight, returns (latencies ms, errors, elapsed s)"""
+    queue = list(reversed(requests))
+    samples, errors = [], 0
+    
+    async def worker():
+        nonlocal errors
+        while queue:
+            method, url, kwargs = queue.pop()
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            samples.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, errors, time.perf_counter() - started
+
+async def _bench_api(
+    images: List[Tuple[str, str, bytes]],
+    count: int,
+    concurrency: int,
+    unique_uploads: bool
+) -> Dict[str, Dict]:
+    import httpx
+    from main import app
+    from app.services.warmup import warmup
+    
+    def upload(endpoint: str, position: int) -> Tuple[str, str, Dict]:
+        name, image_format, data = images[position % len(images)]
+        if unique_uploads:
+            # Trailing bytes after the end marker are ignored by decoders but
+            # change the content hash, so the result cache never answers
+            data = data + position.to_bytes(8, "little")
+        return "POST", endpoint, {"files": {"file": (name, data, f"image/{image_format}")}}
+    
+    scenarios = {
+        "api.scan_accurate": [upload("/api/v1/scan/accurate", i) for i in range(count)],
+        "api.scan_quick": [upload("/api/v1/scan/quick", i) for i in range(count)],
+        "api.profile_skin_tone": [upload("/api/v1/profile/skin-tone", i) for i in range(count)],
+        "api.recommend_instant": [
+            ("GET", "/api/v1/recommend/instant", {"params": {"item_color": color, "undertone": "Warm"}})
+            for color in (f"#{(i * 7919) % 0xFFFFFF:06X}" for i in range(count))
+        ],
+    }
+    
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        # Startup warm-up runs in the background, measure a ready server
+        await warmup.wait()
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # Warm up the worker pool and lazy imports
+            await _drive(client, [scenario[0] for scenario in scenarios.values()], 1)
+            for name, requests in scenarios.items():
+                samples, errors, elapsed = await _drive(client, requests, concurrency)
+                results[f"{name}[c{concurrency}]"] = summarize(samples, errors, elapsed)
+    return results
+
+def bench_api(images: List[Tuple[str, str, bytes]], count: int, concurrency: int, unique_uploads: bool) -> Dict[str, Dict]:
+    """End-to-end latency and throughput through the ASGI app (no network)"""
+    return asyncio.run(_bench_api(images, count, concurrency, unique_uploads))
+
+def compare(current: Dict, baseline: Dict, metric: str, threshold: float) -> List[Dict]:
+    """
+    Paths present in both runs whose metric grew by more than threshold
+    (a fraction, 0.2 = 20% slower) and by at least MIN_REGRESSION_MS
+    """
+    regressions = []
+    for name, result in sorted(current["results"].items()):
+        before = baseline["results"].get(name)
+        if before is None or not before.get(metric):
+            continue
+        ratio = result[metric] / before[metric]
+        if ratio > 1 + threshold and result[metric] - before[metric] >= MIN_REGRESSION_MS:
+            regressions.append({
+                "path": name,
+                "baseline": before[metric],
+                "current": result[metric],
+                "ratio": round(ratio, 3)
+            })
+    return regressions
+
+def print_table(results: Dict[str, Dict], baseline: Optional[Dict] = None, metric: str = "p95_ms"):
+    header = f"{'path':<40} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'rps':>8}"
+    if baseline:
+        header += f" {'vs base':>8}"
+    print(header)
+    for name, result in results.items():
+        line = (
+            f"{name:<40} {result['count']:>6} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+            f"{result['p99_ms']:>9.2f} {result.get('throughput_rps', ''):>8}"
+        )
+        before = (baseline or {}).get(name)
+        if before and before.get(metric):
+            line += f" {result[metric] / before[metric]:>7.2f}x"
+        print(line)
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="LokaFit AI core and API benchmarks")
+    parser.add_argument("--images", default=os.path.join(REPO_ROOT, "public"), help="Directory with JPEG/PNG/WebP images")
+    parser.add_argument("--min-bytes", type=int, default=2048, help="Skip images smaller than this (icons)")
+    parser.add_argument("--suite", choices=["all", "processors", "api"], default="all")
+    parser.add_argument("--iterations", type=int, default=5, help="Passes over the images per processor path")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--requests", type=int, default=100, help="Requests per API scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--cached", action="store_true", help="Send identical uploads so the result cache can answer")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run")
+    parser.add_argument("--metric", choices=["mean_ms", "p50_ms", "p95_ms", "p99_ms"], default="p95_ms")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown as a fraction (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    
+    # The API suite writes to a throwaway wardrobe database and image store
+    scratch = tempfile.mkdtemp(prefix="lokafit-bench-")
+    os.environ.setdefault("WARDROBE_DATABASE_URL", f"sqlite:///{scratch}/wardrobe.db")
+    os.environ.setdefault("IMAGE_STORE_DIR", os.path.join(scratch, "images"))
+    sys.path.insert(0, REPO_ROOT)
+    from app.config import settings
+    
+    images = load_images(args.images, args.min_bytes)
+    if not images:
+        parser.error(f"No images found in {args.images}")
+    
+    results = {}
+    if args.suite in ("all", "processors"):
+        results.update(bench_processors(images, args.iterations, args.warmup))
+    if args.suite in ("all", "api"):
+        results.update(bench_api(images, args.requests, args.concurrency, unique_uploads=not args.cached))
+    
+    run = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "worker_pool_mode": settings.WORKER_POOL_MODE,
+            "worker_pool_size": settings.WORKER_POOL_SIZE,
+            "images": len(images),
+            "image_bytes": sum(len(data) for _, _, data in images),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    
+    print_table(results, baseline["results"] if baseline else None, args.metric)
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(run, f, indent=2)
+    
+    if baseline:
+        regressions = compare(run, baseline, args.metric, args.threshold)
+        for regression in regressions:
+            print(
+                f"REGRESSION {regression['path']}: {args.metric} {regression['baseline']} -> "
+                f"{regression['current']} ({regression['ratio']}x)"
+            )
+        if regressions:
+            return 1
+        print(f"No regressions over {args.threshold:.0%} on {args.metric}")
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,11 @@
+import time
+
+# Startup time is measured from here
+PROCESS_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 import os
 from dotenv import load_dotenv
@@ -8,7 +14,20 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import routers
-from app.api.v1 import scan, profile, recommend, health
+from app.api.v1 import scan, profile, recommend, health, wardrobe, jobs, metrics, admin
+from app.config import settings
+from app.services.executor import analysis_executor, WorkerPoolFull, WorkerTimeout
+from app.services.image_store import ImmutableStaticFiles, image_store
+from app.services.ingestion import MULTIPART_OVERHEAD, UploadLimitMiddleware
+from app.services.jobs import JobQueueFull, job_manager
+from app.services.metrics import MetricsMiddleware
+from app.services.preference_buffer import preference_buffer
+from app.services.profiling import ProfilingMiddleware, profile_store
+from app.services.rate_limit import RateLimitMiddleware, rate_limiter
+from app.services.warmup import warmup
+from app.services.wardrobe_store import wardrobe_store
+
+warmup.record("import", PROCESS_STARTED)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -27,6 +46,16 @@ ALLOWED_ORIGINS = [
     "https://lokafit.vercel.app",
 ]
 
+# Reject oversized uploads while they stream in (added first so CORS wraps its 413s)
+app.add_middleware(
+    UploadLimitMiddleware,
+    max_body_size=settings.MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD,
+    path_limits={f"{settings.API_V1_STR}/scan/batch": settings.SCAN_BATCH_MAX_BYTES}
+)
+
+# Per-client token buckets, checked before the upload is read (inside CORS so 429s carry its headers)
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ALLOWED_ORIGINS,
@@ -35,11 +64,70 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in profiling of worker tasks (X-Profile header or sample rate)
+app.add_middleware(
+    ProfilingMiddleware,
+    store=profile_store,
+    token=settings.ADMIN_TOKEN,
+    sample_rate=settings.PROFILING_SAMPLE_RATE
+)
+
+# Request counts and latency per route (outermost, so rejected requests count too)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(health.router, prefix="/api/v1", tags=["health"])
 app.include_router(scan.router, prefix="/api/v1", tags=["scan"])
 app.include_router(profile.router, prefix="/api/v1", tags=["profile"])
 app.include_router(recommend.router, prefix="/api/v1", tags=["recommend"])
+app.include_router(wardrobe.router, prefix="/api/v1", tags=["wardrobe"])
+app.include_router(jobs.router, prefix="/api/v1", tags=["jobs"])
+app.include_router(metrics.router, prefix="/api/v1", tags=["metrics"])
+app.include_router(admin.router, prefix="/api/v1", tags=["admin"])
+
+# Scanned images and thumbnails, file names are content hashes so they never change
+if image_store.enabled:
+    os.makedirs(image_store.directory, exist_ok=True)
+    app.mount(image_store.url_prefix, ImmutableStaticFiles(directory=image_store.directory), name="images")
+
+# Worker pool errors
+@app.exception_handler(WorkerPoolFull)
+async def worker_pool_full_handler(request, exc: WorkerPoolFull):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(WorkerTimeout)
+async def worker_timeout_handler(request, exc: WorkerTimeout):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+@app.exception_handler(JobQueueFull)
+async def job_queue_full_handler(request, exc: JobQueueFull):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.on_event("startup")
+async def start_background_writers():
+    await preference_buffer.start()
+
+@app.on_event("startup")
+async def start_warmup():
+    # Runs in the background so the server listens right away, /health
+    # answers 503 until the workers have warmed their pipelines
+    warmup.start(PROCESS_STARTED)
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    await job_manager.stop()
+    analysis_executor.shutdown()
+    # Write buffered events before the store goes away
+    await preference_buffer.stop()
+    wardrobe_store.close()
 
 # Root endpoint
 @app.get("/")
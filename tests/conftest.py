@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+# Run against the repository checkout without installing it
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# In-memory wardrobe database and no rate limiting for the API tests
+os.environ.setdefault("WARDROBE_DATABASE_URL", "sqlite://")
+os.environ.setdefault("RATE_LIMIT_PER_SECOND", "0")
+
+# Scanned images go to a scratch directory instead of the checkout's ./data
+os.environ.setdefault("IMAGE_STORE_DIR", os.path.join(tempfile.mkdtemp(prefix="lokafit-tests-"), "images"))
@@ -0,0 +1,24 @@
+from benchmarks.run import compare, summarize
+
+
+def _run(**p95):
+    return {"results": {path: {"p95_ms": value} for path, value in p95.items()}}
+
+
+def test_summarize_percentiles_and_throughput():
+    summary = summarize([float(value) for value in range(1, 101)], errors=2, elapsed_s=2.0)
+    assert (summary["count"], summary["errors"], summary["min_ms"], summary["max_ms"]) == (100, 2, 1.0, 100.0)
+    assert summary["p50_ms"] == 50.5
+    assert summary["throughput_rps"] == 50.0
+
+
+def test_compare_flags_only_real_slowdowns():
+    baseline = _run(scan=100.0, quick=0.2, removed=10.0)
+    current = _run(scan=130.0, quick=0.4, added=5.0)
+    
+    # quick doubled but by less than MIN_REGRESSION_MS, new and removed paths are ignored
+    regressions = compare(current, baseline, "p95_ms", threshold=0.2)
+    assert [regression["path"] for regression in regressions] == ["scan"]
+    assert regressions[0]["ratio"] == 1.3
+    
+    assert compare(current, baseline, "p95_ms", threshold=0.5) == []
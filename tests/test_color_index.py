@@ -0,0 +1,81 @@
+from app.ai_core.color_index import COMPACT_SHARE, REBUILD_THRESHOLD, ColorIndex, WardrobeColorIndex
+from app.services.wardrobe_store import WardrobeStore
+
+def _record(content_hash: str, color_hex: str) -> dict:
+    return {"content_hash": content_hash, "filename": f"{content_hash}.jpg", "color_hex": color_hex}
+
+def test_add_keeps_last_of_duplicate_garments():
+    index = ColorIndex()
+    index.add([{"garment_id": "a", "color_hex": "#FF0000"}])
+    index.add([
+        {"garment_id": "b", "color_hex": "#00FF00"},
+        {"garment_id": "a", "color_hex": "#0000FF"},
+        {"garment_id": "a", "color_hex": "#000080"},
+    ])
+    
+    assert len(index) == 2
+    assert index.entry("a")["color_hex"] == "#000080"
+    matches = index.nearest("#000080", k=5)
+    assert [match["garment_id"] for match in matches] == ["a", "b"]
+    assert matches[0]["distance"] == 0.0
+
+def test_batch_save_with_duplicate_items_updates_loaded_index():
+    store = WardrobeStore("sqlite://")
+    color_index = WardrobeColorIndex(store)
+    try:
+        store.save_items("dup", [_record("h1", "#FF0000")])
+        assert len(color_index.get("dup")) == 1
+        
+        # The same image twice in one batch
+        garment_ids = store.save_items("dup", [_record("h2", "#00FF00"), _record("h2", "#00FF00")])
+        
+        assert garment_ids[0] == garment_ids[1]
+        index = color_index.get("dup")
+        assert len(index) == 2
+        assert [match["garment_id"] for match in index.nearest("#00FF00", k=5)][0] == garment_ids[0]
+    finally:
+        store.close()
+
+def test_failing_listener_does_not_fail_committed_save():
+    store = WardrobeStore("sqlite://")
+    
+    def failing(user_id, items):
+        raise RuntimeError("listener failed")
+    
+    store.add_listener(failing)
+    try:
+        garment_ids = store.save_items("u1", [_record("h1", "#FF0000")])
+        assert store.get_item("u1", garment_ids[0]) is not None
+    finally:
+        store.close()
+
+def test_saves_during_load_are_replayed():
+    store = WardrobeStore("sqlite://")
+    color_index = WardrobeColorIndex(store)
+    store.save_items("u1", [_record("h1", "#FF0000")])
+    load = store.iter_items
+    
+    def iter_items(user_id, page_size=500):
+        # A save lands after the load read the wardrobe
+        items = list(load(user_id, page_size))
+        store.save_items(user_id, [_record("h2", "#00FF00")])
+        return iter(items)
+    
+    store.iter_items = iter_items
+    try:
+        assert len(color_index.get("u1")) == 2
+    finally:
+        store.close()
+
+def test_rescans_do_not_grow_the_index():
+    index = ColorIndex()
+    garments = [{"garment_id": f"g{i}", "color_hex": f"#{i:02X}4080"} for i in range(100)]
+    index.add(garments)
+    for shade in range(40):
+        index.add([{**garment, "color_hex": f"#{shade:02X}{i:02X}80"} for i, garment in enumerate(garments)])
+    
+    assert len(index) == 100
+    assert len(index._entries) <= 100 + REBUILD_THRESHOLD + COMPACT_SHARE * len(index._entries)
+    assert index.entry("g7")["color_hex"] == "#270780"
+    assert [match["garment_id"] for match in index.nearest("#270780", k=1)] == ["g7"]
+    assert len(index.within("#270780", 200)) == 100
@@ -0,0 +1,22 @@
+import numpy as np
+from app.ai_core.color_naming import NAMED_COLORS, hex_to_rgb, name_color, name_colors, rgb_to_lab
+
+
+def test_named_colors_name_themselves():
+    for name, hex_color in NAMED_COLORS.items():
+        r, g, b = hex_to_rgb(hex_color).tolist()
+        # The lookup table is quantized, neighbouring palette colors may share a cell
+        nearest = name_color(r, g, b)
+        distance = np.linalg.norm(rgb_to_lab(hex_to_rgb(NAMED_COLORS[nearest])) - rgb_to_lab(hex_to_rgb(hex_color)))
+        assert nearest == name or distance < 10, name
+
+
+def test_vectorized_naming_matches_single_lookups():
+    rgb = np.random.default_rng(0).integers(0, 256, (200, 3), dtype=np.uint8)
+    names = name_colors(rgb).tolist()
+    assert names == [name_color(*color) for color in rgb.tolist()]
+
+
+def test_lab_reference_values():
+    assert np.allclose(rgb_to_lab(np.array([255, 255, 255])), [100, 0, 0], atol=0.01)
+    assert np.allclose(rgb_to_lab(np.array([255, 0, 0])), [53.24, 80.09, 67.20], atol=0.05)
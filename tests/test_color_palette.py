@@ -0,0 +1,26 @@
+import numpy as np
+from app.ai_core.color_palette import extract_palette
+
+
+def _stripes(colors_bgr, widths, height=60):
+    return np.concatenate([np.full((height, width, 3), color, np.uint8) for color, width in zip(colors_bgr, widths)], axis=1)
+
+
+def test_palette_weights_follow_pixel_shares():
+    image = _stripes([(200, 40, 20), (20, 40, 200), (240, 240, 240)], [120, 60, 20])
+    palette = extract_palette(image, count=5)
+    
+    rgb = [color for color, _ in palette]
+    weights = [weight for _, weight in palette]
+    assert rgb[:3] == [(20, 40, 200), (200, 40, 20), (240, 240, 240)]
+    assert np.allclose(weights[:3], [0.6, 0.3, 0.1], atol=0.02)
+    assert abs(sum(weights) - 1.0) < 1e-6
+
+
+def test_mask_limits_the_sampled_pixels():
+    image = _stripes([(200, 40, 20), (20, 40, 200)], [150, 50])
+    mask = np.zeros(image.shape[:2], np.uint8)
+    mask[:, 150:] = 255
+    palette = extract_palette(image, count=3, mask=mask)
+    assert palette[0][0] == (200, 40, 20)
+    assert palette[0][1] > 0.95
@@ -0,0 +1,64 @@
+import threading
+from app.ai_core.curation import WeeklyCurator
+from app.ai_core.mixmatch_logic import MixMatchRecommender
+
+
+class _Store:
+    def __init__(self, items):
+        self.items = items
+        self.listeners = []
+    
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+    
+    def iter_items(self, user_id):
+        return iter(self.items)
+
+
+WARDROBE = [
+    {"garment_id": "t1", "color_hex": "#2459C8", "garment_type": "standard"},
+    {"garment_id": "b1", "color_hex": "#D8C8A8", "garment_type": "long"},
+    {"garment_id": "u1", "color_hex": "#D0202A", "garment_type": None},
+]
+
+
+def test_untyped_garments_are_left_out():
+    curator = WeeklyCurator(_Store(WARDROBE), MixMatchRecommender())
+    week = curator.curate(WARDROBE, "Warm", seed="test")
+    assert week
+    used = {item["garment_id"] for day in week for item in day["items"]}
+    assert used == {"t1", "b1"}
+    
+    # Only untyped tops, no outfit can be built
+    assert curator.curate([WARDROBE[1], WARDROBE[2]], "Warm") == []
+
+
+def test_generations_are_only_kept_while_computing():
+    store = _Store(WARDROBE)
+    curator = WeeklyCurator(store, MixMatchRecommender())
+    for user in range(50):
+        curator.get_week(f"user{user}", "Warm", "2026-W42")
+        curator.invalidate(f"user{user}")
+    assert curator._generations == {} and curator._computing == {}
+
+
+def test_week_invalidated_while_computing_is_not_cached():
+    store = _Store(WARDROBE)
+    curator = WeeklyCurator(store, MixMatchRecommender())
+    reading, resume = threading.Event(), threading.Event()
+    
+    def iter_items(user_id):
+        reading.set()
+        resume.wait(5)
+        return iter(WARDROBE)
+    
+    store.iter_items = iter_items
+    worker = threading.Thread(target=curator.get_week, args=("u", "Warm", "2026-W42"))
+    worker.start()
+    assert reading.wait(5)
+    curator.invalidate("u")
+    resume.set()
+    worker.join(5)
+    
+    assert curator.stats()["entries"] == 0
+    assert curator._generations == {}
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import pytest
+from app.services.executor import (
+    AnalysisExecutor, WorkerPoolFull, WorkerTimeout,
+    PRIORITY_BACKGROUND, PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL
+)
+
+
+def _thread_name():
+    return threading.current_thread().name
+
+
+def _wait(event: threading.Event):
+    event.wait(5)
+    return "done"
+
+
+def test_runs_off_the_event_loop():
+    executor = AnalysisExecutor(max_workers=1)
+    try:
+        assert asyncio.run(executor.run(_thread_name)).startswith("ai-worker")
+        assert executor.stats()["completed"] == 1
+    finally:
+        executor.shutdown()
+
+
+def test_full_pool_rejects_with_retry_after():
+    executor = AnalysisExecutor(max_workers=1, queue_size=1, retry_after=3)
+    release = threading.Event()
+    
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(_wait, release))
+        queued = asyncio.ensure_future(executor.run(_wait, release))
+        await asyncio.sleep(0.05)
+        with pytest.raises(WorkerPoolFull) as error:
+            await executor.run(_wait, release)
+        assert error.value.retry_after == 3
+        release.set()
+        return await asyncio.gather(running, queued)
+    
+    try:
+        assert asyncio.run(scenario()) == ["done", "done"]
+        stats = executor.stats()
+        assert stats["rejected"] == 1 and stats["pending"] == 0
+    finally:
+        executor.shutdown()
+
+
+def test_timed_out_task_keeps_its_worker_until_it_finishes():
+    executor = AnalysisExecutor(max_workers=1, queue_size=0, timeout=0.05)
+    release = threading.Event()
+    
+    async def scenario():
+        with pytest.raises(WorkerTimeout):
+            await executor.run(_wait, release)
+        # The task still runs, so the only worker is not free yet
+        with pytest.raises(WorkerPoolFull):
+            await executor.run(_thread_name)
+        release.set()
+        for _ in range(100):
+            if executor.stats()["pending"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        return await executor.run(_thread_name, timeout=5)
+    
+    try:
+        assert asyncio.run(scenario()).startswith("ai-worker")
+        assert executor.stats()["timed_out"] == 1
+    finally:
+        executor.shutdown()
+
+
+def _record(order: list, name: str):
+    order.append(name)
+    return name
+
+
+def test_waiting_tasks_run_by_priority():
+    executor = AnalysisExecutor(max_workers=1, queue_size=3)
+    release = threading.Event()
+    order = []
+    
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(_wait, release))
+        await asyncio.sleep(0.05)
+        queued = [
+            asyncio.ensure_future(executor.run(_record, order, name, priority=priority))
+            for name, priority in [("background", PRIORITY_BACKGROUND), ("low", PRIORITY_LOW), ("high", PRIORITY_HIGH)]
+        ]
+        await asyncio.sleep(0.05)
+        release.set()
+        await asyncio.gather(running, *queued)
+    
+    try:
+        asyncio.run(scenario())
+        assert order == ["high", "low", "background"]
+    finally:
+        executor.shutdown()
+
+
+def test_reserved_slots_and_shedding():
+    executor = AnalysisExecutor(max_workers=1, queue_size=2, reserved=1)
+    release = threading.Event()
+    
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(_wait, release, priority=PRIORITY_NORMAL))
+        background = asyncio.ensure_future(executor.run(_wait, release, priority=PRIORITY_BACKGROUND))
+        await asyncio.sleep(0.05)
+        
+        # Only high-priority work may take the reserved slot, and it sheds nothing
+        normal = asyncio.ensure_future(executor.run(_wait, release, priority=PRIORITY_NORMAL))
+        await asyncio.sleep(0.05)
+        assert background.done() and isinstance(background.exception(), WorkerPoolFull)
+        high = asyncio.ensure_future(executor.run(_wait, release, priority=PRIORITY_HIGH))
+        await asyncio.sleep(0.05)
+        with pytest.raises(WorkerPoolFull):
+            await executor.run(_wait, release, priority=PRIORITY_LOW)
+        
+        release.set()
+        return await asyncio.gather(running, normal, high)
+    
+    try:
+        assert asyncio.run(scenario()) == ["done"] * 3
+        stats = executor.stats()
+        assert stats["shed"] == 1 and stats["rejected"] == 1
+    finally:
+        executor.shutdown()
@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+import pytest
+from app.ai_core.garment_processor import garment_processor
+
+
+def _photo(polygon, color=(60, 90, 180), size=(600, 600)):
+    image = np.full((*size, 3), 235, np.uint8)
+    cv2.fillPoly(image, [np.array(polygon, np.int32)], color)
+    return cv2.imencode(".png", image)[1].tobytes()
+
+
+T_SHIRT = [(200, 100), (400, 100), (480, 180), (440, 220), (400, 190), (400, 400), (200, 400), (200, 190), (160, 220), (120, 180)]
+LONG_SLEEVE = [(220, 100), (380, 100), (560, 260), (530, 290), (380, 180), (380, 450), (220, 450), (220, 180), (70, 290), (40, 260)]
+PANTS = [(220, 60), (380, 60), (400, 540), (320, 540), (300, 200), (280, 540), (200, 540)]
+OUTER = [(100, 150), (500, 150), (500, 420), (100, 420)]
+
+
+@pytest.mark.parametrize("tier", ["color", "full"])
+def test_dominant_color_ignores_a_light_backdrop(tier):
+    # The garment covers about a sixth of the photo
+    result = garment_processor.process_garment(_photo(T_SHIRT), tier)
+    assert result["status"] == "success"
+    assert result["color_hex"] == "#B45A3C"
+    assert result["palette"][0]["weight"] > 0.9
+
+
+@pytest.mark.parametrize("polygon, garment_type", [
+    (T_SHIRT, "standard"),
+    (LONG_SLEEVE, "standard"),
+    (PANTS, "long"),
+    (OUTER, "wide"),
+])
+def test_garment_type_from_contour_shape(polygon, garment_type):
+    result = garment_processor.process_garment(_photo(polygon), "full")
+    assert result["garment_type"] == garment_type
+
+
+def test_tiers_only_run_their_stages():
+    data = _photo(T_SHIRT, size=(1200, 1200))
+    color = garment_processor.process_garment(data, "color")
+    color_type = garment_processor.process_garment(data, "color_type")
+    full = garment_processor.process_garment(data, "full")
+    
+    assert "garment_type" not in color and "measurements" not in color
+    assert set(color["timings"]) == {"decode_ms", "color_ms"}
+    assert color_type["garment_type"] == full["garment_type"] == "standard"
+    assert "measurements" not in color_type
+    assert full["measurements"]["image_width"] == 1200
+    # Reduced decodes still find the same dominant color
+    assert color["color_hex"] == color_type["color_hex"] == full["color_hex"]
+
+
+def test_unknown_tier_is_an_error():
+    assert garment_processor.process_garment(_photo(T_SHIRT), "fastest")["status"] == "error"
@@ -0,0 +1,79 @@
+import asyncio
+import time
+from fastapi.testclient import TestClient
+import main
+from app.ai_core import tasks
+from app.api.v1 import health
+from app.services.warmup import Warmup, warmup
+
+
+def test_thread_mode_reports_live_model_stats():
+    with TestClient(main.app) as client:
+        body = client.get("/api/v1/health/detailed").json()
+    assert body["segmentation"]["source"] == "live"
+    assert body["skin_detection"]["source"] == "live"
+
+
+def test_worker_stats_report_models():
+    report = tasks.worker_stats()
+    assert set(report) == {"timings", "segmentation", "skin_detection"}
+    assert "enabled" in report["segmentation"]
+    assert "runs" in report["skin_detection"]
+
+
+def test_process_mode_uses_the_worker_report(monkeypatch):
+    monkeypatch.setattr(warmup, "_worker", {})
+    assert health._model_stats("process") == ({}, {})
+    
+    report = {
+        "segmentation": {"enabled": True, "ready": False, "error": "model missing"},
+        "skin_detection": {"runs": 1}
+    }
+    monkeypatch.setattr(warmup, "_worker", report)
+    segmentation, skin_detection = health._model_stats("process")
+    assert segmentation["error"] == "model missing"
+    assert segmentation["source"] == skin_detection["source"] == "worker_warmup"
+
+
+class _Executor:
+    def __init__(self, fail=False):
+        self.fail = fail
+    
+    async def start(self):
+        if self.fail:
+            raise RuntimeError("worker failed to start")
+    
+    async def run(self, func, *args, **kwargs):
+        return {"timings": {"garment_ms": 1.0}, "segmentation": {"ready": True}, "skin_detection": {}}
+
+
+def _warm(executor):
+    async def scenario():
+        warmup = Warmup(executor)
+        warmup.start(time.perf_counter())
+        return warmup, await warmup.wait(5)
+    return asyncio.run(scenario())
+
+
+def test_warmup_records_timings_and_worker_report():
+    warmup, ready = _warm(_Executor())
+    stats = warmup.stats()
+    assert ready and stats["error"] is None
+    assert {"recommender_ms", "workers_ms", "startup_ms"} <= set(stats["timings"])
+    assert stats["timings"]["worker"] == {"garment_ms": 1.0}
+    assert warmup.worker["segmentation"] == {"ready": True}
+
+
+def test_failed_warmup_still_becomes_ready():
+    warmup, ready = _warm(_Executor(fail=True))
+    assert ready
+    assert warmup.stats()["error"] == "RuntimeError: worker failed to start"
+    assert warmup.worker == {}
+
+
+def test_health_answers_503_until_warm(monkeypatch):
+    monkeypatch.setattr(health, "warmup", Warmup(_Executor()))
+    with TestClient(main.app) as client:
+        response = client.get("/api/v1/health")
+    assert response.status_code == 503
+    assert response.json()["status"] == "starting"
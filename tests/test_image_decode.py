@@ -0,0 +1,57 @@
+import struct
+import cv2
+import numpy as np
+import pytest
+from app.ai_core.garment_processor import garment_processor
+from app.ai_core.image_decode import decode_image, read_dimensions
+
+def _with_orientation(jpeg: bytes, orientation: int) -> bytes:
+    """JPEG with an EXIF APP1 segment holding only the Orientation tag"""
+    tiff = b"II*\x00" + struct.pack("<I", 8) + struct.pack("<H", 1)
+    tiff += struct.pack("<HHIHH", 0x0112, 3, 1, orientation, 0) + struct.pack("<I", 0)
+    payload = b"Exif\x00\x00" + tiff
+    return jpeg[:2] + b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload + jpeg[2:]
+
+def _garment_jpeg() -> bytes:
+    """800x400 landscape photo of a 400x200 garment"""
+    image = np.full((400, 800, 3), 235, dtype=np.uint8)
+    image[100:300, 200:600] = (60, 90, 180)
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+def test_decode_reports_rotated_size():
+    data = _with_orientation(_garment_jpeg(), 6)
+    
+    for max_side in (None, 256):
+        image, info = decode_image(data, max_side)
+        assert image.shape[0] > image.shape[1]
+        assert (info["width"], info["height"]) == (400, 800)
+
+def test_measurements_of_rotated_photo():
+    result = garment_processor.process_garment(_with_orientation(_garment_jpeg(), 6), "full")
+    
+    assert result["status"] == "success"
+    measurements = result["measurements"]
+    assert abs(measurements["width_px"] - 200) <= 4
+    assert abs(measurements["height_px"] - 400) <= 4
+    assert abs(measurements["area_px"] - 80000) <= 4000
+
+def test_read_dimensions_of_each_format():
+    image = np.zeros((30, 50, 3), dtype=np.uint8)
+    for extension in (".jpg", ".png", ".webp"):
+        assert read_dimensions(cv2.imencode(extension, image)[1].tobytes()) == (50, 30)
+    assert read_dimensions(b"GIF89a" + bytes(32)) is None
+
+def test_decode_rejects_too_many_pixels_before_decoding():
+    # Header claims 20000x20000, the body is never read
+    png = cv2.imencode(".png", np.zeros((4, 4, 3), dtype=np.uint8))[1].tobytes()
+    bomb = png[:16] + struct.pack(">II", 20000, 20000) + png[24:]
+    with pytest.raises(ValueError, match="too large"):
+        decode_image(bomb, max_pixels=10_000_000)
+
+def test_decode_picks_the_smallest_covering_scale():
+    data = _garment_jpeg()
+    for max_side, scale in ((None, 1), (800, 1), (400, 2), (150, 4), (64, 8)):
+        image, info = decode_image(data, max_side)
+        assert info["scale"] == scale
+        assert image.shape[1] == 800 // scale
+        assert (info["width"], info["height"]) == (800, 400)
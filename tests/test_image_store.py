@@ -0,0 +1,64 @@
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+import main
+from app.services.image_store import IMMUTABLE_CACHE_CONTROL, ImageStore, image_store
+from app.services.result_cache import content_hash
+
+
+def _photo(size=(600, 400)) -> bytes:
+    image = np.full((*size, 3), 235, np.uint8)
+    image[100:500, 80:320] = (40, 90, 180)
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+def test_save_writes_original_and_thumbnails_once(tmp_path):
+    store = ImageStore(str(tmp_path), sizes=(320, 160, 1000))
+    data = _photo()
+    digest = content_hash(data)
+    
+    assert store.save(digest, data)
+    assert store.has(digest)
+    assert (tmp_path / store.original_name(digest, "jpg")).read_bytes() == data
+    
+    sides = {}
+    for size in store.sizes:
+        thumbnail = cv2.imread(str(tmp_path / store.thumbnail_name(digest, size)))
+        sides[size] = thumbnail.shape[:2]
+    # Never upscaled past the original
+    assert sides == {160: (160, 107), 320: (320, 213), 1000: (600, 400)}
+    
+    assert not store.save(digest, data)
+
+
+def test_save_rejects_unknown_formats(tmp_path):
+    store = ImageStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.save("0" * 64, b"GIF89a not supported")
+    assert not list(tmp_path.iterdir())
+
+
+def test_disabled_store_writes_nothing(tmp_path):
+    assert not ImageStore("").save("0" * 64, _photo())
+
+
+def test_thumbnails_for_url_of_stored_images_only():
+    store = ImageStore("images", sizes=(160, 320))
+    digest = "ab" * 32
+    urls = store.urls(digest, "png")
+    assert urls["image_url"] == f"/images/ab/{digest}.png"
+    assert store.thumbnails_for_url(urls["image_url"]) == urls["thumbnails"]
+    assert store.thumbnails_for_url("https://example.com/shirt.png") is None
+    assert store.thumbnails_for_url(f"/images/ab/{digest}.gif") is None
+
+
+def test_stored_files_are_served_immutable():
+    data = _photo()
+    digest = content_hash(data)
+    image_store.save(digest, data)
+    
+    with TestClient(main.app) as client:
+        response = client.get(image_store.urls(digest, "jpg")["thumbnails"]["160"])
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
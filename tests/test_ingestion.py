@@ -0,0 +1,59 @@
+import asyncio
+import io
+import pytest
+from fastapi import FastAPI, HTTPException, Request, UploadFile
+from fastapi.testclient import TestClient
+from app.services.ingestion import UploadLimitMiddleware, read_upload
+
+
+def _app(reads):
+    app = FastAPI()
+    
+    @app.post("/upload")
+    async def upload(request: Request):
+        reads.append(len(await request.body()))
+        return {"ok": True}
+    
+    @app.post("/big")
+    async def big(request: Request):
+        reads.append(len(await request.body()))
+        return {"ok": True}
+    
+    app.add_middleware(UploadLimitMiddleware, max_body_size=1000, path_limits={"/big": 5000})
+    return app
+
+
+def test_announced_size_over_limit_is_rejected_unread():
+    reads = []
+    with TestClient(_app(reads)) as client:
+        response = client.post("/upload", content=b"x" * 1001)
+    assert response.status_code == 413
+    assert response.headers["connection"] == "close"
+    assert reads == []
+
+
+def test_streamed_body_over_limit_is_rejected():
+    def chunks():
+        for _ in range(5):
+            yield b"x" * 300
+    
+    reads = []
+    with TestClient(_app(reads)) as client:
+        response = client.post("/upload", content=chunks())
+    assert response.status_code == 413
+    assert reads == []
+
+
+def test_path_limits_override_the_default():
+    reads = []
+    with TestClient(_app(reads)) as client:
+        assert client.post("/big", content=b"x" * 4000).status_code == 200
+        assert client.post("/upload", content=b"x" * 1000).status_code == 200
+    assert reads == [4000, 1000]
+
+
+def test_read_upload_of_unknown_size_stops_at_the_limit():
+    upload = UploadFile(io.BytesIO(b"x" * 2000))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(read_upload(upload, max_size=1000))
+    assert error.value.status_code == 413
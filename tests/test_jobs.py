@@ -0,0 +1,103 @@
+import asyncio
+import cv2
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+import main
+from app.services import jobs
+from app.services.executor import WorkerPoolFull, WorkerTimeout
+from app.services.jobs import JobManager, JobQueueFull
+
+
+def _photo() -> bytes:
+    image = np.full((120, 80, 3), 235, np.uint8)
+    image[20:100, 15:65] = (40, 90, 180)
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+def test_same_key_returns_the_running_job_and_pending_is_bounded():
+    async def scenario():
+        manager = JobManager(max_running=1, max_pending=2)
+        release = asyncio.Event()
+        
+        async def run():
+            await release.wait()
+            return {"ok": True}
+        
+        first = manager.submit("scan", run, key="a")
+        assert manager.submit("scan", run, key="a") is first
+        manager.submit("scan", run, key="b")
+        with pytest.raises(JobQueueFull):
+            manager.submit("scan", run, key="c")
+        
+        release.set()
+        await manager.wait(first, 1.0)
+        assert first.view()["result"] == {"ok": True}
+        # Finished, the key starts a new job
+        assert manager.submit("scan", run, key="a") is not first
+        await manager.stop()
+        return manager.stats()
+    
+    stats = asyncio.run(scenario())
+    assert (stats["submitted"], stats["deduplicated"], stats["rejected"], stats["succeeded"]) == (3, 1, 1, 2)
+
+
+def test_errors_map_to_status_codes(monkeypatch):
+    monkeypatch.setattr(jobs, "POOL_FULL_RETRIES", 1)
+    
+    def failing(error):
+        async def run():
+            raise error
+        return run
+    
+    async def scenario():
+        manager = JobManager(max_running=4)
+        submitted = [
+            manager.submit("scan", failing(error))
+            for error in (
+                HTTPException(status_code=400, detail="Invalid image"),
+                WorkerTimeout("Analysis timed out"),
+                WorkerPoolFull(retry_after=0),
+                RuntimeError("boom")
+            )
+        ]
+        for job in submitted:
+            await manager.wait(job, 1.0)
+        return [job.view() for job in submitted]
+    
+    views = asyncio.run(scenario())
+    assert all(view["status"] == "failed" for view in views)
+    assert [view["error"]["status_code"] for view in views] == [400, 504, 503, 500]
+
+
+def test_finished_jobs_expire():
+    async def scenario():
+        manager = JobManager(retention_seconds=0)
+        
+        async def run():
+            return {}
+        
+        job = manager.submit("scan", run)
+        await manager.wait(job, 1.0)
+        return manager.get(job.job_id), manager.stats()["expired"]
+    
+    assert asyncio.run(scenario()) == (None, 1)
+
+
+def test_scan_job_is_fetched_by_long_polling():
+    with TestClient(main.app) as client:
+        response = client.post(
+            "/api/v1/scan/jobs?tier=color", files={"file": ("shirt.jpg", _photo(), "image/jpeg")}
+        )
+        assert response.status_code == 202
+        submitted = response.json()
+        assert response.headers["location"] == submitted["status_url"]
+        
+        job = client.get(submitted["status_url"], params={"wait": 5}).json()
+        assert job["job_id"] == submitted["job_id"]
+        assert job["kind"] == "scan"
+        assert job["status"] == "succeeded"
+        assert job["result"]["color_hex"].startswith("#")
+        
+        assert client.get("/api/v1/jobs/unknown").status_code == 404
@@ -0,0 +1,47 @@
+from fastapi.testclient import TestClient
+import main
+from app.services.metrics import MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry(prefix="test")
+    latency = registry.histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        latency.observe(value, stage="decode")
+    
+    lines = registry.render().splitlines()
+    assert 'test_latency_seconds_bucket{stage="decode",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{stage="decode",le="1"} 3' in lines
+    assert 'test_latency_seconds_bucket{stage="decode",le="+Inf"} 4' in lines
+    assert 'test_latency_seconds_count{stage="decode"} 4' in lines
+    assert 'test_latency_seconds_sum{stage="decode"} 6.05' in lines
+
+
+def test_stats_sources_export_numeric_fields_only():
+    def failing():
+        raise RuntimeError("component is down")
+    
+    registry = MetricsRegistry(prefix="test")
+    registry.add_stats_source("cache", lambda: {"entries": 3, "enabled": True, "error": "x", "waiting": {"high": 1}})
+    registry.add_stats_source("broken", failing)
+    
+    lines = registry.render().splitlines()
+    assert "test_cache_entries 3" in lines
+    assert "test_cache_enabled 1" in lines
+    assert not any(line.startswith(("test_cache_error", "test_cache_waiting", "test_broken")) for line in lines)
+
+
+def test_metrics_endpoint_labels_requests_by_route_template():
+    with TestClient(main.app) as client:
+        client.get("/api/v1/wardrobe/someone/items")
+        client.get("/api/v1/no-such-route")
+        response = client.get("/api/v1/metrics")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'route="/api/v1/wardrobe/{user_id}/items"' in body
+    assert 'route="/api/v1/wardrobe/someone/items"' not in body
+    assert 'route="unmatched",status="404"' in body
+    assert "lokafit_worker_pool_" in body
+    assert "lokafit_rate_limit_enabled" in body
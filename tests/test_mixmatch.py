@@ -0,0 +1,48 @@
+import numpy as np
+from app.ai_core.mixmatch_logic import MixMatchRecommender
+from app.services import metrics
+
+
+def _observations(stage: str) -> float:
+    return sum(
+        value for line in metrics.registry.render().splitlines()
+        if "stage_duration_seconds_count{component=\"mixmatch\"" in line and f'stage="{stage}"' in line
+        for value in [float(line.rsplit(" ", 1)[1])]
+    )
+
+
+def test_single_color_timed_once():
+    recommender = MixMatchRecommender(memo_size=0)
+    single, batch = _observations("instant_match"), _observations("instant_matches")
+    recommender.get_instant_match("#336699", "Cool")
+    assert _observations("instant_match") == single + 1
+    assert _observations("instant_matches") == batch
+
+
+def test_scores_have_the_same_precision_with_and_without_preferences():
+    recommender = MixMatchRecommender()
+    plain = recommender.get_instant_match("#336699", "Cool")["recommendations"]
+    neutral = recommender.get_instant_match("#336699", "Cool", np.zeros(12))["recommendations"]
+    assert plain == neutral
+    assert all(round(item["match_score"], 4) == item["match_score"] for item in plain)
+
+
+def test_memo_is_bounded_and_returns_copies():
+    recommender = MixMatchRecommender(memo_size=2)
+    first = recommender.get_instant_match("#336699", "Cool")
+    first["recommendations"][0]["wardrobe_matches"] = []
+    again = recommender.get_instant_match("#336699", "Cool")
+    assert "wardrobe_matches" not in again["recommendations"][0]
+    
+    recommender.get_instant_match("#993366", "Cool")
+    recommender.get_instant_match("#669933", "Cool")
+    stats = recommender.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (2, 1, 3)
+
+
+def test_color_step_shares_memo_entries():
+    recommender = MixMatchRecommender(color_step=8)
+    assert recommender.quantize_color("#33669a") == "#306898"
+    recommender.get_instant_match("#336699", "Cool")
+    recommender.get_instant_match("#32679A", "Cool")
+    assert recommender.stats()["hits"] == 1
@@ -0,0 +1,65 @@
+import asyncio
+from app.ai_core.mixmatch_logic import MixMatchRecommender
+from app.services.preference_buffer import PreferenceBuffer
+from app.services.wardrobe_store import WardrobeStore
+
+
+class _FailingStore:
+    def __init__(self):
+        self.fail = True
+        self.saved = []
+    
+    def add_listener(self, listener):
+        pass
+    
+    def save_preferences(self, rows):
+        if self.fail:
+            raise OSError("database is down")
+        self.saved.extend(rows)
+
+
+def test_votes_coalesce_and_flush_in_one_write():
+    store = WardrobeStore("sqlite://")
+    buffer = PreferenceBuffer(store, MixMatchRecommender())
+    try:
+        buffer.record("u", "item1", True, "#D0202A")
+        buffer.record("u", "item1", False, "#D0202A")
+        assert buffer.record("u", "item2", True, "#2459C8") == 2
+        
+        assert asyncio.run(buffer.flush()) == 2
+        stats = buffer.stats()
+        assert (stats["coalesced"], stats["written"], stats["pending"]) == (1, 2, 0)
+        with store._get_pool().connection() as conn:
+            rows = conn.cursor().execute("SELECT item_id, liked FROM preferences ORDER BY item_id").fetchall()
+        assert [(item_id, bool(liked)) for item_id, liked in rows] == [("item1", False), ("item2", True)]
+    finally:
+        store.close()
+
+
+def test_preference_vector_follows_latest_votes():
+    recommender = MixMatchRecommender()
+    buffer = PreferenceBuffer(WardrobeStore("sqlite://"), recommender)
+    red_bin, blue_bin = recommender.preference_bins(["#D0202A", "#2459C8"]).tolist()
+    
+    assert buffer.preference_vector("u") is None
+    buffer.record("u", "item1", True, "#D0202A")
+    buffer.record("u", "item2", False, "#2459C8")
+    vector = buffer.preference_vector("u")
+    assert vector[red_bin] > 0 > vector[blue_bin]
+    
+    # A changed vote replaces the earlier one
+    buffer.record("u", "item1", False, "#D0202A")
+    assert buffer.preference_vector("u")[red_bin] < 0
+
+
+def test_failed_flush_keeps_the_events():
+    store = _FailingStore()
+    buffer = PreferenceBuffer(store, MixMatchRecommender())
+    buffer.record("u", "item1", True)
+    
+    assert asyncio.run(buffer.flush()) == 0
+    assert buffer.stats()["failures"] == 1 and buffer.stats()["pending"] == 1
+    
+    store.fail = False
+    assert asyncio.run(buffer.flush()) == 1
+    assert [row["item_id"] for row in store.saved] == ["item1"]
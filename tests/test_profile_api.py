@@ -0,0 +1,41 @@
+import asyncio
+from tempfile import SpooledTemporaryFile
+import cv2
+import numpy as np
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+from starlette.formparsers import MultiPartParser
+import main
+from app.services.ingestion import read_upload
+
+
+def _face_photo(size=(400, 300)):
+    image = np.full((*size, 3), 230, np.uint8)
+    image[100:300, 80:220] = (120, 150, 200)
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+def test_analyze_returns_public_fields_only():
+    with TestClient(main.app) as client:
+        response = client.post(
+            "/api/v1/profile/analyze", files={"file": ("face.jpg", _face_photo(), "image/jpeg")}
+        )
+    assert response.status_code == 200
+    assert set(response.json()) == {"status", "skin_tone", "undertone", "recommended_colors", "confidence"}
+
+
+def test_analyze_rejects_other_content_types():
+    with TestClient(main.app) as client:
+        response = client.post(
+            "/api/v1/profile/analyze", files={"file": ("face.txt", _face_photo(), "text/plain")}
+        )
+    assert response.status_code == 400
+
+
+def test_read_upload_from_memory_and_disk():
+    for length in (1000, MultiPartParser.spool_max_size + 1000):
+        data = np.random.default_rng(length).integers(0, 256, length, dtype=np.uint8).tobytes()
+        spooled = SpooledTemporaryFile(max_size=MultiPartParser.spool_max_size)
+        spooled.write(data)
+        upload = UploadFile(spooled, size=length)
+        assert bytes(asyncio.run(read_upload(upload, max_size=length))) == data
@@ -0,0 +1,46 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.services import profiling
+
+
+def _work(started: threading.Event, release: threading.Event):
+    started.set()
+    release.wait(5)
+    return sum(range(1000))
+
+
+def test_overlapping_profiled_calls_do_not_fail():
+    first_started, release = threading.Event(), threading.Event()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(profiling.profiled_call, _work, first_started, release)
+        assert first_started.wait(5)
+        second_release = threading.Event()
+        second_release.set()
+        second = pool.submit(profiling.profiled_call, _work, threading.Event(), second_release)
+        second_result = second.result(5)
+        release.set()
+        first_result = first.result(5)
+    
+    assert first_result[0] == second_result[0] == sum(range(1000))
+    assert first_result[2] is not None
+    # The profiler was busy, the second task ran unprofiled
+    assert second_result[2] is None
+    
+    profile = profiling.RequestProfile(1, "POST", "/scan/accurate", "header")
+    profile.add_task("first", first_result[1], first_result[2])
+    profile.add_task("second", second_result[1], second_result[2])
+    assert [task["profiled"] for task in profile.summary()["tasks"]] == [True, False]
+    assert profile.stats() is not None
+
+
+def test_active_profiling_tool_falls_back(monkeypatch):
+    class BusyProfile:
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+    
+    monkeypatch.setattr(profiling.cProfile, "Profile", BusyProfile)
+    result, _, stats = profiling.profiled_call(sum, [1, 2, 3])
+    assert result == 6
+    assert stats is None
+    # The lock was released for the next task
+    assert not profiling._profiler_lock.locked()
@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+from fastapi.testclient import TestClient
+import main
+from app.config import settings
+from app.services.rate_limit import RateLimiter, rate_limiter
+
+
+def test_charge_takes_tokens_per_extra_file():
+    limiter = RateLimiter(rate=1.0, burst=30)
+    assert limiter.acquire("client", 5, now=0.0) == 0
+    limiter.charge("client", 5 * 5, now=0.0)
+    
+    # A 6-file batch takes the whole bucket, the next scan has to wait
+    assert limiter.acquire("client", 5, now=0.0) == 5.0
+
+
+def test_charge_above_burst_leaves_debt():
+    limiter = RateLimiter(rate=1.0, burst=30)
+    assert limiter.acquire("client", 5, now=0.0) == 0
+    limiter.charge("client", 95, now=0.0)
+    
+    # 70 tokens of debt are paid off before the next scan
+    assert limiter.acquire("client", 5, now=0.0) == 75.0
+    assert limiter.acquire("client", 5, now=75.0) == 0
+
+
+def test_batch_larger_than_burst_is_admitted_then_throttled(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "rate", 10.0)
+    monkeypatch.setattr(rate_limiter, "burst", 30.0)
+    monkeypatch.setattr(rate_limiter, "_buckets", type(rate_limiter._buckets)())
+    
+    image = np.full((120, 80, 3), 235, np.uint8)
+    image[20:100, 15:65] = (60, 90, 180)
+    data = cv2.imencode(".jpg", image)[1].tobytes()
+    count = 10
+    assert count * settings.RATE_LIMIT_SCAN_COST > rate_limiter.burst
+    
+    with TestClient(main.app) as client:
+        response = client.post(
+            "/api/v1/scan/batch?tier=color",
+            files=[("files", (f"{i}.jpg", data, "image/jpeg")) for i in range(count)]
+        )
+        assert response.status_code == 200
+        assert len(response.text.splitlines()) == count + 1
+        
+        response = client.post(
+            "/api/v1/scan/accurate", files={"file": ("0.jpg", data, "image/jpeg")}
+        )
+        assert response.status_code == 429
+        # 20 tokens of debt plus one scan at 10 tokens per second
+        assert int(response.headers["Retry-After"]) >= 2
@@ -0,0 +1,44 @@
+from fastapi.testclient import TestClient
+import main
+
+
+def _instant(client, headers=None, **params):
+    return client.get("/api/v1/recommend/instant", params={"item_color": "#336699", **params}, headers=headers)
+
+
+def test_anonymous_match_is_public_and_revalidates_with_304():
+    with TestClient(main.app) as client:
+        response = _instant(client, undertone="Cool")
+        etag = response.headers["etag"]
+        assert response.status_code == 200
+        assert response.headers["cache-control"].startswith("public, max-age=")
+        
+        cached = _instant(client, headers={"If-None-Match": etag}, undertone="Cool")
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers["etag"] == etag
+        
+        # Proxies may weaken the tag, If-None-Match still matches
+        assert _instant(client, headers={"If-None-Match": f"W/{etag}"}, undertone="Cool").status_code == 304
+        
+        other = _instant(client, headers={"If-None-Match": etag}, undertone="Warm")
+        assert other.status_code == 200
+        assert other.headers["etag"] != etag
+
+
+def test_user_match_is_private_and_validated_by_body():
+    with TestClient(main.app) as client:
+        response = _instant(client, user_id="etag-user")
+        etag = response.headers["etag"]
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "private, no-cache"
+        assert etag != _instant(client).headers["etag"]
+        
+        assert _instant(client, headers={"If-None-Match": etag}, user_id="etag-user").status_code == 304
+
+
+def test_invalid_color_is_not_cached():
+    with TestClient(main.app) as client:
+        response = client.get("/api/v1/recommend/instant", params={"item_color": "#33669Z"})
+    assert response.status_code == 400
+    assert "etag" not in response.headers
@@ -0,0 +1,69 @@
+import asyncio
+from app.services.result_cache import ResultCache
+
+
+def test_concurrent_callers_share_one_computation():
+    cache = ResultCache(max_bytes=1 << 20)
+    calls = []
+    
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"status": "success", "value": 42}
+    
+    async def scenario():
+        key = cache.make_key("garment", "1", "abc")
+        results = await asyncio.gather(*(cache.get_or_compute(key, compute) for _ in range(5)))
+        again = await cache.get_or_compute(key, compute)
+        return results, again
+    
+    results, again = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(result["value"] == 42 for result in results + [again])
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["memory_hits"]) == (1, 4, 1)
+
+
+def test_errors_are_not_cached():
+    cache = ResultCache(max_bytes=1 << 20)
+    calls = []
+    
+    async def compute():
+        calls.append(1)
+        return {"status": "error", "message": "bad image"}
+    
+    async def scenario():
+        for _ in range(2):
+            await cache.get_or_compute("key", compute)
+    
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_memory_tier_is_bounded_by_bytes():
+    cache = ResultCache(max_bytes=200)
+    
+    async def scenario():
+        for i in range(10):
+            async def compute(i=i):
+                return {"status": "success", "payload": "x" * 50, "i": i}
+            await cache.get_or_compute(f"key{i}", compute)
+    
+    asyncio.run(scenario())
+    stats = cache.stats()
+    assert stats["bytes"] <= 200
+    assert stats["evictions"] > 0
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    async def compute():
+        return {"status": "success", "value": 7}
+    
+    async def failing():
+        raise AssertionError("should be read from disk")
+    
+    key = ResultCache.make_key("profile", "5", "d" * 64)
+    asyncio.run(ResultCache(1 << 20, str(tmp_path)).get_or_compute(key, compute))
+    fresh = ResultCache(1 << 20, str(tmp_path))
+    assert asyncio.run(fresh.get_or_compute(key, failing))["value"] == 7
+    assert fresh.stats()["disk_hits"] == 1
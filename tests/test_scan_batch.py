@@ -0,0 +1,62 @@
+import json
+import cv2
+import numpy as np
+from fastapi.testclient import TestClient
+import main
+from app.api.v1 import scan
+
+
+def _photo(shade: int) -> bytes:
+    image = np.full((120, 80, 3), 235, np.uint8)
+    image[20:100, 15:65] = (shade, 90, 180)
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+def test_unexpected_item_error_does_not_fail_the_batch(monkeypatch):
+    broken = _photo(10)
+    process_cached = scan._process_cached
+    
+    async def failing(contents, *args, **kwargs):
+        if bytes(contents) == broken:
+            raise RuntimeError("worker process died")
+        return await process_cached(contents, *args, **kwargs)
+    
+    monkeypatch.setattr(scan, "_process_cached", failing)
+    files = [("files", (f"{i}.jpg", data, "image/jpeg")) for i, data in enumerate([_photo(60), broken, _photo(120)])]
+    with TestClient(main.app) as client:
+        response = client.post("/api/v1/scan/batch?tier=color", files=files)
+    
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    entries = {entry["index"]: entry for entry in lines[:-1]}
+    assert entries[1]["status"] == "error"
+    assert entries[1]["status_code"] == 500
+    assert entries[0]["status"] == entries[2]["status"] == "success"
+    assert lines[-1] == {"done": True, "total": 3, "succeeded": 2, "failed": 1}
+
+
+def test_batch_streams_one_line_per_file_and_stores_to_the_wardrobe():
+    files = [
+        ("files", ("0.jpg", _photo(60), "image/jpeg")),
+        ("files", ("1.txt", b"not an image", "text/plain")),
+        ("files", ("2.jpg", _photo(120), "image/jpeg")),
+    ]
+    with TestClient(main.app) as client:
+        response = client.post("/api/v1/scan/batch?user_id=batch-user", files=files)
+        items = client.get("/api/v1/wardrobe/batch-user/items").json()["items"]
+    
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    entries = {entry["index"]: entry for entry in lines[:-1]}
+    assert entries[1]["status_code"] == 400
+    assert entries[0]["garment_type"] is not None and entries[2]["measurements"] is not None
+    assert lines[-1] == {"done": True, "total": 3, "succeeded": 2, "failed": 1, "stored": 2}
+    assert {item["garment_id"] for item in items} == {entries[0]["garment_id"], entries[2]["garment_id"]}
+
+
+def test_batch_rejects_too_many_files(monkeypatch):
+    monkeypatch.setattr(scan.settings, "SCAN_BATCH_MAX_FILES", 2)
+    files = [("files", (f"{i}.jpg", _photo(60), "image/jpeg")) for i in range(3)]
+    with TestClient(main.app) as client:
+        response = client.post("/api/v1/scan/batch", files=files)
+    assert response.status_code == 400
@@ -0,0 +1,16 @@
+import os
+import pytest
+from app.ai_core.segmentation import GarmentSegmenter
+
+
+def test_session_uses_configured_threads():
+    pytest.importorskip("rembg")
+    os.environ.pop("OMP_NUM_THREADS", None)
+    segmenter = GarmentSegmenter(enabled=True, model_name="u2netp", threads=2)
+    if not segmenter.load():
+        pytest.skip(f"Model not available: {segmenter.stats()['error']}")
+    
+    options = segmenter._session.inner_session.get_session_options()
+    assert options.intra_op_num_threads == 2
+    assert options.inter_op_num_threads == 2
+    assert "OMP_NUM_THREADS" not in os.environ
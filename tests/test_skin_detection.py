@@ -0,0 +1,37 @@
+import numpy as np
+from app.ai_core.skin_detection import SkinDetector
+
+SKIN_BGR = (130, 160, 210)
+
+def _portrait(center_bgr) -> np.ndarray:
+    """Dark hair and background, center_bgr patches in the middle"""
+    image = np.full((200, 160, 3), (30, 30, 30), dtype=np.uint8)
+    image[60:140, 50:110] = center_bgr
+    return image
+
+def test_center_region_averages_only_skin_pixels():
+    detector = SkinDetector()
+    mean, info = detector.skin_color(_portrait(SKIN_BGR))
+    
+    assert info["method"] in ("center", "face")
+    assert info["confidence"] >= 0.7
+    assert np.allclose(mean, SKIN_BGR, atol=1)
+
+def test_region_without_skin_is_averaged_unmasked():
+    detector = SkinDetector()
+    _, info = detector.skin_color(_portrait((90, 140, 60)))
+    
+    assert info["method"] == "center_unmasked"
+    assert info["confidence"] == 0.5
+    assert info["skin_share"] < 0.15
+
+def test_detected_face_box_is_used(monkeypatch):
+    detector = SkinDetector()
+    image = _portrait((30, 30, 30))
+    image[10:50, 10:50] = SKIN_BGR
+    monkeypatch.setattr(detector, "_detect_face", lambda image: (10, 10, 50, 50))
+    
+    mean, info = detector.skin_color(image)
+    assert (info["method"], info["confidence"], info["skin_share"]) == ("face", 0.9, 1.0)
+    assert np.allclose(mean, SKIN_BGR, atol=1)
+    assert detector.stats()["methods"] == {"face": 1}
@@ -0,0 +1,39 @@
+import cv2
+import numpy as np
+import pytest
+from app.ai_core.profile_analyzer import profile_analyzer
+from app.ai_core.skin_tone import SkinToneProfiles
+
+@pytest.mark.parametrize("rgb", [(200, 200, 200), (180.0, 150.0, 180.0), (150.2, 140.0, 150.3), (210, 160, 130)])
+def test_single_photo_profile_matches_photo(rgb):
+    image = np.full((96, 64, 3), rgb[::-1], dtype=np.uint8)
+    data = cv2.imencode(".png", image)[1].tobytes()
+    result = profile_analyzer.analyze_skin_tone(data)
+    assert result["status"] == "success"
+    
+    profile, outcome = SkinToneProfiles().update(
+        "u1", "photo", result["skin_lab"], result["skin_rgb"], result["confidence"]
+    )
+    
+    assert outcome == "added"
+    assert profile["undertone"] == result["undertone"]
+    assert profile["skin_tone"] == result["skin_tone"]
+
+def test_placeholder_photo_profile_is_neutral():
+    # The warm-up image: a gray frame around a colored block
+    image = np.full((96, 64, 3), 235, dtype=np.uint8)
+    image[16:80, 12:52] = (60, 90, 180)
+    result = profile_analyzer.analyze_skin_tone(cv2.imencode(".jpg", image)[1].tobytes())
+    
+    profile, _ = SkinToneProfiles().update(
+        "u1", "photo", result["skin_lab"], result["skin_rgb"], result["confidence"]
+    )
+    
+    assert profile["undertone"] == result["undertone"]
+
+def test_gray_profile_stays_neutral():
+    profiles = SkinToneProfiles()
+    for index in range(3):
+        profile, _ = profiles.update("u1", f"photo{index}", [81.27, 0.0, 0.0], [200.0, 200.0, 200.0], 0.7)
+    
+    assert profile["undertone"] == "Neutral"
@@ -0,0 +1,22 @@
+from app.services.wardrobe_store import WardrobeStore
+
+def test_color_tier_rescan_keeps_full_scan_fields():
+    store = WardrobeStore("sqlite://")
+    full = {
+        "content_hash": "h1",
+        "filename": "shirt.jpg",
+        "color_hex": "#3A5B99",
+        "garment_type": "long",
+        "measurements": {"width_px": 400, "height_px": 800, "area_px": 250000},
+        "confidence": 0.85,
+    }
+    try:
+        garment_id = store.save_items("u1", [full])[0]
+        store.save_items("u1", [{"content_hash": "h1", "filename": "shirt.jpg", "color_hex": "#3B5C9A", "confidence": 0.85}])
+        
+        item = store.get_item("u1", garment_id)
+        assert item["color_hex"] == "#3B5C9A"
+        assert item["garment_type"] == "long"
+        assert item["measurements"] == full["measurements"]
+    finally:
+        store.close()